@@ -8,13 +8,19 @@ import time
 from urllib.parse import parse_qs, unquote
 from typing import Optional
 
+from app.utils.ttl_cache import TTLCache
+
 # initData — это фактически сессионный токен Mini App.
 # HMAC-подпись не даёт его подделать; auth_date — дополнительная защита от replay.
 # 24 часа — разумный баланс: пользователь не будет держать вкладку дольше.
 _MAX_AUTH_AGE_SECONDS = 86400
+# Проверенный initData → telegram_id: повторные запросы той же сессии Web App без HMAC
+ADMIN_AUTH_CACHE_TTL_SECONDS = float(os.getenv("ADMIN_AUTH_CACHE_TTL_SECONDS", "300"))
 
 logger = logging.getLogger(__name__)
 
+_verified: TTLCache[int] = TTLCache(maxsize=1024, ttl=ADMIN_AUTH_CACHE_TTL_SECONDS)
+
 
 def _verify_signature(init_data: str, data_check_string: str, hash_val: str, bot_token: str) -> bool:
     """Проверяет подпись. Возвращает True если hash совпадает.
@@ -33,8 +39,14 @@ def _verify_signature(init_data: str, data_check_string: str, hash_val: str, bot
 
 
 def validate_init_data(init_data: str, bot_token: str) -> Optional[int]:
+    """Проверяет подпись initData и возвращает telegram user_id при успехе, иначе None."""
+    result = _validate(init_data, bot_token)
+    return result[0] if result else None
+
+
+def _validate(init_data: str, bot_token: str) -> Optional[tuple[int, Optional[int]]]:
     """
-    Проверяет подпись initData и возвращает telegram user_id при успехе, иначе None.
+    Проверяет initData; при успехе — (telegram user_id, auth_date или None).
     https://core.telegram.org/bots/webapps#validating-data-received-via-the-mini-app
 
     Алгоритм (подтверждён эмпирически):
@@ -87,9 +99,11 @@ def validate_init_data(init_data: str, bot_token: str) -> Optional[int]:
         # Проверяем auth_date
         pairs_dict = dict(pairs)
         auth_date_str = pairs_dict.get("auth_date")
+        auth_date = None
         if auth_date_str:
             try:
-                age = time.time() - int(auth_date_str)
+                auth_date = int(auth_date_str)
+                age = time.time() - auth_date
                 if age > _MAX_AUTH_AGE_SECONDS:
                     logger.warning(
                         "validate_init_data: initData устарела — возраст=%.0f сек (макс %d)",
@@ -107,7 +121,40 @@ def validate_init_data(init_data: str, bot_token: str) -> Optional[int]:
         data = json.loads(user_json)
         user_id = int(data["id"])
         logger.info("validate_init_data: OK, user_id=%s", user_id)
-        return user_id
+        return user_id, auth_date
     except Exception as e:
         logger.exception("validate_init_data: ошибка парсинга initData — %s", e)
         return None
+
+
+def _cache_key(init_data: str, bot_token: str) -> str:
+    return hashlib.sha256(f"{bot_token}\n{init_data}".encode("utf-8")).hexdigest()
+
+
+def validate_init_data_cached(init_data: str, bot_token: str) -> tuple[Optional[int], bool]:
+    """validate_init_data с кэшем успешных проверок: (user_id или None, из кэша ли).
+
+    Запись живёт не дольше ADMIN_AUTH_CACHE_TTL_SECONDS и не дольше срока auth_date.
+    Неудачные проверки не кэшируются.
+    """
+    bot_token = (bot_token or "").strip()
+    if not init_data or not bot_token:
+        return validate_init_data(init_data, bot_token), False
+    key = _cache_key(init_data, bot_token)
+    user_id = _verified.get(key)
+    if user_id is not None:
+        return user_id, True
+    result = _validate(init_data, bot_token)
+    if not result:
+        return None, False
+    user_id, auth_date = result
+    ttl = ADMIN_AUTH_CACHE_TTL_SECONDS
+    if auth_date is not None:
+        ttl = min(ttl, auth_date + _MAX_AUTH_AGE_SECONDS - time.time())
+    if ttl > 0:
+        _verified.set(key, user_id, ttl=ttl)
+    return user_id, False
+
+
+def clear_auth_cache() -> None:
+    _verified.clear()
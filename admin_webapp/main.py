@@ -3,7 +3,9 @@
 Запуск из корня проекта: uvicorn admin_webapp.main:app --reload --port 8001
 """
 import logging
+import os
 import sys
+import time
 from pathlib import Path
 
 # Запуск из корня проекта (e.g. python -m uvicorn admin_webapp.main:app)
@@ -15,17 +17,23 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import FastAPI, Depends, HTTPException, Header, Request, Query
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func, or_, text, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import Config
-from app.database.base import async_session_maker
-from app.database.models import User, Patient, Appointment, Treatment
+from app.database.base import async_session_maker, engine, pool_stats, replica_engine, report_session
+from app.database.models import User
+from app.services import health_state
+from app.services.metrics import HTTP_SECONDS, install_db_metrics
+from app.services.stats_service import get_dashboard_stats, invalidate_stats
+from app.utils.pagination import decode_cursor, encode_cursor, estimate_count, exact_count
+from app.utils import metrics
+from app.utils.ttl_cache import TTLCache
 
-from admin_webapp.auth import validate_init_data
+from admin_webapp.auth import validate_init_data_cached
 
 # Логи в stdout, чтобы в Railway INFO не помечались как "error" (stderr = error в UI)
 _log_fmt = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
@@ -38,12 +46,20 @@ logger.propagate = False
 
 app = FastAPI(title="MiniStom Admin")
 
+HEALTH_READY_CACHE_SECONDS = float(os.getenv("HEALTH_READY_CACHE_SECONDS", "5"))
+
+install_db_metrics(engine)
+if replica_engine is not None:
+    install_db_metrics(replica_engine, pool="replica")
+
 
 @app.middleware("http")
 async def add_security_headers(request: Request, call_next):
+    start = time.perf_counter()
     try:
         response = await call_next(request)
     except Exception as exc:
+        _observe_http(request, 500, start)
         # Отправляем ошибку в мониторинг (если бот запущен)
         try:
             from app.services.error_monitor import error_monitor
@@ -59,8 +75,16 @@ async def add_security_headers(request: Request, call_next):
     response.headers["X-Frame-Options"] = "SAMEORIGIN"
     response.headers["X-XSS-Protection"] = "1; mode=block"
     response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+    _observe_http(request, response.status_code, start)
     return response
 
+
+def _observe_http(request: Request, status: int, start: float) -> None:
+    # Шаблон маршрута (/api/users/{user_id}), а не сам путь — иначе метка на каждый id
+    route = request.scope.get("route")
+    path = getattr(route, "path", None) or "other"
+    HTTP_SECONDS.observe(time.perf_counter() - start, path=path, status=str(status))
+
 # Лог конфигурации при старте (для отладки)
 def _mask_token(t: str) -> str:
     if not t or len(t) < 12:
@@ -87,6 +111,12 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def get_report_db(db: AsyncSession = Depends(get_db)) -> AsyncSession:
+    """Сессия для списков и статистики: реплика (если задана и доступна), иначе основная БД."""
+    async with report_session(db) as session:
+        yield session
+
+
 def require_admin(telegram_id: int) -> None:
     if telegram_id not in Config.ADMIN_IDS:
         logger.warning(
@@ -102,45 +132,53 @@ def _check_admin_auth(
     x_telegram_init_data: Optional[str],
     request_host: Optional[str] = None,
 ) -> int:
-    """Проверка initData и прав админа. Возвращает telegram_id или raises HTTPException."""
-    if request_host is not None:
-        logger.info("[%s] запрос с Host=%s", endpoint, request_host)
+    """Проверка initData и прав админа. Возвращает telegram_id или raises HTTPException.
+
+    Успешно проверенный initData кэшируется: повторные запросы той же сессии
+    не пересчитывают HMAC и не пишут INFO-логи.
+    """
     if not x_telegram_init_data:
         logger.warning("[%s] 401: заголовок X-Telegram-Init-Data отсутствует или пустой", endpoint)
         raise HTTPException(status_code=401, detail="Missing initData")
-    logger.info("[%s] initData получен, len=%d", endpoint, len(x_telegram_init_data))
-    user_id = validate_init_data(x_telegram_init_data, Config.BOT_TOKEN)
+    user_id, cached = validate_init_data_cached(x_telegram_init_data, Config.BOT_TOKEN)
+    log = logger.debug if cached else logger.info
+    if request_host is not None:
+        log("[%s] запрос с Host=%s", endpoint, request_host)
     if user_id is None:
         logger.warning("[%s] 401: validate_init_data вернул None (неверная подпись или нет user)", endpoint)
         raise HTTPException(status_code=401, detail="Invalid initData")
     require_admin(user_id)
-    logger.info("[%s] авторизация OK, user_id=%s", endpoint, user_id)
+    log("[%s] авторизация OK, user_id=%s%s", endpoint, user_id, " (кэш)" if cached else "")
     return user_id
 
 
-@app.get("/api/me")
-async def api_me(
+async def admin_user(
     request: Request,
     x_telegram_init_data: Optional[str] = Header(None),
-):
+) -> int:
+    """FastAPI-зависимость: telegram_id админа из заголовка X-Telegram-Init-Data."""
+    return _check_admin_auth(request.url.path, x_telegram_init_data, request.headers.get("host"))
+
+
+@app.get("/api/me")
+async def api_me(user_id: int = Depends(admin_user)):
     """Проверка авторизации: возвращает user_id если initData валиден и пользователь админ."""
-    user_id = _check_admin_auth("api_me", x_telegram_init_data, request.headers.get("host"))
     return {"telegram_id": user_id, "ok": True}
 
 
 @app.get("/api/users")
 async def api_list_users(
-    request: Request,
-    db: AsyncSession = Depends(get_db),
-    x_telegram_init_data: Optional[str] = Header(None),
+    admin_id: int = Depends(admin_user),
+    db: AsyncSession = Depends(get_report_db),
     q: Optional[str] = Query(None, description="Поиск по имени, телефону или telegram_id"),
     tier: Optional[int] = Query(None, description="Фильтр по уровню подписки"),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, description="Устарело: используйте cursor"),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor из предыдущей страницы"),
+    count: str = Query("estimate", pattern="^(exact|estimate|none)$",
+                       description="Подсчёт total: точный, оценка планировщика или без него"),
 ):
-    """Список пользователей с поиском, фильтром и пагинацией."""
-    _check_admin_auth("api_users", x_telegram_init_data, request.headers.get("host"))
-
+    """Список пользователей с поиском, фильтром и keyset-пагинацией по (created_at, id)."""
     stmt = select(User)
 
     # Поиск
@@ -167,19 +205,36 @@ async def api_list_users(
     if tier is not None:
         stmt = stmt.where(User.subscription_tier == tier)
 
-    # Общее количество (для пагинации)
-    count_result = await db.execute(select(func.count()).select_from(stmt.subquery()))
-    total = count_result.scalar() or 0
+    # Общее количество (для пагинации): на PostgreSQL по умолчанию — оценка из EXPLAIN
+    total, total_estimated = None, False
+    if count == "exact":
+        total = await exact_count(db, stmt)
+    elif count == "estimate":
+        total, total_estimated = await estimate_count(db, stmt)
 
-    # Данные с пагинацией
-    stmt = stmt.order_by(User.created_at.desc()).offset(offset).limit(limit)
+    # Keyset: страница «после» курсора не зависит от глубины, в отличие от OFFSET
+    if cursor:
+        try:
+            after_created, after_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(tuple_(User.created_at, User.id) < tuple_(after_created, after_id))
+    elif offset:
+        stmt = stmt.offset(offset)
+    stmt = stmt.order_by(User.created_at.desc(), User.id.desc()).limit(limit + 1)
     result = await db.execute(stmt)
     users = list(result.scalars().all())
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
 
     return {
         "total": total,
+        "total_estimated": total_estimated,
         "offset": offset,
         "limit": limit,
+        "next_cursor": next_cursor,
         "users": [
             {
                 "id": u.id,
@@ -202,38 +257,14 @@ async def api_list_users(
 
 @app.get("/api/stats")
 async def api_stats(
-    request: Request,
+    admin_id: int = Depends(admin_user),
     db: AsyncSession = Depends(get_db),
-    x_telegram_init_data: Optional[str] = Header(None),
+    report_db: AsyncSession = Depends(get_report_db),
 ):
     """Статистика проекта для дашборда."""
-    _check_admin_auth("api_stats", x_telegram_init_data, request.headers.get("host"))
-
-    # Кол-во пользователей по тарифам
-    tier_counts = {}
-    for tier_val in (0, 1, 2):
-        r = await db.execute(
-            select(func.count()).where(User.subscription_tier == tier_val)
-        )
-        tier_counts[tier_val] = r.scalar() or 0
-    total_users = sum(tier_counts.values())
-
-    # Кол-во пациентов, записей, лечений
-    patients_count = (await db.execute(select(func.count()).select_from(Patient))).scalar() or 0
-    appointments_count = (await db.execute(select(func.count()).select_from(Appointment))).scalar() or 0
-    treatments_count = (await db.execute(select(func.count()).select_from(Treatment))).scalar() or 0
-
-    return {
-        "total_users": total_users,
-        "tier_counts": {
-            "basic": tier_counts[0],
-            "standard": tier_counts[1],
-            "premium": tier_counts[2],
-        },
-        "total_patients": patients_count,
-        "total_appointments": appointments_count,
-        "total_treatments": treatments_count,
-    }
+    # Один агрегирующий запрос (с реплики) + тренды из свёртки daily_stats (пишется в основную БД),
+    # кэш на ADMIN_STATS_TTL_SECONDS
+    return await get_dashboard_stats(report_db, rollup_db=db)
 
 
 class UpdateUserBody(BaseModel):
@@ -245,12 +276,10 @@ class UpdateUserBody(BaseModel):
 async def api_update_user(
     user_id: int,
     body: UpdateUserBody,
-    request: Request,
+    admin_id: int = Depends(admin_user),
     db: AsyncSession = Depends(get_db),
-    x_telegram_init_data: Optional[str] = Header(None),
 ):
     """Обновить уровень подписки и/или дату окончания (только админ)."""
-    admin_id = _check_admin_auth("api_update_user", x_telegram_init_data, request.headers.get("host"))
 
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
@@ -289,6 +318,8 @@ async def api_update_user(
 
     await db.commit()
     await db.refresh(user)
+    if changes:
+        invalidate_stats()
     return {
         "id": user.id,
         "telegram_id": user.telegram_id,
@@ -301,17 +332,91 @@ async def api_update_user(
     }
 
 
-# Health check для Railway (без авторизации)
-@app.get("/health")
-async def health():
+# Health checks (без авторизации).
+# live — процесс отвечает; ready — БД доступна (SELECT 1, кэш HEALTH_READY_CACHE_SECONDS,
+# чтобы частые пробы Railway не нагружали БД); deep — подробности для мониторинга.
+_ready_cache: TTLCache[Optional[str]] = TTLCache(maxsize=1, ttl=HEALTH_READY_CACHE_SECONDS)
+
+
+async def _db_ping() -> tuple[Optional[str], float]:
+    """(ошибка или None, задержка SELECT 1 в мс)."""
+    start = time.perf_counter()
     try:
         async with async_session_maker() as db:
-            await db.execute(select(func.count()).select_from(User))
-        return {"status": "ok", "db": "connected"}
+            await db.execute(text("SELECT 1"))
+        error = None
     except Exception as e:
         logger.error("Health check DB error: %s", e)
-        return {"status": "degraded", "db": str(e)}
+        error = str(e)
+    return error, (time.perf_counter() - start) * 1000
+
+
+async def _db_ready() -> Optional[str]:
+    """Ошибка БД или None; результат кэшируется на HEALTH_READY_CACHE_SECONDS."""
+    if "db" in _ready_cache:
+        return _ready_cache.get("db")
+    error, _ = await _db_ping()
+    _ready_cache.set("db", error)
+    return error
+
+
+@app.get("/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    error = await _db_ready()
+    body = {"status": "ok" if error is None else "unavailable", "db": error or "connected", "pool": pool_stats()}
+    return JSONResponse(body, status_code=200 if error is None else 503)
+
+
+# Railway healthcheckPath: как раньше, всегда 200 (status=degraded при ошибке БД)
+@app.get("/health")
+async def health():
+    error = await _db_ready()
+    if error is None:
+        return {"status": "ok", "db": "connected"}
+    return {"status": "degraded", "db": error}
+
+
+@app.get("/health/deep")
+async def health_deep():
+    """Задержка БД (без кэша), пул соединений, отставание фоновых циклов бота и очередь отправки."""
+    error, latency_ms = await _db_ping()
+    now = time.time()
+    bot_state = health_state.read_state()
+    bot: dict = {"status": "unknown"}
+    if bot_state:
+        age = now - bot_state["written_at"]
+        loops = {
+            name: {"lag_seconds": round(health_state.loop_lag(state, now), 1),
+                   "last_tick_ago": round(now - state["last_tick"], 1)}
+            for name, state in bot_state.get("loops", {}).items()
+        }
+        stale = age > 3 * health_state.HEALTH_STATE_INTERVAL_SECONDS
+        lagging = any(loop["lag_seconds"] > 60 for loop in loops.values())
+        bot = {
+            "status": "stale" if stale else ("lagging" if lagging else "ok"),
+            "state_age_seconds": round(age, 1),
+            "loops": loops,
+            "outbound": bot_state.get("outbound", {}),
+        }
+    ok = error is None and bot["status"] in ("ok", "unknown")
+    return {
+        "status": "ok" if ok else "degraded",
+        "db": {"status": "connected" if error is None else error, "latency_ms": round(latency_ms, 1)},
+        "pool": pool_stats(),
+        **({"replica_pool": pool_stats(replica_engine)} if replica_engine is not None else {}),
+        "bot": bot,
+    }
+
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Метрики процесса веб-админки в формате Prometheus (метрики бота — на BOT_METRICS_PORT)."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 # Раздача статики (index.html и т.д.)
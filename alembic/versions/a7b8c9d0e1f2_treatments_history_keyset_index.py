@@ -0,0 +1,24 @@
+"""treatments: (patient_id, created_at, id) index for paginated patient history
+
+Revision ID: a7b8c9d0e1f2
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "a7b8c9d0e1f2"
+down_revision: Union[str, None] = "c3d4e5f6a7b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_treatments_patient_created_id", "treatments", ["patient_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_treatments_patient_created_id", "treatments")
@@ -0,0 +1,43 @@
+"""add daily_stats rollup and created_at indexes
+
+Revision ID: b2c3d4e5f6a7
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b2c3d4e5f6a7"
+down_revision: Union[str, None] = "a1b2c3d4e5f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("new_users", sa.Integer(), nullable=False),
+        sa.Column("new_patients", sa.Integer(), nullable=False),
+        sa.Column("new_appointments", sa.Integer(), nullable=False),
+        sa.Column("new_treatments", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("day"),
+    )
+    # Пересчёт свёртки читает только последние дни: WHERE created_at >= ...
+    op.create_index("ix_users_created_at", "users", ["created_at"])
+    op.create_index("ix_patients_created_at", "patients", ["created_at"])
+    op.create_index("ix_appointments_created_at", "appointments", ["created_at"])
+    op.create_index("ix_treatments_created_at", "treatments", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_treatments_created_at", "treatments")
+    op.drop_index("ix_appointments_created_at", "appointments")
+    op.drop_index("ix_patients_created_at", "patients")
+    op.drop_index("ix_users_created_at", "users")
+    op.drop_table("daily_stats")
@@ -0,0 +1,36 @@
+"""users: (created_at, id) index for keyset pagination and trigram search indexes
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "c3d4e5f6a7b8"
+down_revision: Union[str, None] = "b2c3d4e5f6a7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Составной индекс покрывает и диапазоны по created_at для daily_stats
+    op.drop_index("ix_users_created_at", "users")
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"])
+
+    # ILIKE '%...%' по имени и телефону: GIN-индексы pg_trgm (pg_trgm — доверенное расширение с PG 13)
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_users_full_name_trgm ON users USING gin (full_name gin_trgm_ops)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_users_phone_trgm ON users USING gin (phone gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_users_phone_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_users_full_name_trgm")
+    op.drop_index("ix_users_created_at_id", "users")
+    op.create_index("ix_users_created_at", "users", ["created_at"])
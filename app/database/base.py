@@ -1,9 +1,38 @@
+"""
+Движки и фабрики сессий (общие для бота и веб-админки).
+
+Пул настраивается через DB_POOL_*. По умолчанию pre-ping выключен: вместо лишнего
+round-trip на каждую выдачу соединения SQLAlchemy по ошибке обрыва инвалидирует
+соединение и все более старые в пуле (следующие выдачи получают свежие), а
+pool_recycle закрывает соединения раньше, чем их оборвёт сервер или pgbouncer.
+DB_PGBOUNCER=1 — режим для pgbouncer в transaction mode: без кэша prepared statements.
+"""
+import asyncio
+import logging
 import os
 import ssl as ssl_module
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from uuid import uuid4
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 from app.config import Config
 from app.database.models import Base
+from app.services.metrics import pool_status
+
+logger = logging.getLogger(__name__)
+
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "").strip().lower() in ("1", "true", "yes")
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "0"))
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "").strip().lower() in ("1", "true", "yes")
 
 
 def _async_database_url(url: str) -> str:
@@ -19,10 +48,10 @@ def _async_database_url(url: str) -> str:
     return url
 
 
-def _get_ssl_context():
+def _get_ssl_context(db_url: str):
     """SSL-контекст для asyncpg: включается если DB_SSL=require или ?sslmode=require в URL."""
     db_ssl = os.getenv("DB_SSL", "").strip().lower()
-    db_url = Config.DATABASE_URL or ""
+    db_url = db_url or ""
     if db_ssl == "require" or "sslmode=require" in db_url:
         ctx = ssl_module.create_default_context()
         # Railway/managed DB: сертификат не проверяем (нет CA)
@@ -39,17 +68,45 @@ if "+asyncpg" not in _db_url:
         f"DATABASE_URL must use postgresql+asyncpg for async engine, got: {_db_url[:30]}..."
     )
 
-_ssl_ctx = _get_ssl_context()
-_connect_args = {"ssl": _ssl_ctx} if _ssl_ctx else {}
 
-engine = create_async_engine(
-    _db_url,
-    echo=False,  # Установить True для отладки SQL запросов
-    future=True,
-    pool_pre_ping=True,   # Проверка соединения перед использованием (устойчивость к обрывам)
-    pool_recycle=3600,    # Переподключение к БД каждые 60 мин (для долгой работы на сервере)
-    connect_args=_connect_args,
-)
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def engine_options(url: str, pgbouncer: bool = DB_PGBOUNCER) -> dict:
+    """Аргументы create_async_engine для url: пул из DB_POOL_*, таймауты asyncpg, режим pgbouncer."""
+    connect_args: dict = {"timeout": DB_CONNECT_TIMEOUT}
+    if DB_COMMAND_TIMEOUT > 0:
+        connect_args["command_timeout"] = DB_COMMAND_TIMEOUT
+    ssl_ctx = _get_ssl_context(url)
+    if ssl_ctx:
+        connect_args["ssl"] = ssl_ctx
+    if pgbouncer:
+        # Transaction mode: соединение с сервером меняется между транзакциями, prepared
+        # statements с него пропадают — отключаем оба кэша (asyncpg и SQLAlchemy)
+        # и даём операторам уникальные имена, чтобы не было конфликтов «already exists»
+        connect_args.update(
+            statement_cache_size=0,
+            prepared_statement_cache_size=0,
+            prepared_statement_name_func=_unique_statement_name,
+        )
+    return {
+        "echo": False,  # Установить True для отладки SQL запросов
+        "future": True,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+def _create_engine(url: str):
+    return create_async_engine(url, **engine_options(url))
+
+
+engine = _create_engine(_db_url)
 
 # Создание фабрики сессий
 async_session_maker = async_sessionmaker(
@@ -58,6 +115,48 @@ async_session_maker = async_sessionmaker(
     expire_on_commit=False
 )
 
+# Реплика для отчётов (необязательна): свой движок и фабрика сессий
+_replica_url = _async_database_url(Config.DATABASE_REPLICA_URL) if Config.DATABASE_REPLICA_URL else ""
+replica_engine = _create_engine(_replica_url) if _replica_url else None
+replica_session_maker = (
+    async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine is not None else None
+)
+_replica_down_until = 0.0
+
+
+@asynccontextmanager
+async def report_session(primary: Optional[AsyncSession] = None) -> AsyncIterator[AsyncSession]:
+    """Сессия для отчётных чтений: реплика, если задана и отвечает, иначе основная БД.
+
+    primary — уже открытая сессия основной БД (сессия апдейта); без неё открывается новая.
+    Реплика отстаёт от основной БД — только для отчётов, не для чтения сразу после записи.
+    Если к реплике не подключиться, отчёты DB_REPLICA_RETRY_SECONDS идут в основную БД.
+    """
+    global _replica_down_until
+    if replica_session_maker is not None and time.monotonic() >= _replica_down_until:
+        session = replica_session_maker()
+        try:
+            await session.connection()
+        except (OSError, asyncio.TimeoutError, SQLAlchemyError) as e:
+            await session.close()
+            _replica_down_until = time.monotonic() + DB_REPLICA_RETRY_SECONDS
+            logger.warning("Реплика БД недоступна, отчёты идут в основную БД: %s", e)
+        else:
+            async with session:
+                yield session
+            return
+    if primary is not None:
+        yield primary
+        return
+    async with async_session_maker() as session:
+        yield session
+
+
+def pool_stats(target: Optional[AsyncEngine] = None) -> dict:
+    """Состояние пула соединений (по умолчанию основной БД): размер, свободные, выданные, сверх лимита."""
+    return pool_status(target or engine)
+
 
 async def init_db():
     """Инициализация базы данных (создание таблиц)"""
@@ -68,4 +167,6 @@ async def init_db():
 async def close_db():
     """Закрытие соединения с БД"""
     await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
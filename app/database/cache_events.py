@@ -0,0 +1,83 @@
+"""
+Сброс in-memory кэшей при изменении моделей — после коммита, а не при flush.
+
+События маппера (after_insert/update/delete) срабатывают при flush: параллельный
+запрос между flush и коммитом перестроил бы кэш из ещё старых строк, и тот жил бы
+весь TTL. Поэтому при flush ключи копятся в Session.info, сбрасываются в after_commit,
+а при откате отбрасываются.
+
+Сброс мог бы потеряться и иначе: запрос, начатый до коммита, кладёт значение в кэш
+уже после сброса. Поэтому кэши таких данных — GenerationCache: сброс увеличивает
+поколение ключа, и значение, прочитанное в старом поколении, не сохраняется.
+"""
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.utils.ttl_cache import TTLCache
+
+V = TypeVar("V")
+
+_PENDING_KEY = "invalidate_on_commit"
+
+
+class GenerationCache(Generic[V]):
+    """TTLCache, который не принимает значения, прочитанные до последнего сброса ключа.
+
+    Использование: generation = cache.generation(key) до запроса к БД,
+    cache.set(key, value, generation) после.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self._cache: TTLCache[V] = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Поколения не вытесняются: ключи — id врачей, их немного
+        self._generations: dict[Hashable, int] = {}
+
+    def get(self, key: Hashable) -> Optional[V]:
+        return self._cache.get(key)
+
+    def generation(self, key: Hashable) -> int:
+        return self._generations.get(key, 0)
+
+    def set(self, key: Hashable, value: V, generation: int) -> bool:
+        """Сохранить, если с момента generation ключ не сбрасывали; False — значение устарело."""
+        if self._generations.get(key, 0) != generation:
+            return False
+        self._cache.set(key, value)
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._cache.pop(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+def invalidate_on_commit(
+    model: type,
+    key: Callable[[object], Hashable],
+    invalidate: Callable[[Hashable], None],
+) -> None:
+    """После коммита изменений model вызвать invalidate(key(объект)) — по разу на ключ."""
+    def on_change(mapper, connection, target) -> None:
+        session = object_session(target)
+        if session is None:
+            invalidate(key(target))
+            return
+        session.info.setdefault(_PENDING_KEY, set()).add((invalidate, key(target)))
+
+    for name in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, name, on_change)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    for invalidate, key in session.info.pop(_PENDING_KEY, ()):
+        invalidate(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -1,6 +1,6 @@
 from datetime import datetime, date
 from typing import Optional
-from sqlalchemy import String, Integer, Float, Date, DateTime, ForeignKey, Text, JSON, func
+from sqlalchemy import String, Integer, Float, Date, DateTime, ForeignKey, Index, Text, JSON, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -11,6 +11,11 @@ class Base(DeclarativeBase):
 class User(Base):
     """Модель врача или ассистента (пользователя)"""
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset-пагинация списка в админке: ORDER BY created_at DESC, id DESC.
+        # GIN-индексы триграмм по full_name/phone для поиска — только в миграции (PostgreSQL)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     telegram_id: Mapped[int] = mapped_column(unique=True, index=True)
@@ -107,7 +112,7 @@ class Patient(Base):
     phone: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     birth_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
     notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
     updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
@@ -131,7 +136,7 @@ class Appointment(Base):
     service_description: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     status: Mapped[str] = mapped_column(String(20), default="planned")  # planned, completed, cancelled
     reminder_sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # когда отправлено напоминание
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
     
     # Relationships
     doctor: Mapped["User"] = relationship(back_populates="appointments")
@@ -144,6 +149,10 @@ class Appointment(Base):
 class Treatment(Base):
     """Модель лечения (Premium)"""
     __tablename__ = "treatments"
+    __table_args__ = (
+        # Keyset-пагинация истории пациента: ORDER BY created_at DESC, id DESC
+        Index("ix_treatments_patient_created_id", "patient_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     patient_id: Mapped[int] = mapped_column(ForeignKey("patients.id", ondelete="CASCADE"), index=True)
@@ -159,7 +168,7 @@ class Treatment(Base):
     paid_amount: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     payment_method: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)  # cash, card, transfer
     payment_status: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)  # full, partial, debt
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
     
     # Relationships
     patient: Mapped["Patient"] = relationship(back_populates="treatments")
@@ -205,3 +214,14 @@ class ImplantLog(Base):
     patient: Mapped["Patient"] = relationship(back_populates="implant_logs")
     doctor: Mapped["User"] = relationship(back_populates="implant_logs")
 
+
+class DailyStats(Base):
+    """Свёртка по дням для трендов дашборда админки (пересчитывается stats_service)."""
+    __tablename__ = "daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    new_users: Mapped[int] = mapped_column(Integer, default=0)
+    new_patients: Mapped[int] = mapped_column(Integer, default=0)
+    new_appointments: Mapped[int] = mapped_column(Integer, default=0)  # созданные за день записи
+    new_treatments: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime)  # после конца дня строка окончательная
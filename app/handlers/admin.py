@@ -1,6 +1,8 @@
 import asyncio
 import logging
+import tempfile
 from datetime import datetime, timedelta
+from pathlib import Path
 
 from aiogram import Router
 from aiogram.filters import Command
@@ -48,7 +50,9 @@ async def cmd_admin(message: Message):
         "• /admin_send telegram_id текст — личное сообщение пользователю\n"
         "• /admin_broadcast текст — сообщение всем пользователям\n"
         "• /errors — статистика ошибок мониторинга\n"
-        "• /backup — ручной бэкап БД (отправляет файл)\n\n"
+        "• /backup — ручной бэкап БД (отправляет файл)\n"
+        "• /admin_export_doctor telegram_id — бэкап данных одного врача\n"
+        "• /admin_restore_doctor telegram_id — ответом на файл бэкапа: восстановить данные врача\n\n"
         "Уровни: 0=Basic, 1=Standard, 2=Premium.\n"
         "Telegram ID смотрите в списке пользователей."
     ).format(message.from_user.id)
@@ -352,3 +356,79 @@ async def cmd_backup(message: Message):
     status = await run_backup_and_send(message.bot)
     await message.answer(status)
 
+
+
+async def _find_user_by_telegram_id(message: Message, db_session: AsyncSession, usage: str) -> User | None:
+    args = (message.text or "").split()
+    if len(args) < 2:
+        await message.answer(usage, parse_mode=None)
+        return None
+    try:
+        telegram_id = int(args[1])
+    except ValueError:
+        await message.answer("❌ telegram_id должен быть числом.")
+        return None
+    user = await db_session.scalar(select(User).where(User.telegram_id == telegram_id))
+    if not user:
+        await message.answer(f"❌ Пользователь с ID {telegram_id} не найден.")
+    return user
+
+
+@router.message(Command("admin_export_doctor", "adminexportdoctor"))
+async def cmd_export_doctor(message: Message, db_session: AsyncSession):
+    """Логический бэкап данных одного врача (gzip NDJSON)."""
+    if not message.from_user or not _is_admin(message.from_user.id):
+        return
+    doctor = await _find_user_by_telegram_id(
+        message, db_session, "Использование: /admin_export_doctor <telegram_id>"
+    )
+    if not doctor:
+        return
+
+    from aiogram.types import FSInputFile
+    from app.services.tenant_backup import export_doctor
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"ministom_doctor_{doctor.telegram_id}_{timestamp}.ndjson.gz"
+        with path.open("wb") as out:
+            counts = await export_doctor(db_session, doctor.id, out)
+        summary = ", ".join(f"{name}: {count}" for name, count in counts.items())
+        await message.answer_document(
+            FSInputFile(path, filename=path.name),
+            caption=f"💾 Бэкап врача {doctor.full_name} ({doctor.telegram_id})\n{summary}",
+        )
+
+
+@router.message(Command("admin_restore_doctor", "adminrestoredoctor"))
+async def cmd_restore_doctor(message: Message, db_session: AsyncSession):
+    """Восстановить данные врача из бэкапа (команда — ответом на сообщение с файлом)."""
+    if not message.from_user or not _is_admin(message.from_user.id):
+        return
+    usage = (
+        "Использование: ответьте на сообщение с файлом бэкапа командой\n"
+        "/admin_restore_doctor <telegram_id>\n"
+        "Текущие данные врача (пациенты, записи, лечение, услуги, импланты, локации) будут заменены."
+    )
+    document = message.reply_to_message.document if message.reply_to_message else None
+    if not document:
+        await message.answer(usage, parse_mode=None)
+        return
+    doctor = await _find_user_by_telegram_id(message, db_session, usage)
+    if not doctor:
+        return
+
+    from app.services.tenant_backup import TenantBackupError, restore_doctor
+
+    name = doctor.full_name
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "tenant_backup.ndjson.gz"
+        await message.bot.download(document, destination=path)
+        try:
+            with path.open("rb") as src:
+                counts = await restore_doctor(db_session, doctor, src)
+        except TenantBackupError as e:
+            await message.answer(f"❌ {e}", parse_mode=None)
+            return
+    summary = ", ".join(f"{table}: {count}" for table, count in counts.items())
+    await message.answer(f"✅ Данные врача {name} восстановлены.\n{summary}", parse_mode=None)
@@ -11,8 +11,6 @@ from app.states.appointment import AppointmentStates
 from app.utils.constants import TIER_NAMES
 from app.keyboards.calendar import get_calendar_keyboard, get_time_slots_keyboard, get_schedule_dates_keyboard
 from app.services.calendar_service import (
-    get_appointments_by_date,
-    get_appointments_today,
     format_appointments_list,
     format_schedule_with_contacts,
     get_dates_with_appointments,
@@ -20,6 +18,7 @@ from app.services.calendar_service import (
     get_busy_ranges_for_date,
 )
 from app.services.patient_service import search_patients
+from app.services.read_models import get_schedule_rows
 from app.services.service_service import (
     get_categories,
     get_services_by_category,
@@ -91,7 +90,7 @@ async def cmd_calendar(
             reply_markup=get_calendar_keyboard(today.year, today.month)
         )
     else:
-        appointments = await get_appointments_today(db_session, effective_doctor.id)
+        appointments = await get_schedule_rows(db_session, effective_doctor.id, date.today())
         show_price = effective_doctor.subscription_tier >= 1
         text = await format_appointments_list(appointments, show_price=show_price)
         await message.answer(text)
@@ -118,7 +117,7 @@ async def cmd_schedule(
             return
     else:
         target_date = date.today()
-    appointments = await get_appointments_by_date(db_session, effective_doctor.id, target_date)
+    appointments = await get_schedule_rows(db_session, effective_doctor.id, target_date)
     show_price = effective_doctor.subscription_tier >= 1
     text = await format_appointments_list(appointments, show_price=show_price)
     await message.answer(text)
@@ -181,7 +180,7 @@ async def process_schedule_callback(
         year, month, day = int(parts[0]), int(parts[1]), int(parts[2])
         target_date = date(year, month, day)
         
-        appointments = await get_appointments_by_date(db_session, effective_doctor.id, target_date)
+        appointments = await get_schedule_rows(db_session, effective_doctor.id, target_date)
         show_price = effective_doctor.subscription_tier >= 1
         text = await format_schedule_with_contacts(appointments, show_price=show_price)
         
@@ -762,7 +761,7 @@ async def _continue_appointment_creation(
     db_session: AsyncSession
 ):
     """Продолжение создания записи — выбор услуги по категориям"""
-    await ensure_default_services(db_session, effective_doctor.id)
+    await ensure_default_services(db_session, effective_doctor)
     categories = await get_categories()
 
     builder = InlineKeyboardBuilder()
@@ -831,7 +830,7 @@ async def process_service_back(
     db_session: AsyncSession
 ):
     """Назад к категориям"""
-    await ensure_default_services(db_session, effective_doctor.id)
+    await ensure_default_services(db_session, effective_doctor)
     categories = await get_categories()
 
     builder = InlineKeyboardBuilder()
@@ -964,7 +963,7 @@ async def cancel_existing_appointment(
 
     await notify_appointment_cancelled(callback.bot, db_session, appointment, user.telegram_id)
 
-    appointments = await get_appointments_by_date(db_session, effective_doctor.id, target_date)
+    appointments = await get_schedule_rows(db_session, effective_doctor.id, target_date)
     show_price = effective_doctor.subscription_tier >= 1
     text = await format_schedule_with_contacts(appointments, show_price=show_price)
     if not appointments:
@@ -3,6 +3,7 @@ from aiogram import Router, F
 from aiogram.types import Message, BufferedInputFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database.base import report_session
 from app.database.models import User
 from app.services.export_service import get_patients_with_relations, build_patients_excel
 from app.utils.permissions import can_access, FEATURE_EXPORT
@@ -10,7 +11,7 @@ from app.utils.permissions import can_access, FEATURE_EXPORT
 router = Router(name="export")
 
 
-@router.message(F.text == "📊 Экспорт", flags={"tier": 2})
+@router.message(F.text == "📊 Экспорт", flags={"tier": 2, "throttle_cost": 5})
 async def cmd_export(
     message: Message,
     effective_doctor: User,
@@ -23,7 +24,9 @@ async def cmd_export(
         return
     await message.answer("⏳ Формирую выгрузку…")
     try:
-        patients = await get_patients_with_relations(db_session, effective_doctor.id)
+        # Полная выгрузка — отчётное чтение: с реплики, если она задана
+        async with report_session(db_session) as report_db:
+            patients = await get_patients_with_relations(report_db, effective_doctor.id)
         if not patients:
             await message.answer(
                 "📋 У вас пока нет пациентов.\n"
@@ -1,10 +1,13 @@
 from datetime import datetime, timedelta
+from itertools import groupby
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, BufferedInputFile
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func
+from app.database.base import report_session
 from app.database.models import User, Patient, Treatment, Appointment
+from app.services.read_models import get_debtor_rows
 from app.utils.formatters import format_money, treatment_effective_price
 from app.utils.permissions import can_access, FEATURE_FINANCE
 
@@ -18,11 +21,6 @@ def _treatment_debt(t: Treatment) -> float:
     return max(0, round(eff - paid, 2))
 
 
-def _patient_total_debt(treatments: list[Treatment]) -> float:
-    """Суммарный долг по списку позиций."""
-    return sum(_treatment_debt(t) for t in treatments if t.price is not None)
-
-
 @router.message(F.text == "💰 Финансы", flags={"tier": 2})
 async def cmd_finance(
     message: Message,
@@ -47,6 +45,7 @@ async def cmd_finance(
     builder = InlineKeyboardBuilder()
     builder.button(text="📊 Статистика", callback_data="finance_stats")
     builder.button(text="💵 Оплаты", callback_data="finance_payments")
+    builder.button(text="🧾 Счета за период", callback_data="finance_invoices")
     builder.adjust(1)
 
     await message.answer(
@@ -100,6 +99,10 @@ def _period_range(period_key: str) -> tuple[datetime | None, datetime | None]:
         start = now - timedelta(days=90)
     elif period_key == "month":
         start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    elif period_key == "prev_month":
+        end = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        start = (end - timedelta(days=1)).replace(day=1)
+        return start, end - timedelta(microseconds=1)
     else:
         start = now - timedelta(days=30)
     return start, now
@@ -146,9 +149,6 @@ async def finance_stats_show(
                 Appointment.patient_id.isnot(None),
             )
         )
-    r = await db_session.execute(stmt_patients)
-    patients_count = r.scalar() or 0
-
     # Лечения: за период или все
     if start is not None and end is not None:
         stmt_treatments = select(Treatment).where(
@@ -162,8 +162,11 @@ async def finance_stats_show(
         stmt_treatments = select(Treatment).where(
             Treatment.doctor_id == doctor_id
         ).order_by(Treatment.created_at)
-    res_t = await db_session.execute(stmt_treatments)
-    treatments = list(res_t.scalars().all())
+    # Отчётные чтения — с реплики, если она задана (не нагружают основную БД)
+    async with report_session(db_session) as report_db:
+        patients_count = (await report_db.execute(stmt_patients)).scalar() or 0
+        res_t = await report_db.execute(stmt_treatments)
+        treatments = list(res_t.scalars().all())
 
     # Популярные услуги (по service_name)
     service_counts: dict[str, int] = {}
@@ -232,10 +235,7 @@ async def finance_payments_list(
     if not can_access(assistant_permissions, FEATURE_FINANCE):
         await callback.answer("Нет доступа к разделу «Финансы».", show_alert=True)
         return
-    doctor_id = effective_doctor.id
-    stmt = select(Patient).where(Patient.doctor_id == doctor_id).order_by(Patient.full_name)
-    res = await db_session.execute(stmt)
-    patients = list(res.scalars().all())
+    patients = await get_debtor_rows(db_session, effective_doctor.id)
     if not patients:
         await callback.message.edit_text(
             "💵 **Оплаты**\n\nНет пациентов в базе. Добавьте пациентов в разделе «👥 Пациенты»."
@@ -243,21 +243,10 @@ async def finance_payments_list(
         await callback.answer()
         return
 
-    stmt_t = select(Treatment).where(
-        and_(Treatment.doctor_id == doctor_id)
-    )
-    res_t = await db_session.execute(stmt_t)
-    all_treatments = list(res_t.scalars().all())
-    by_patient: dict[int, list[Treatment]] = {}
-    for t in all_treatments:
-        by_patient.setdefault(t.patient_id, []).append(t)
-
     builder = InlineKeyboardBuilder()
     for p in patients:
-        treatments = by_patient.get(p.id, [])
-        debt = _patient_total_debt(treatments)
-        if debt > 0:
-            label = f"🔴 {p.full_name} — долг {format_money(debt)}"
+        if p.debt > 0:
+            label = f"🔴 {p.full_name} — долг {format_money(p.debt)}"
         else:
             label = f"🟢 {p.full_name}"
         builder.button(text=label, callback_data=f"history_payment_{p.id}")
@@ -274,6 +263,96 @@ async def finance_payments_list(
     await callback.answer()
 
 
+# --- Пакетные счета за период (один ZIP на всех пациентов) ---
+
+async def _invoice_batch_rows(
+    db_session: AsyncSession,
+    doctor_id: int,
+    start: datetime,
+    end: datetime,
+) -> list[tuple[Patient, list[Treatment]]]:
+    """Пациенты с лечением за период — одним запросом, сгруппировано по пациенту."""
+    stmt = (
+        select(Patient, Treatment)
+        .join(Treatment, Treatment.patient_id == Patient.id)
+        .where(
+            and_(
+                Treatment.doctor_id == doctor_id,
+                Patient.doctor_id == doctor_id,
+                Treatment.created_at >= start,
+                Treatment.created_at <= end,
+            )
+        )
+        .order_by(Patient.full_name, Patient.id, Treatment.created_at)
+    )
+    res = await db_session.execute(stmt)
+    return [
+        (patient, [t for _, t in rows])
+        for patient, rows in groupby(res.all(), key=lambda row: row[0])
+    ]
+
+
+@router.callback_query(F.data == "finance_invoices", flags={"tier": 2})
+async def finance_invoices_menu(
+    callback: CallbackQuery,
+    assistant_permissions: dict,
+):
+    """Выбор периода для пакетных счетов (доступ по правам)."""
+    if not can_access(assistant_permissions, FEATURE_FINANCE):
+        await callback.answer("Нет доступа к разделу «Финансы».", show_alert=True)
+        return
+    builder = InlineKeyboardBuilder()
+    builder.button(text="Прошлый месяц", callback_data="finance_invoices_prev_month")
+    builder.button(text="Текущий месяц", callback_data="finance_invoices_month")
+    builder.button(text="За 30 дней", callback_data="finance_invoices_30")
+    builder.button(text="⬅️ Назад", callback_data="finance_back")
+    builder.adjust(1)
+    await callback.message.edit_text(
+        "🧾 **Счета за период**\n\n"
+        "Сформирую PDF-счёт для каждого пациента с лечением за период "
+        "и пришлю одним ZIP-архивом.\n\nВыберите период:",
+        reply_markup=builder.as_markup(),
+    )
+    await callback.answer()
+
+
+@router.callback_query(
+    F.data.regexp(r"^finance_invoices_(prev_month|month|30)$"), flags={"tier": 2, "throttle_cost": 5}
+)
+async def finance_invoices_generate(
+    callback: CallbackQuery,
+    effective_doctor: User,
+    assistant_permissions: dict,
+    db_session: AsyncSession,
+):
+    """Сформировать счета всех пациентов за период и отправить ZIP (доступ по правам)."""
+    if not can_access(assistant_permissions, FEATURE_FINANCE):
+        await callback.answer("Нет доступа к разделу «Финансы».", show_alert=True)
+        return
+    period_key = callback.data.replace("finance_invoices_", "")
+    start, end = _period_range(period_key)
+    invoices = await _invoice_batch_rows(db_session, effective_doctor.id, start, end)
+    if not invoices:
+        await callback.answer("❌ За этот период нет записей лечения", show_alert=True)
+        return
+
+    await callback.answer(f"⏳ Формирую счета: {len(invoices)}")
+    try:
+        from app.services.pdf_generator import generate_invoices_zip
+
+        zip_bytes = await generate_invoices_zip(effective_doctor, invoices)
+        period_str = f"{start.strftime('%d.%m.%Y')}—{end.strftime('%d.%m.%Y')}"
+        await callback.message.answer_document(
+            document=BufferedInputFile(
+                zip_bytes,
+                filename=f"invoices_{start.strftime('%Y%m%d')}_{end.strftime('%Y%m%d')}.zip",
+            ),
+            caption=f"🧾 Счета за {period_str}\n👥 Пациентов: {len(invoices)}",
+        )
+    except Exception as e:
+        await callback.message.answer(f"❌ Ошибка генерации счетов: {e}")
+
+
 @router.callback_query(F.data == "finance_back", flags={"tier": 2})
 async def finance_back(
     callback: CallbackQuery,
@@ -297,6 +376,7 @@ async def finance_back(
     builder = InlineKeyboardBuilder()
     builder.button(text="📊 Статистика", callback_data="finance_stats")
     builder.button(text="💵 Оплаты", callback_data="finance_payments")
+    builder.button(text="🧾 Счета за период", callback_data="finance_invoices")
     builder.adjust(1)
     await callback.message.edit_text(
         f"💰 **Финансовый модуль**\n\n"
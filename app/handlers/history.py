@@ -5,12 +5,13 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
+from sqlalchemy import select, and_
 
 from app.database.models import User, Patient, Treatment
 from app.states.history import HistoryStates
 from app.utils.permissions import can_access, FEATURE_HISTORY, FEATURE_FINANCE
-from app.services.patient_service import get_all_patients
+from app.services.read_models import get_patient_rows
+from app.services.history_service import HISTORY_PAGE_SIZE, HistorySummary, get_history_page, get_history_summary
 from app.services.service_service import (
     get_categories,
     get_services_by_category,
@@ -19,8 +20,6 @@ from app.services.service_service import (
     CATEGORIES,
 )
 from app.utils.formatters import format_money, treatment_effective_price
-import asyncio
-from aiogram.types import BufferedInputFile
 
 router = Router(name="history")
 
@@ -37,7 +36,7 @@ async def cmd_history(
     if not can_access(assistant_permissions, FEATURE_HISTORY):
         await message.answer("Нет доступа к разделу «История болезни».")
         return
-    patients = await get_all_patients(db_session, effective_doctor.id)
+    patients = await get_patient_rows(db_session, effective_doctor.id)
     
     if not patients:
         await message.answer(
@@ -62,104 +61,163 @@ async def cmd_history(
     )
 
 
-@router.callback_query(F.data.startswith("patient_history_"))
-async def view_patient_history(
+# Лимит текста сообщения Telegram — 4096; запас под разметку и хвост страницы
+HISTORY_TEXT_BUDGET = 3800
+_MORE_HINT = "\n\n…продолжение — кнопка «Старее ▶️»"
+
+
+def _format_history_header(summary: HistorySummary, show_money: bool) -> str:
+    """Шапка истории: пациент и сводка по всем записям."""
+    parts = [
+        "📋 **История болезни**",
+        "━━━━━━━━━━━━━━━━━━━━",
+        "",
+        f"👤 Пациент: **{summary.full_name}**",
+    ]
+    if summary.count:
+        parts.append(f"📝 Записей: {summary.count}, последний визит: {summary.last_visit.strftime('%d.%m.%Y')}")
+        if show_money:
+            parts.append(
+                f"💵 Сумма: {format_money(summary.total)}, оплачено {format_money(summary.paid)}"
+                + (f", долг {format_money(summary.debt)}" if summary.debt > 0 else "")
+            )
+    return "\n".join(parts)
+
+
+def _format_treatment(treatment: Treatment, show_money: bool) -> str:
+    """Блок одной записи истории."""
+    lines = [f"\n**{treatment.created_at.strftime('%d.%m.%Y %H:%M')}**"]
+    if treatment.service_name:
+        if show_money and treatment.price is not None:
+            eff = treatment_effective_price(
+                treatment.price, treatment.discount_percent, treatment.discount_amount
+            )
+            price_str = f" — {format_money(eff)}"
+            if (treatment.discount_percent or treatment.discount_amount):
+                price_str += " (со скидкой)"
+            paid = treatment.paid_amount or 0
+            if paid > 0:
+                price_str += f", оплачено {format_money(paid)}"
+            status = treatment.payment_status or "debt"
+            if status == "full":
+                price_str += " ✅"
+            elif status == "partial":
+                price_str += " ⏳"
+            else:
+                price_str += " 💳"
+            lines.append(f"   🏥 Услуга: {treatment.service_name}{price_str}")
+        else:
+            lines.append(f"   🏥 Услуга: {treatment.service_name}")
+    if treatment.treatment_notes:
+        lines.append(f"   📝 {treatment.treatment_notes}")
+    if treatment.tooth_number:
+        lines.append(f"   🦷 Зуб: {treatment.tooth_number}")
+    return "\n".join(lines)
+
+
+def render_history_page(
+    header: str,
+    treatments: list[Treatment],
+    show_money: bool,
+    budget: int = HISTORY_TEXT_BUDGET,
+) -> tuple[str, int]:
+    """Текст страницы и число вошедших записей: записи добавляются, пока текст укладывается в budget.
+
+    Первая запись входит всегда (длинный комментарий обрезается), чтобы страница не была пустой.
+    """
+    used = len(header) + len(_MORE_HINT)
+    blocks: list[str] = []
+    for treatment in treatments:
+        block = _format_treatment(treatment, show_money)
+        if used + len(block) > budget:
+            if blocks:
+                break
+            block = block[: max(0, budget - used - 1)] + "…"
+        blocks.append(block)
+        used += len(block)
+    return header + "\n" + "".join(blocks), len(blocks)
+
+
+async def _show_history_page(
     callback: CallbackQuery,
     effective_doctor: User,
-    assistant_permissions: dict,
-    state: FSMContext,
-    db_session: AsyncSession
+    db_session: AsyncSession,
+    patient_id: int,
+    after_id: int | None,
 ):
-    """Просмотр истории болезни пациента (доступ по правам, данные врача)."""
-    if not can_access(assistant_permissions, FEATURE_HISTORY):
-        await callback.answer("Нет доступа к разделу «История болезни».", show_alert=True)
-        return
-    await state.clear()
-    patient_id = int(callback.data.replace("patient_history_", ""))
-    
-    stmt = select(Patient).where(
-        and_(
-            Patient.id == patient_id,
-            Patient.doctor_id == effective_doctor.id
-        )
-    )
-    result = await db_session.execute(stmt)
-    patient = result.scalar_one_or_none()
-    
-    if not patient:
+    """Страница истории: сводка (агрегат) + записи после after_id по keyset-курсору."""
+    summary = await get_history_summary(db_session, effective_doctor.id, patient_id)
+    if not summary:
         await callback.answer("❌ Пациент не найден", show_alert=True)
         return
-    
-    stmt = select(Treatment).where(
-        and_(
-            Treatment.patient_id == patient_id,
-            Treatment.doctor_id == effective_doctor.id
-        )
-    ).order_by(desc(Treatment.created_at))
-    
-    result = await db_session.execute(stmt)
-    treatments = list(result.scalars().all())
-    
-    # Формируем текст истории
-    text_parts = []
-    text_parts.append(f"📋 **История болезни**\n")
-    text_parts.append(f"━━━━━━━━━━━━━━━━━━━━")
-    text_parts.append(f"")
-    text_parts.append(f"👤 Пациент: **{patient.full_name}**\n")
-    
-    if treatments:
-        text_parts.append(f"📝 **Записи:** ({len(treatments)})\n")
-        for i, treatment in enumerate(treatments, 1):
-            date_str = treatment.created_at.strftime("%d.%m.%Y %H:%M")
-            text_parts.append(f"\n**{i}. {date_str}**")
-            
-            if treatment.service_name:
-                if effective_doctor.subscription_tier >= 2 and treatment.price is not None:
-                    eff = treatment_effective_price(
-                        treatment.price, treatment.discount_percent, treatment.discount_amount
-                    )
-                    price_str = f" — {format_money(eff)}"
-                    if (treatment.discount_percent or treatment.discount_amount):
-                        price_str += " (со скидкой)"
-                    paid = treatment.paid_amount or 0
-                    if paid > 0:
-                        price_str += f", оплачено {format_money(paid)}"
-                    status = treatment.payment_status or "debt"
-                    if status == "full":
-                        price_str += " ✅"
-                    elif status == "partial":
-                        price_str += " ⏳"
-                    else:
-                        price_str += " 💳"
-                    text_parts.append(f"   🏥 Услуга: {treatment.service_name}{price_str}")
-                else:
-                    price_str = f" — {format_money(treatment.price)}" if treatment.price is not None and effective_doctor.subscription_tier >= 2 else ""
-                    text_parts.append(f"   🏥 Услуга: {treatment.service_name}{price_str}")
-            if treatment.treatment_notes:
-                text_parts.append(f"   📝 {treatment.treatment_notes}")
-            if treatment.tooth_number:
-                text_parts.append(f"   🦷 Зуб: {treatment.tooth_number}")
+
+    show_money = effective_doctor.subscription_tier >= 2
+    header = _format_history_header(summary, show_money)
+    treatments = await get_history_page(db_session, effective_doctor.id, patient_id, after_id) if summary.count else []
+    page = treatments[:HISTORY_PAGE_SIZE]
+    if page:
+        text, shown = render_history_page(header, page, show_money)
+        has_more = shown < len(treatments)
+        if has_more:
+            text += _MORE_HINT
     else:
-        text_parts.append(f"\n📝 Записей пока нет.")
-    
+        text = header + ("\n\n📝 Записей пока нет." if not summary.count else "\n\n📝 Более ранних записей нет.")
+        has_more = False
+
     builder = InlineKeyboardBuilder()
+    if has_more:
+        builder.button(text="Старее ▶️", callback_data=f"history_page_{patient_id}_{page[shown - 1].id}")
+    if after_id is not None:
+        builder.button(text="⏮ К последним", callback_data=f"history_page_{patient_id}_0")
     builder.button(text="➕ Добавить запись", callback_data=f"history_add_{patient_id}")
     builder.button(text="🔩 Добавить имплант", callback_data=f"implant_add_{patient_id}")
     builder.button(text="📄 Имплантологическая карта", callback_data=f"implant_card_{patient_id}")
-    if effective_doctor.subscription_tier >= 2:
+    if show_money:
         builder.button(text="💰 Счёт (PDF)", callback_data=f"history_invoice_{patient_id}")
         builder.button(text="💵 Внести оплату", callback_data=f"history_payment_{patient_id}")
     builder.button(text="◀️ Назад", callback_data=f"patient_view_{patient_id}")
     builder.adjust(1)
-    
+
     await callback.message.edit_text(
-        "\n".join(text_parts),
+        text,
         reply_markup=builder.as_markup()
     )
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("history_invoice_"), flags={"tier": 2})
+@router.callback_query(F.data.startswith("patient_history_"))
+async def view_patient_history(
+    callback: CallbackQuery,
+    effective_doctor: User,
+    assistant_permissions: dict,
+    state: FSMContext,
+    db_session: AsyncSession
+):
+    """Просмотр истории болезни пациента (доступ по правам, данные врача)."""
+    if not can_access(assistant_permissions, FEATURE_HISTORY):
+        await callback.answer("Нет доступа к разделу «История болезни».", show_alert=True)
+        return
+    await state.clear()
+    patient_id = int(callback.data.replace("patient_history_", ""))
+    await _show_history_page(callback, effective_doctor, db_session, patient_id, None)
+
+
+@router.callback_query(F.data.regexp(r"^history_page_\d+_\d+$"))
+async def history_page(
+    callback: CallbackQuery,
+    effective_doctor: User,
+    assistant_permissions: dict,
+    db_session: AsyncSession
+):
+    """Следующая страница истории (курсор — id последней показанной записи, 0 — с начала)."""
+    if not can_access(assistant_permissions, FEATURE_HISTORY):
+        await callback.answer("Нет доступа к разделу «История болезни».", show_alert=True)
+        return
+    patient_id, after_id = map(int, callback.data.replace("history_page_", "").split("_"))
+    await _show_history_page(callback, effective_doctor, db_session, patient_id, after_id or None)
+
+
+@router.callback_query(F.data.startswith("history_invoice_"), flags={"tier": 2, "throttle_cost": 3})
 async def generate_history_invoice(
     callback: CallbackQuery,
     effective_doctor: User,
@@ -197,18 +255,15 @@ async def generate_history_invoice(
 
     try:
         from app.services.pdf_generator import generate_invoice_pdf
-
-        pdf_bytes = await asyncio.to_thread(
-            generate_invoice_pdf,
-            effective_doctor, patient, treatments
-        )
-        pdf_file = BufferedInputFile(
-            pdf_bytes,
-            filename=f"invoice_{patient.full_name.replace(' ', '_')}.pdf"
-        )
-        await callback.message.answer_document(
-            document=pdf_file,
-            caption=f"💰 Счёт для пациента {patient.full_name}"
+        from app.services.pdf_cache import invoice_cache_key, send_cached_pdf
+
+        # Повторный запрос без изменений — из кэша (PDF или file_id Telegram)
+        await send_cached_pdf(
+            callback.message,
+            invoice_cache_key(effective_doctor, patient, treatments),
+            lambda: generate_invoice_pdf(effective_doctor, patient, treatments),
+            filename=f"invoice_{patient.full_name.replace(' ', '_')}.pdf",
+            caption=f"💰 Счёт для пациента {patient.full_name}",
         )
         await callback.answer("✅ Счёт сгенерирован")
     except Exception as e:
@@ -230,7 +285,7 @@ async def start_add_history_entry(
     patient_id = int(callback.data.replace("history_add_", ""))
     await state.update_data(history_patient_id=patient_id)
 
-    await ensure_default_services(db_session, effective_doctor.id)
+    await ensure_default_services(db_session, effective_doctor)
     categories = await get_categories()
 
     builder = InlineKeyboardBuilder()
@@ -303,7 +358,7 @@ async def history_back_to_categories(
     """Назад к выбору категории (данные врача)."""
     patient_id = int(callback.data.replace("history_back_", ""))
     await state.update_data(history_patient_id=patient_id)
-    await ensure_default_services(db_session, effective_doctor.id)
+    await ensure_default_services(db_session, effective_doctor)
     categories = await get_categories()
 
     builder = InlineKeyboardBuilder()
@@ -400,7 +400,7 @@ async def implant_done(callback: CallbackQuery, assistant_permissions: dict, sta
 
 
 # Генерация PDF
-@router.callback_query(F.data.startswith("implant_card_"), flags={"tier": 1})
+@router.callback_query(F.data.startswith("implant_card_"), flags={"tier": 1, "throttle_cost": 3})
 async def generate_implant_card(
     callback: CallbackQuery,
     effective_doctor: User,
@@ -437,25 +437,17 @@ async def generate_implant_card(
         await callback.answer("❌ Нет данных об имплантации", show_alert=True)
         return
 
-    import asyncio
-    from aiogram.types import BufferedInputFile
-
     try:
         from app.services.pdf_generator import generate_implant_card_pdf
-
-        pdf_bytes = await asyncio.to_thread(
-            generate_implant_card_pdf,
-            user, patient, implants
-        )
-
-        pdf_file = BufferedInputFile(
-            pdf_bytes,
-            filename=f"implant_card_{patient.full_name.replace(' ', '_')}.pdf"
-        )
-
-        await callback.message.answer_document(
-            document=pdf_file,
-            caption=f"📄 Карта имплантации пациента {patient.full_name}"
+        from app.services.pdf_cache import implant_card_cache_key, send_cached_pdf
+
+        # Повторный запрос без изменений — из кэша (PDF или file_id Telegram)
+        await send_cached_pdf(
+            callback.message,
+            implant_card_cache_key(effective_doctor, patient, implants),
+            lambda: generate_implant_card_pdf(effective_doctor, patient, implants),
+            filename=f"implant_card_{patient.full_name.replace(' ', '_')}.pdf",
+            caption=f"📄 Карта имплантации пациента {patient.full_name}",
         )
         await callback.answer("✅ PDF карта сгенерирована")
     except Exception as e:
@@ -8,7 +8,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import User, Patient
 from app.states.patient import PatientStates
-from app.services.patient_service import search_patients, get_patient_by_id, get_all_patients
+from app.services.patient_service import search_patients, get_patient_by_id
+from app.services.read_models import get_patient_rows
 from app.keyboards.main import get_cancel_keyboard
 from app.states.appointment import AppointmentStates
 from app.utils.permissions import can_access, FEATURE_PATIENTS
@@ -225,7 +226,7 @@ async def list_patients(
     if not can_access(assistant_permissions, FEATURE_PATIENTS):
         await callback.answer("Нет доступа к разделу «Пациенты».", show_alert=True)
         return
-    patients = await get_all_patients(db_session, effective_doctor.id)
+    patients = await get_patient_rows(db_session, effective_doctor.id)
     
     if not patients:
         await callback.message.edit_text("📋 Список пациентов пуст.")
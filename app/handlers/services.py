@@ -16,8 +16,10 @@ from app.services.service_service import (
     get_services_by_category,
     ensure_default_services,
     get_service_by_id,
+    invalidate_service_catalog,
     CATEGORIES,
 )
+from app.services.fuzzy_index import invalidate_services
 from app.keyboards.main import get_main_menu_keyboard
 
 router = Router(name="services")
@@ -42,7 +44,7 @@ async def cmd_price_list(
     if not can_access(assistant_permissions, FEATURE_SERVICES):
         await message.answer("Нет доступа к разделу «Прайс-лист».")
         return
-    await ensure_default_services(db_session, effective_doctor.id)
+    await ensure_default_services(db_session, effective_doctor)
     categories = await get_categories()
 
     builder = InlineKeyboardBuilder()
@@ -103,7 +105,7 @@ async def price_list_category(
 @router.callback_query(F.data == "price_back")
 async def price_back(callback: CallbackQuery, effective_doctor: User, db_session: AsyncSession):
     """Назад к списку категорий (данные врача)."""
-    await ensure_default_services(db_session, effective_doctor.id)
+    await ensure_default_services(db_session, effective_doctor)
     categories = await get_categories()
 
     builder = InlineKeyboardBuilder()
@@ -242,6 +244,9 @@ async def price_delete_service(
     )
     await db_session.execute(stmt)
     await db_session.commit()
+    # Массовый DELETE не вызывает ORM-события — сбрасываем каталог и индекс голосовой записи явно
+    invalidate_service_catalog(effective_doctor.id)
+    invalidate_services(effective_doctor.id)
     await state.clear()
 
     services = await get_services_by_category(db_session, effective_doctor.id, category)
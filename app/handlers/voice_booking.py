@@ -2,9 +2,11 @@
 Голосовая/фото запись на приём (только для админов).
 Админ отправляет голосовое или скриншот → бот распознаёт → ищет пациента → подтверждает запись.
 """
-import io
+import asyncio
 import logging
+from dataclasses import dataclass
 from datetime import datetime, date, timedelta
+from typing import Any, Coroutine, Optional
 
 from aiogram import Router, F
 from aiogram.filters import StateFilter
@@ -17,21 +19,26 @@ from sqlalchemy import select, and_
 from app.config import Config
 from app.database.models import User, Patient, Appointment, Treatment, Service
 from app.states.voice_booking import VoiceBookingStates
-from app.services.patient_service import search_patients
+from app.services.patient_service import PatientRef
+from app.services.fuzzy_index import FuzzyIndex, get_patient_index, get_service_index
 from app.services.notification_service import notify_new_appointment
 from app.services.service_service import (
     ensure_default_services,
     get_categories,
     get_services_by_category,
+    ServiceRef,
     CATEGORIES,
 )
 from app.services.ai_service import (
     transcribe_voice,
     parse_image_for_booking,
     parse_booking_text,
+    get_cached_transcription,
+    get_cached_image_text,
     ParsedBooking,
 )
 from app.utils.formatters import format_money
+from app.utils.stage_timer import StageTimer
 
 router = Router(name="voice_booking")
 logger = logging.getLogger(__name__)
@@ -43,7 +50,7 @@ def _is_admin(telegram_id: int) -> bool:
 
 # ── 1. Приём голосового сообщения ──────────────────────────────────────
 
-@router.message(F.voice)
+@router.message(F.voice, flags={"throttle_cost": 3})
 async def handle_voice(
     message: Message,
     user: User,
@@ -60,26 +67,25 @@ async def handle_voice(
         return
 
     status_msg = await message.answer("🎙 Распознаю голосовое сообщение...")
+    timer = StageTimer("voice booking")
+
+    async def recognize() -> str:
+        # Повторно пересланное голосовое — транскрипция из кэша, без скачивания
+        file_unique_id = message.voice.file_unique_id
+        text = get_cached_transcription(file_unique_id)
+        if text is not None:
+            return text
+        with timer.stage("download"):
+            voice_data = await message.bot.download(message.voice)
+        with timer.stage("transcribe"):
+            # Буфер скачивания уходит в Whisper как есть, без копии в bytes
+            return await transcribe_voice(voice_data, cache_key=file_unique_id)
 
     try:
-        # Скачиваем файл
-        voice_file = await message.bot.get_file(message.voice.file_id)
-        voice_data = io.BytesIO()
-        await message.bot.download_file(voice_file.file_path, voice_data)
-        voice_bytes = voice_data.getvalue()
-
-        # Транскрипция
-        text = await transcribe_voice(voice_bytes)
-        if not text:
-            await status_msg.edit_text("❌ Не удалось распознать речь. Попробуйте ещё раз.")
-            return
-
-        # Парсинг
-        parsed = await parse_booking_text(text)
-        await status_msg.edit_text(f"🎙 Распознано: «{text}»\n\n⏳ Обрабатываю...")
-
-        await _process_parsed_booking(message, effective_doctor, state, db_session, parsed, status_msg)
-
+        await _recognize_and_process(
+            message, effective_doctor, state, db_session, status_msg, timer, recognize(), "🎙",
+            "❌ Не удалось распознать речь. Попробуйте ещё раз.",
+        )
     except Exception as e:
         logger.exception("Voice booking error: %s", e)
         await status_msg.edit_text(f"❌ Ошибка при обработке голосового: {e}")
@@ -87,7 +93,7 @@ async def handle_voice(
 
 # ── 2. Приём фото/скриншота ────────────────────────────────────────────
 
-@router.message(F.photo)
+@router.message(F.photo, flags={"throttle_cost": 3})
 async def handle_photo(
     message: Message,
     user: User,
@@ -104,32 +110,90 @@ async def handle_photo(
         return
 
     status_msg = await message.answer("📸 Обрабатываю изображение...")
+    timer = StageTimer("photo booking")
 
-    try:
+    async def recognize() -> str:
         # Берём наибольшее фото
         photo = message.photo[-1]
-        file = await message.bot.get_file(photo.file_id)
-        photo_data = io.BytesIO()
-        await message.bot.download_file(file.file_path, photo_data)
-        photo_bytes = photo_data.getvalue()
-
-        # Распознаём текст с изображения
-        text = await parse_image_for_booking(photo_bytes)
-        if not text:
-            await status_msg.edit_text("❌ Не удалось распознать данные с изображения.")
-            return
-
-        # Парсинг
-        parsed = await parse_booking_text(text)
-        await status_msg.edit_text(f"📸 Распознано: «{text}»\n\n⏳ Обрабатываю...")
-
-        await _process_parsed_booking(message, effective_doctor, state, db_session, parsed, status_msg)
+        text = get_cached_image_text(photo.file_unique_id)
+        if text is not None:
+            return text
+        with timer.stage("download"):
+            photo_data = await message.bot.download(photo)
+        with timer.stage("vision"):
+            # Распознаём текст с изображения
+            return await parse_image_for_booking(photo_data.getvalue(), cache_key=photo.file_unique_id)
 
+    try:
+        await _recognize_and_process(
+            message, effective_doctor, state, db_session, status_msg, timer, recognize(), "📸",
+            "❌ Не удалось распознать данные с изображения.",
+        )
     except Exception as e:
         logger.exception("Photo booking error: %s", e)
         await status_msg.edit_text(f"❌ Ошибка при обработке изображения: {e}")
 
 
+@dataclass
+class _BookingIndex:
+    """Данные врача, нужные после распознавания: индексы услуг и пациентов."""
+    services: FuzzyIndex[ServiceRef]
+    patients: FuzzyIndex[PatientRef]
+
+
+async def _prefetch_index(db_session: AsyncSession, doctor_id: int, timer: StageTimer) -> _BookingIndex:
+    # Индексы закэшированы на врача — запросы в БД только при первом обращении/после правок
+    with timer.stage("prefetch"):
+        services = await get_service_index(db_session, doctor_id)
+        patients = await get_patient_index(db_session, doctor_id)
+    return _BookingIndex(services, patients)
+
+
+async def _recognize_and_process(
+    message: Message,
+    effective_doctor: User,
+    state: FSMContext,
+    db_session: AsyncSession,
+    status_msg: Message,
+    timer: StageTimer,
+    recognize: Coroutine[Any, Any, str],
+    icon: str,
+    empty_error: str,
+):
+    """Распознавание (скачивание + Whisper/Vision) параллельно с загрузкой прайса и имён из БД.
+
+    Пока идёт запрос в OpenAI, сессия БД свободна — индекс готов к моменту разбора,
+    и пациент сопоставляется в памяти сразу после получения имени.
+    """
+    prefetch = asyncio.create_task(_prefetch_index(db_session, effective_doctor.id, timer))
+    try:
+        text = await recognize
+    except BaseException:
+        prefetch.cancel()
+        await asyncio.gather(prefetch, return_exceptions=True)
+        raise
+    if not text:
+        prefetch.cancel()
+        await asyncio.gather(prefetch, return_exceptions=True)
+        await status_msg.edit_text(empty_error)
+        return
+    index = await prefetch
+
+    # Парсинг (простые фразы — локально по прайсу врача, сложные — GPT)
+    with timer.stage("parse"):
+        parsed = await parse_booking_text(text, [svc.name for svc in index.services.items])
+    candidates = None
+    if parsed.patient_name:
+        with timer.stage("match"):
+            candidates = index.patients.search(parsed.patient_name)
+    await status_msg.edit_text(f"{icon} Распознано: «{text}»\n\n⏳ Обрабатываю...")
+
+    await _process_parsed_booking(
+        message, effective_doctor, state, db_session, parsed, status_msg, candidates
+    )
+    logger.info(timer.summary())
+
+
 # ── 3. Общая логика после парсинга ─────────────────────────────────────
 
 async def _process_parsed_booking(
@@ -139,8 +203,12 @@ async def _process_parsed_booking(
     db_session: AsyncSession,
     parsed: ParsedBooking,
     status_msg: Message,
+    candidates: Optional[list[PatientRef]] = None,
 ):
-    """Обработка результата парсинга: поиск пациента, проверка полей."""
+    """Обработка результата парсинга: поиск пациента, проверка полей.
+
+    candidates — пациенты, уже найденные по индексу в памяти (иначе поиск в БД).
+    """
     # Сохраняем данные в FSM
     await state.update_data(
         vb_patient_name=parsed.patient_name,
@@ -182,7 +250,9 @@ async def _process_parsed_booking(
             return
 
     # Всё распознано — ищем пациента
-    await _search_patient_and_continue(message, effective_doctor, state, db_session, status_msg)
+    await _search_patient_and_continue(
+        message, effective_doctor, state, db_session, status_msg, candidates
+    )
 
 
 async def _search_patient_and_continue(
@@ -191,12 +261,17 @@ async def _search_patient_and_continue(
     state: FSMContext,
     db_session: AsyncSession,
     status_msg: Message,
+    candidates: Optional[list[PatientRef]] = None,
 ):
-    """Поиск пациента в БД и продолжение."""
+    """Нечёткий поиск пациента по индексу врача (или готовые candidates) и продолжение."""
     data = await state.get_data()
     patient_name = data.get("vb_patient_name", "")
 
-    patients = await search_patients(db_session, effective_doctor.id, patient_name)
+    if candidates is not None:
+        patients = candidates
+    else:
+        index = await get_patient_index(db_session, effective_doctor.id)
+        patients = index.search(patient_name)
 
     if len(patients) == 1:
         # Один пациент — продолжаем
@@ -280,21 +355,10 @@ async def _search_services_by_text(
     db_session: AsyncSession,
     doctor_id: int,
     query: str,
-) -> list[Service]:
-    """Поиск услуг врача по подстроке в названии."""
-    pattern = f"%{query}%"
-    stmt = (
-        select(Service)
-        .where(
-            and_(
-                Service.doctor_id == doctor_id,
-                Service.name.ilike(pattern),
-            )
-        )
-        .order_by(Service.category, Service.sort_order)
-    )
-    result = await db_session.execute(stmt)
-    return list(result.scalars().all())
+) -> list[ServiceRef]:
+    """Нечёткий поиск услуг врача по названию (падежи, опечатки распознавания)."""
+    index = await get_service_index(db_session, doctor_id)
+    return index.search(query)
 
 
 async def _match_service_and_continue(
@@ -307,10 +371,10 @@ async def _match_service_and_continue(
     data = await state.get_data()
     service_text = data.get("vb_service_text")  # из распознавания
 
-    await ensure_default_services(db_session, effective_doctor.id)
+    await ensure_default_services(db_session, effective_doctor)
 
     if service_text:
-        # Ищем по подстроке
+        # Ищем по прайсу (нечётко)
         matches = await _search_services_by_text(db_session, effective_doctor.id, service_text)
 
         if len(matches) == 1:
@@ -602,7 +666,12 @@ async def handle_date_input(
                 continue
 
         if not parsed_date:
-            # Пробуем через GPT (дни недели и т.д.)
+            # Дни недели, «15 марта» — локальными правилами
+            from app.services.booking_parser import parse_date
+            parsed_date = parse_date(text, today)
+
+        if not parsed_date:
+            # Пробуем через GPT (всё остальное)
             try:
                 from app.services.ai_service import parse_booking_text
                 result = await parse_booking_text(f"запись на {text}")
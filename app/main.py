@@ -9,10 +9,14 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import ErrorEvent
 
 from app.config import Config
-from app.database.base import init_db, close_db, async_session_maker
+from app.database.base import init_db, close_db, async_session_maker, engine, replica_engine
 from app.middleware.throttle import ThrottleMiddleware
 from app.middleware.user import UserMiddleware
 from app.middleware.subscription import SubscriptionMiddleware
+from app.middleware.outbound import OutboundCounterMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.tracing import TracingMiddleware, traced
+from app.middleware.sql_profiler import SQL_PROFILE, SqlProfilerMiddleware
 
 # Импорты роутеров
 from app.handlers import start, menu, settings, business_card, calendar, patients, history, implant, finance, services, admin, export, subscription, team, voice_booking, fallback
@@ -21,6 +25,8 @@ from app.services.reminder_service import (
     format_reminder_message,
 )
 from app.services.error_monitor import error_monitor
+from app.services import health_state
+from app.services.metrics import install_db_metrics, start_metrics_server
 
 # Настройка логирования
 logging.basicConfig(
@@ -30,57 +36,29 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    """Главная функция запуска бота"""
-    # Валидация конфигурации
-    try:
-        Config.validate()
-    except ValueError as e:
-        logger.error(f"Ошибка конфигурации: {e}")
-        return
-
-    # Для сверки с админкой: тот же BOT_TOKEN должен быть в сервисе админки
-    _t = Config.BOT_TOKEN
-    _mask = f"{_t[:8]}...{_t[-4:]} (len={len(_t)})" if _t and len(_t) >= 12 else "(короткий)"
-    logger.info("BOT_TOKEN для сверки с админкой: %s", _mask)
-    _url = (getattr(Config, "ADMIN_WEBAPP_URL", None) or "").strip()
-    if _url:
-        try:
-            from urllib.parse import urlparse
-            _host = urlparse(_url).netloc or _url[:50]
-        except Exception:
-            _host = _url[:50]
-        logger.info("ADMIN_WEBAPP_URL для кнопки админки: host=%s", _host)
-    else:
-        logger.warning("ADMIN_WEBAPP_URL не задан — кнопка «Админка (Web App)» не будет показана")
+def create_dispatcher() -> Dispatcher:
+    """Диспетчер со всеми middleware, роутерами и обработчиком ошибок.
 
-    # Инициализация БД
-    try:
-        await init_db()
-        logger.info("База данных инициализирована")
-    except Exception as e:
-        logger.error(f"Ошибка инициализации БД: {e}")
-        return
-    
-    # Redis для rate limiting (опционально)
-    if Config.REDIS_URL:
-        from app.middleware.throttle import init_redis
-        await init_redis(Config.REDIS_URL)
-
-    # Создание бота и диспетчера
-    bot = Bot(
-        token=Config.BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN)
-    )
+    Роутеры — синглтоны модулей, поэтому в процессе вызывается один раз
+    (бот или нагрузочный стенд benchmarks.load_bot).
+    """
     dp = Dispatcher(storage=MemoryStorage())
 
-    # Регистрация middleware
-    dp.message.middleware(ThrottleMiddleware(rate=5, period=10))
-    dp.callback_query.middleware(ThrottleMiddleware(rate=10, period=10))
-    dp.message.middleware(UserMiddleware())
-    dp.callback_query.middleware(UserMiddleware())
-    dp.message.middleware(SubscriptionMiddleware())
-    dp.callback_query.middleware(SubscriptionMiddleware())
+    # Регистрация middleware (метрики и трасса — первыми, чтобы замер включал остальные)
+    dp.message.middleware(MetricsMiddleware("message"))
+    dp.callback_query.middleware(MetricsMiddleware("callback_query"))
+    dp.message.middleware(TracingMiddleware())
+    dp.callback_query.middleware(TracingMiddleware())
+    if SQL_PROFILE:
+        dp.message.middleware(SqlProfilerMiddleware())
+        dp.callback_query.middleware(SqlProfilerMiddleware())
+        logger.info("SQL-профилировщик апдейтов включён (SQL_PROFILE)")
+    dp.message.middleware(traced("throttle", ThrottleMiddleware(rate=5, period=10, key_prefix="throttle:msg")))
+    dp.callback_query.middleware(traced("throttle", ThrottleMiddleware(rate=10, period=10, key_prefix="throttle:cb")))
+    dp.message.middleware(traced("user", UserMiddleware()))
+    dp.callback_query.middleware(traced("user", UserMiddleware()))
+    dp.message.middleware(traced("subscription", SubscriptionMiddleware()))
+    dp.callback_query.middleware(traced("subscription", SubscriptionMiddleware()))
     
     # Регистрация роутеров
     dp.include_router(start.router)
@@ -148,6 +126,64 @@ async def main():
             logger.exception("Не удалось отправить сообщение об ошибке пользователю: %s", e)
         return True
 
+    return dp
+
+
+async def main():
+    """Главная функция запуска бота"""
+    # Валидация конфигурации
+    try:
+        Config.validate()
+    except ValueError as e:
+        logger.error(f"Ошибка конфигурации: {e}")
+        return
+
+    # Для сверки с админкой: тот же BOT_TOKEN должен быть в сервисе админки
+    _t = Config.BOT_TOKEN
+    _mask = f"{_t[:8]}...{_t[-4:]} (len={len(_t)})" if _t and len(_t) >= 12 else "(короткий)"
+    logger.info("BOT_TOKEN для сверки с админкой: %s", _mask)
+    _url = (getattr(Config, "ADMIN_WEBAPP_URL", None) or "").strip()
+    if _url:
+        try:
+            from urllib.parse import urlparse
+            _host = urlparse(_url).netloc or _url[:50]
+        except Exception:
+            _host = _url[:50]
+        logger.info("ADMIN_WEBAPP_URL для кнопки админки: host=%s", _host)
+    else:
+        logger.warning("ADMIN_WEBAPP_URL не задан — кнопка «Админка (Web App)» не будет показана")
+
+    # Инициализация БД
+    try:
+        await init_db()
+        logger.info("База данных инициализирована")
+    except Exception as e:
+        logger.error(f"Ошибка инициализации БД: {e}")
+        return
+    
+    # Предкомпиляция PDF-шаблонов (и шрифтов, если PDF_WARMUP_FONTS)
+    try:
+        from app.services.pdf_generator import warm_up as pdf_warm_up
+        await asyncio.to_thread(pdf_warm_up, Config.PDF_WARMUP_FONTS)
+    except Exception as e:
+        logger.warning("PDF warm-up не выполнен: %s", e)
+
+    # Redis для rate limiting (опционально)
+    if Config.REDIS_URL:
+        from app.middleware.throttle import init_redis
+        await init_redis(Config.REDIS_URL)
+
+    # Создание бота и диспетчера
+    bot = Bot(
+        token=Config.BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN)
+    )
+    bot.session.middleware(OutboundCounterMiddleware())
+    install_db_metrics(engine)
+    if replica_engine is not None:
+        install_db_metrics(replica_engine, pool="replica")
+    dp = create_dispatcher()
+
     logger.info("Бот запущен")
 
     # Запуск мониторинга ошибок
@@ -161,6 +197,7 @@ async def main():
         while True:
             try:
                 await asyncio.sleep(60)
+                health_state.loop_tick("reminders", 60)
                 async with async_session_maker() as db_session:
                     due = await get_appointments_due_for_reminder(db_session)
                     for apt, doctor, reminder_mins in due:
@@ -205,6 +242,15 @@ async def main():
     from app.services.backup_service import backup_scheduler
     backup_task = asyncio.create_task(backup_scheduler(bot))
 
+    # Снимок состояния фоновых задач для /health/deep веб-админки
+    health_state.loop_tick("reminders", 60)
+    health_task = asyncio.create_task(health_state.state_writer())
+    try:
+        metrics_runner = await start_metrics_server()
+    except OSError as e:
+        logger.warning("Сервер метрик бота не запущен: %s", e)
+        metrics_runner = None
+
     # Запуск polling
     try:
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
@@ -213,6 +259,7 @@ async def main():
     finally:
         reminder_task.cancel()
         backup_task.cancel()
+        health_task.cancel()
         try:
             await reminder_task
         except asyncio.CancelledError:
@@ -221,7 +268,15 @@ async def main():
             await backup_task
         except asyncio.CancelledError:
             pass
+        try:
+            await health_task
+        except asyncio.CancelledError:
+            pass
+        if metrics_runner:
+            await metrics_runner.cleanup()
         await error_monitor.stop()
+        from app.services.pdf_generator import shutdown_batch_pool
+        shutdown_batch_pool()
         from app.middleware.throttle import close_redis
         await close_redis()
         await close_db()
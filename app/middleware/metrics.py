@@ -0,0 +1,55 @@
+"""Метрики апдейтов: время обработки по хендлеру и префиксу callback, SQL на апдейт."""
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+
+from app.services.metrics import HANDLER_SECONDS, UPDATE_DB_QUERIES, UPDATE_DB_SECONDS, track_db_usage
+
+_MAX_PREFIX_PARTS = 3
+
+
+def callback_prefix(data: Optional[str]) -> str:
+    """Префикс callback_data без id и дат: «appt_cancel_15» → «appt_cancel»."""
+    parts = []
+    for part in (data or "").replace(":", "_").split("_"):
+        if not part or any(ch.isdigit() for ch in part) or len(parts) == _MAX_PREFIX_PARTS:
+            break
+        parts.append(part)
+    return "_".join(parts) or "-"
+
+
+def handler_name(data: Dict[str, Any]) -> str:
+    """«модуль.функция» хендлера, выбранного роутером (calendar.show_day)."""
+    handler = data.get("handler")
+    callback = getattr(handler, "callback", None)
+    if callback is None:
+        return "unknown"
+    module = getattr(callback, "__module__", "") or ""
+    return f"{module.rsplit('.', 1)[-1]}.{getattr(callback, '__qualname__', callback.__class__.__name__)}"
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Регистрируется первым среди внутренних middleware — замер включает throttle/user/subscription."""
+
+    def __init__(self, event_type: str):
+        self.event_type = event_type
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = handler_name(data)
+        prefix = callback_prefix(event.data) if isinstance(event, CallbackQuery) else "-"
+        start = time.perf_counter()
+        with track_db_usage() as usage:
+            try:
+                return await handler(event, data)
+            finally:
+                HANDLER_SECONDS.observe(time.perf_counter() - start,
+                                        handler=name, event=self.event_type, callback=prefix)
+                UPDATE_DB_QUERIES.observe(usage.queries, handler=name)
+                UPDATE_DB_SECONDS.observe(usage.seconds, handler=name)
@@ -0,0 +1,42 @@
+"""Учёт исходящих запросов к Bot API: в полёте и ошибки (/health/deep), длительность (/metrics, трасса апдейта)."""
+import time
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from app.middleware.tracing import TELEGRAM_STAGE, add_stage
+from app.services.health_state import outbound
+from app.services.metrics import TELEGRAM_FAILURES, TELEGRAM_SECONDS
+
+
+class OutboundCounterMiddleware(BaseRequestMiddleware):
+    """Request-middleware сессии бота: считает запросы, ожидающие ответа Telegram.
+
+    Рост in_flight — очередь отправки (flood-лимиты, медленная сеть).
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        outbound["in_flight"] += 1
+        outbound["peak"] = max(outbound["peak"], outbound["in_flight"])
+        start = time.perf_counter()
+        try:
+            response = await make_request(bot, method)
+        except Exception as e:
+            outbound["failed"] += 1
+            TELEGRAM_FAILURES.inc(method=name, error=type(e).__name__)
+            raise
+        finally:
+            outbound["in_flight"] -= 1
+            elapsed = time.perf_counter() - start
+            TELEGRAM_SECONDS.observe(elapsed, method=name)
+            add_stage(TELEGRAM_STAGE, elapsed)
+        outbound["sent"] += 1
+        return response
@@ -0,0 +1,140 @@
+"""
+Профилировщик SQL по апдейтам (включается SQL_PROFILE=1).
+
+На каждый апдейт — число запросов, суммарное время БД и самые медленные запросы;
+агрегаты по хендлерам копятся в памяти (get_profiles). Апдейты сверх порогов
+пишутся в лог вместе с текстом медленных запросов.
+
+query_budget() — для тестов: AssertionError, если блок выполнил больше запросов,
+чем разрешено (так N+1 в хендлере ломает тест, а не продакшн).
+"""
+import heapq
+import logging
+import os
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.middleware.metrics import handler_name
+from app.services.metrics import DbUsage, track_db_usage
+
+logger = logging.getLogger(__name__)
+
+SQL_PROFILE = os.getenv("SQL_PROFILE", "").strip().lower() in ("1", "true", "yes")
+SQL_PROFILE_MAX_QUERIES = int(os.getenv("SQL_PROFILE_MAX_QUERIES", "15"))
+SQL_PROFILE_SLOW_MS = float(os.getenv("SQL_PROFILE_SLOW_MS", "300"))
+SQL_PROFILE_TOP = 3
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Хендлер (блок) выполнил больше SQL-запросов, чем разрешено."""
+
+
+def slowest(statements: list[tuple[float, str]], limit: int = SQL_PROFILE_TOP) -> list[tuple[float, str]]:
+    return heapq.nlargest(limit, statements, key=lambda item: item[0])
+
+
+_SELECT_LIST_RE = re.compile(r"^SELECT .+? FROM ", re.DOTALL)
+
+
+def _shorten(sql: str, limit: int = 300) -> str:
+    """Одна строка; длинный список колонок SELECT → «…», чтобы были видны FROM и WHERE."""
+    sql = " ".join(sql.split())
+    if len(sql) > limit:
+        sql = _SELECT_LIST_RE.sub("SELECT … FROM ", sql, count=1)
+    return sql[:limit]
+
+
+def _format_statements(statements: list[tuple[float, str]]) -> str:
+    return "\n".join(f"  {seconds * 1000:.1f} ms: {_shorten(sql)}" for seconds, sql in statements)
+
+
+@dataclass
+class HandlerProfile:
+    """Накопленная статистика SQL хендлера."""
+    updates: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    db_seconds: float = 0.0
+    slowest: list[tuple[float, str]] = field(default_factory=list)
+
+    @property
+    def avg_queries(self) -> float:
+        return self.queries / self.updates if self.updates else 0.0
+
+    def add(self, usage: DbUsage) -> None:
+        self.updates += 1
+        self.queries += usage.queries
+        self.max_queries = max(self.max_queries, usage.queries)
+        self.db_seconds += usage.seconds
+        self.slowest = slowest(self.slowest + (usage.statements or []))
+
+
+_profiles: dict[str, HandlerProfile] = {}
+
+
+def get_profiles() -> dict[str, HandlerProfile]:
+    return dict(_profiles)
+
+
+def reset_profiles() -> None:
+    _profiles.clear()
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "block") -> Iterator[DbUsage]:
+    """Не больше max_queries SQL-запросов внутри блока, иначе QueryBudgetExceeded."""
+    with track_db_usage(capture_statements=True) as usage:
+        yield usage
+    if usage.queries > max_queries:
+        raise QueryBudgetExceeded(
+            f"{label}: {usage.queries} SQL-запросов при бюджете {max_queries}\n"
+            + _format_statements(usage.statements)
+        )
+
+
+class SqlProfilerMiddleware(BaseMiddleware):
+    """Внутренний middleware: SQL каждого апдейта по хендлерам.
+
+    budgets — бюджеты запросов для отдельных хендлеров («модуль.функция»), остальным —
+    max_queries. strict=True поднимает QueryBudgetExceeded после хендлера (для тестов).
+    """
+
+    def __init__(
+        self,
+        max_queries: int = SQL_PROFILE_MAX_QUERIES,
+        slow_ms: float = SQL_PROFILE_SLOW_MS,
+        budgets: Optional[dict[str, int]] = None,
+        strict: bool = False,
+    ):
+        self.max_queries = max_queries
+        self.slow_ms = slow_ms
+        self.budgets = budgets or {}
+        self.strict = strict
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = handler_name(data)
+        with track_db_usage(capture_statements=True) as usage:
+            result = await handler(event, data)
+        _profiles.setdefault(name, HandlerProfile()).add(usage)
+
+        budget = self.budgets.get(name, self.max_queries)
+        over_budget = usage.queries > budget
+        if over_budget or usage.seconds * 1000 > self.slow_ms:
+            logger.warning(
+                "SQL profile %s: %d запросов (бюджет %d), %.1f ms в БД; самые медленные:\n%s",
+                name, usage.queries, budget, usage.seconds * 1000,
+                _format_statements(slowest(usage.statements)),
+            )
+        if self.strict and over_budget:
+            raise QueryBudgetExceeded(f"{name}: {usage.queries} SQL-запросов при бюджете {budget}")
+        return result
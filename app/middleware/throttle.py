@@ -1,26 +1,58 @@
-"""Per-user rate limiting middleware с поддержкой Redis (fallback на in-memory)."""
+"""Per-user rate limiting (GCRA) с поддержкой Redis (fallback на in-memory).
+
+GCRA — token bucket, где состояние пользователя — одно число: теоретическое время
+следующего запроса (TAT). Хендлер может «стоить» больше одного запроса:
+flags={"throttle_cost": 3} для PDF, экспорта, голоса.
+"""
 import logging
+import os
 import time
-from collections import defaultdict
 from typing import Callable, Dict, Any, Awaitable, Optional
 
 from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
 from aiogram.types import TelegramObject, Message, CallbackQuery
 
+from app.utils.ttl_cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
+# Сколько пользователей помнит in-memory лимитер (LRU; остальные считаются «свежими»)
+THROTTLE_MAX_USERS = int(os.getenv("THROTTLE_MAX_USERS", "10000"))
+# Допуск на погрешность float при сравнении TAT
+_EPSILON = 1e-6
+
+# Атомарный GCRA в Redis: время берётся с сервера Redis (одинаковое для всех процессов бота)
+_GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + cost * interval
+if new_tat - now > period + 0.000001 then
+    return 0
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return 1
+"""
+
 # Глобальный Redis-клиент (инициализируется при старте, если REDIS_URL задан)
 _redis_client = None
+_gcra_script = None
 
 
 async def init_redis(redis_url: str) -> bool:
     """Попытка подключения к Redis. Возвращает True при успехе."""
-    global _redis_client
+    global _redis_client, _gcra_script
     try:
         import redis.asyncio as aioredis
         client = aioredis.from_url(redis_url, decode_responses=True, socket_timeout=2)
         await client.ping()
         _redis_client = client
+        _gcra_script = client.register_script(_GCRA_SCRIPT)
         logger.info("Redis rate-limiter подключён: %s", redis_url.split("@")[-1] if "@" in redis_url else redis_url)
         return True
     except ImportError:
@@ -33,25 +65,33 @@ async def init_redis(redis_url: str) -> bool:
 
 async def close_redis() -> None:
     """Закрытие Redis-соединения."""
-    global _redis_client
+    global _redis_client, _gcra_script
     if _redis_client:
         await _redis_client.aclose()
         _redis_client = None
+        _gcra_script = None
 
 
 class ThrottleMiddleware(BaseMiddleware):
     """Ограничивает количество запросов от пользователя: не более rate за period секунд.
 
-    Если Redis доступен — использует sorted sets (персистентный, масштабируемый).
-    Иначе — in-memory defaultdict (как раньше).
+    Если Redis доступен — Lua-скрипт GCRA (один атомарный вызов, общий для процессов).
+    Иначе — in-memory LRU из TAT пользователей (не больше THROTTLE_MAX_USERS записей).
     """
 
-    def __init__(self, rate: int = 5, period: float = 10.0, key_prefix: str = "throttle"):
+    def __init__(
+        self,
+        rate: int = 5,
+        period: float = 10.0,
+        key_prefix: str = "throttle",
+        max_users: int = THROTTLE_MAX_USERS,
+    ):
         self._rate = rate
         self._period = period
+        self._interval = period / rate
         self._key_prefix = key_prefix
-        # In-memory fallback
-        self._timestamps: Dict[int, list] = defaultdict(list)
+        # In-memory fallback: user_id → TAT; запись старше period ничего не ограничивает
+        self._tat: TTLCache[float] = TTLCache(maxsize=max_users, ttl=period)
 
     async def __call__(
         self,
@@ -68,10 +108,12 @@ class ThrottleMiddleware(BaseMiddleware):
         if user_id is None:
             return await handler(event, data)
 
-        if _redis_client:
-            is_limited = await self._check_redis(user_id)
+        # Дороже rate запрос не пропустился бы никогда
+        cost = min(get_flag(data, "throttle_cost", default=1), self._rate)
+        if _gcra_script:
+            is_limited = await self._check_redis(user_id, cost)
         else:
-            is_limited = self._check_memory(user_id)
+            is_limited = self._check_memory(user_id, cost)
 
         if is_limited:
             if isinstance(event, Message):
@@ -82,39 +124,24 @@ class ThrottleMiddleware(BaseMiddleware):
 
         return await handler(event, data)
 
-    def _check_memory(self, user_id: int) -> bool:
-        """In-memory rate check (fallback)."""
+    def _check_memory(self, user_id: int, cost: int = 1) -> bool:
+        """In-memory GCRA (fallback). True — запрос надо отклонить."""
         now = time.monotonic()
-        timestamps = self._timestamps[user_id]
-        cutoff = now - self._period
-        timestamps[:] = [t for t in timestamps if t > cutoff]
-
-        if len(timestamps) >= self._rate:
+        tat = max(self._tat.get(user_id, now), now)
+        new_tat = tat + cost * self._interval
+        if new_tat - now > self._period + _EPSILON:
             return True
-
-        timestamps.append(now)
+        self._tat.set(user_id, new_tat, ttl=new_tat - now)
         return False
 
-    async def _check_redis(self, user_id: int) -> bool:
-        """Redis-based rate check с sorted set (sliding window)."""
+    async def _check_redis(self, user_id: int, cost: int = 1) -> bool:
+        """GCRA в Redis одним вызовом Lua-скрипта."""
         try:
-            key = f"{self._key_prefix}:{user_id}"
-            now = time.time()
-            cutoff = now - self._period
-
-            pipe = _redis_client.pipeline()
-            pipe.zremrangebyscore(key, 0, cutoff)  # убрать старые
-            pipe.zcard(key)  # текущее кол-во
-            pipe.zadd(key, {str(now): now})  # добавить текущий
-            pipe.expire(key, int(self._period) + 1)  # TTL
-            results = await pipe.execute()
-
-            count = results[1]  # zcard до добавления
-            if count >= self._rate:
-                # Убираем только что добавленный
-                await _redis_client.zrem(key, str(now))
-                return True
-            return False
+            allowed = await _gcra_script(
+                keys=[f"{self._key_prefix}:gcra:{user_id}"],
+                args=[self._interval, self._period, cost],
+            )
+            return not allowed
         except Exception as e:
             logger.warning("Redis throttle error, fallback to memory: %s", e)
-            return self._check_memory(user_id)
+            return self._check_memory(user_id, cost)
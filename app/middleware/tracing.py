@@ -0,0 +1,204 @@
+"""
+Трассировка апдейтов: время по этапам (throttle, user, subscription, хендлер, Bot API).
+
+TracingMiddleware регистрируется сразу после MetricsMiddleware и открывает трассу апдейта;
+внутренние middleware оборачиваются в traced(), запросы к Bot API досчитывает
+OutboundCounterMiddleware (add_stage). По хендлерам в памяти хранится окно последних
+TRACE_WINDOW апдейтов — p50/p95/p99 (get_latency). Если p95 хендлера выше
+TRACE_P95_BUDGET_MS, отчёт уходит в error_monitor (с тем же антиспамом, что и ошибки).
+"""
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.middleware.metrics import handler_name
+from app.services.error_monitor import error_monitor
+
+logger = logging.getLogger(__name__)
+
+TRACE_P95_BUDGET_MS = float(os.getenv("TRACE_P95_BUDGET_MS", "2000"))
+TRACE_WINDOW = int(os.getenv("TRACE_WINDOW", "500"))
+TRACE_MIN_SAMPLES = int(os.getenv("TRACE_MIN_SAMPLES", "20"))
+
+# Этап «хендлер» — всё, что осталось от апдейта за вычетом middleware;
+# «telegram» пересекается с этапом, в котором был сделан запрос
+HANDLER_STAGE = "handler"
+TELEGRAM_STAGE = "telegram"
+
+
+@dataclass
+class Trace:
+    """Этапы одного апдейта: имя → секунды."""
+    stages: dict[str, float] = field(default_factory=dict)
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("update_trace", default=None)
+
+
+def add_stage(stage: str, seconds: float) -> None:
+    """Добавить время к этапу текущего апдейта (вне апдейта — ничего)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу; sorted_values — по возрастанию, непустой."""
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+@dataclass
+class LatencyStats:
+    """Перцентили хендлера по окну последних апдейтов, мс."""
+    samples: int
+    p50: float
+    p95: float
+    p99: float
+    stages_p95: dict[str, float]
+
+
+class LatencyWindow:
+    """Окно последних апдейтов хендлера: общее время и этапы."""
+
+    def __init__(self, size: int = TRACE_WINDOW):
+        self.totals: deque[float] = deque(maxlen=size)
+        self.stages: dict[str, deque[float]] = {}
+        self.size = size
+        self.seen = 0
+
+    def add(self, total: float, stages: dict[str, float]) -> None:
+        self.seen += 1
+        self.totals.append(total)
+        for stage in set(self.stages) | set(stages):
+            self.stages.setdefault(stage, deque(maxlen=self.size)).append(stages.get(stage, 0.0))
+
+    def stats(self) -> LatencyStats:
+        totals = sorted(self.totals)
+        return LatencyStats(
+            samples=len(totals),
+            p50=percentile(totals, 50) * 1000,
+            p95=percentile(totals, 95) * 1000,
+            p99=percentile(totals, 99) * 1000,
+            stages_p95={name: percentile(sorted(values), 95) * 1000 for name, values in self.stages.items()},
+        )
+
+
+_windows: dict[str, LatencyWindow] = {}
+
+
+def get_latency() -> dict[str, LatencyStats]:
+    return {name: window.stats() for name, window in _windows.items() if window.totals}
+
+
+def reset_latency() -> None:
+    _windows.clear()
+
+
+def format_slow_report(name: str, stats: LatencyStats, budget_ms: float) -> str:
+    stages = ", ".join(
+        f"{stage} {ms:.0f}" for stage, ms in sorted(stats.stages_p95.items(), key=lambda item: -item[1])
+    )
+    return (
+        f"<b>Хендлер:</b> <code>{name}</code>\n"
+        f"p50 {stats.p50:.0f} / p95 {stats.p95:.0f} / p99 {stats.p99:.0f} мс "
+        f"(бюджет p95 {budget_ms:.0f} мс, апдейтов: {stats.samples})\n"
+        f"<b>Этапы, p95 мс:</b> {stages}"
+    )
+
+
+class _StageMiddleware(BaseMiddleware):
+    """Собственное время middleware — без времени следующих за ним и хендлера."""
+
+    def __init__(self, stage: str, inner: BaseMiddleware):
+        self.stage = stage
+        self.inner = inner
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        trace = _current.get()
+        if trace is None:
+            return await self.inner(handler, event, data)
+        downstream = 0.0
+
+        async def timed_handler(ev: TelegramObject, d: Dict[str, Any]) -> Any:
+            nonlocal downstream
+            start = time.perf_counter()
+            try:
+                return await handler(ev, d)
+            finally:
+                downstream += time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            return await self.inner(timed_handler, event, data)
+        finally:
+            trace.add(self.stage, time.perf_counter() - start - downstream)
+
+
+def traced(stage: str, middleware: BaseMiddleware) -> BaseMiddleware:
+    """Обернуть middleware, чтобы его время попадало в трассу отдельным этапом."""
+    return _StageMiddleware(stage, middleware)
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Открывает трассу апдейта, копит перцентили и сообщает о медленных хендлерах."""
+
+    def __init__(
+        self,
+        budget_ms: float = TRACE_P95_BUDGET_MS,
+        min_samples: int = TRACE_MIN_SAMPLES,
+        window: int = TRACE_WINDOW,
+    ):
+        self.budget_ms = budget_ms
+        self.min_samples = min_samples
+        self.window = window
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        trace = Trace()
+        token = _current.set(trace)
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            total = time.perf_counter() - start
+            _current.reset(token)
+            self._record(handler_name(data), total, trace)
+
+    def _record(self, name: str, total: float, trace: Trace) -> None:
+        middleware_time = sum(s for stage, s in trace.stages.items() if stage != TELEGRAM_STAGE)
+        trace.stages[HANDLER_STAGE] = max(0.0, total - middleware_time)
+        window = _windows.get(name)
+        if window is None:
+            window = _windows[name] = LatencyWindow(self.window)
+        window.add(total, trace.stages)
+        # Перцентили пересчитываются раз в min_samples апдейтов хендлера, не на каждый
+        if window.seen % self.min_samples:
+            return
+        stats = window.stats()
+        if stats.p95 > self.budget_ms:
+            logger.warning("Медленный хендлер %s: p95 %.0f мс > %.0f мс", name, stats.p95, self.budget_ms)
+            asyncio.create_task(
+                error_monitor.report_slow_handler(name, format_slow_report(name, stats, self.budget_ms))
+            )
@@ -1,19 +1,36 @@
-"""AI-сервис: распознавание голоса (Whisper) и парсинг текста/изображений (GPT-4o-mini)."""
+"""AI-сервис: распознавание голоса (Whisper) и парсинг текста/изображений (GPT-4o-mini).
+
+Результаты кэшируются: транскрипция/текст со скриншота — по file_unique_id Telegram
+(или SHA-256 содержимого), ParsedBooking — по тексту и текущей дате. Повторно
+пересланное голосовое или фото не тратит ни время, ни деньги на OpenAI.
+"""
 import json
 import logging
 import base64
+import hashlib
+import os
 from datetime import datetime, date, timedelta
-from dataclasses import dataclass, field
-from typing import Optional
+from dataclasses import dataclass, field, replace
+from typing import BinaryIO, Iterable, Optional, Union
 
 from openai import AsyncOpenAI
 
 from app.config import Config
+from app.services.metrics import OPENAI_FAILURES, OPENAI_SECONDS, observe_call
+from app.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 _client: Optional[AsyncOpenAI] = None
 
+# Кэш результатов OpenAI (TTL и размер — из env)
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", "86400"))
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "500"))
+_media_text_cache: TTLCache[str] = TTLCache(maxsize=AI_CACHE_SIZE, ttl=AI_CACHE_TTL_SECONDS)
+_parsed_cache: TTLCache["ParsedBooking"] = TTLCache(maxsize=AI_CACHE_SIZE, ttl=AI_CACHE_TTL_SECONDS)
+# Локальный разбор (booking_parser) принимается без GPT при уверенности не ниже порога
+LOCAL_PARSE_MIN_CONFIDENCE = float(os.getenv("LOCAL_PARSE_MIN_CONFIDENCE", "0.8"))
+
 
 def _get_client() -> AsyncOpenAI:
     global _client
@@ -32,62 +49,138 @@ class ParsedBooking:
     raw_text: str = ""
     confidence: float = 0.0              # 0-1
     unclear_fields: list = field(default_factory=list)  # ["date", "time", ...]
+    source: str = "llm"                  # "llm" | "local" (booking_parser)
+
+
+def _media_key(kind: str, cache_key: Optional[str], content: Union[bytes, BinaryIO]) -> str:
+    """Ключ кэша медиа: file_unique_id Telegram, иначе хэш содержимого."""
+    if cache_key:
+        return f"{kind}:{cache_key}"
+    if hasattr(content, "getbuffer"):
+        with content.getbuffer() as view:
+            digest = hashlib.sha256(view).hexdigest()
+    elif hasattr(content, "read"):
+        digest = hashlib.sha256(content.read()).hexdigest()
+        content.seek(0)
+    else:
+        digest = hashlib.sha256(content).hexdigest()
+    return f"{kind}:sha256:{digest}"
+
+
+def get_cached_transcription(file_unique_id: str) -> Optional[str]:
+    """Транскрипция голосового из кэша — позволяет не скачивать файл повторно."""
+    return _media_text_cache.get(f"voice:{file_unique_id}")
+
+
+def get_cached_image_text(file_unique_id: str) -> Optional[str]:
+    """Текст со скриншота из кэша — позволяет не скачивать файл повторно."""
+    return _media_text_cache.get(f"image:{file_unique_id}")
+
+
+async def transcribe_voice(
+    voice_file_bytes: Union[bytes, BinaryIO],
+    cache_key: Optional[str] = None,
+) -> str:
+    """Транскрипция голосового сообщения через Whisper (с кэшем по cache_key/содержимому).
 
+    Принимает bytes или файловый объект (буфер скачивания Telegram) — без лишней копии.
+    """
+    key = _media_key("voice", cache_key, voice_file_bytes)
+    cached = _media_text_cache.get(key)
+    if cached is not None:
+        logger.info("Whisper transcription (cache): %s", cached[:100])
+        return cached
 
-async def transcribe_voice(voice_file_bytes: bytes) -> str:
-    """Транскрипция голосового сообщения через Whisper."""
     client = _get_client()
-    # Whisper принимает файл — создаём виртуальный .ogg файл
-    response = await client.audio.transcriptions.create(
-        model="whisper-1",
-        file=("voice.ogg", voice_file_bytes, "audio/ogg"),
-        language="ru",
-    )
+    # Whisper принимает файл — передаём как .ogg (bytes или буфер)
+    with observe_call(OPENAI_SECONDS, OPENAI_FAILURES, operation="transcribe"):
+        response = await client.audio.transcriptions.create(
+            model="whisper-1",
+            file=("voice.ogg", voice_file_bytes, "audio/ogg"),
+            language="ru",
+        )
     text = response.text.strip()
     logger.info("Whisper transcription: %s", text[:100])
+    if text:
+        _media_text_cache.set(key, text)
     return text
 
 
-async def parse_image_for_booking(image_bytes: bytes, mime_type: str = "image/jpeg") -> str:
-    """Извлечение текста из скриншота через GPT-4o-mini vision."""
+async def parse_image_for_booking(
+    image_bytes: bytes,
+    mime_type: str = "image/jpeg",
+    cache_key: Optional[str] = None,
+) -> str:
+    """Извлечение текста из скриншота через GPT-4o-mini vision (с кэшем по cache_key/содержимому)."""
+    key = _media_key("image", cache_key, image_bytes)
+    cached = _media_text_cache.get(key)
+    if cached is not None:
+        logger.info("Image parsing result (cache): %s", cached[:100])
+        return cached
+
     client = _get_client()
     b64 = base64.b64encode(image_bytes).decode()
 
-    response = await client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "Ты помощник стоматолога. Из изображения извлеки информацию о записи на прием: "
-                    "имя пациента, дату, время, услугу. Ответь обычным текстом на русском, "
-                    "как если бы ты описывал запись словами. Например: "
-                    "'Иванов Иван, 15 марта в 14:30, лечение кариеса'. "
-                    "Если чего-то не видно на изображении — не придумывай, просто опусти."
-                ),
-            },
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": "Извлеки данные о записи на прием из этого изображения:"},
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:{mime_type};base64,{b64}"},
-                    },
-                ],
-            },
-        ],
-        max_tokens=300,
-    )
+    with observe_call(OPENAI_SECONDS, OPENAI_FAILURES, operation="image"):
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "Ты помощник стоматолога. Из изображения извлеки информацию о записи на прием: "
+                        "имя пациента, дату, время, услугу. Ответь обычным текстом на русском, "
+                        "как если бы ты описывал запись словами. Например: "
+                        "'Иванов Иван, 15 марта в 14:30, лечение кариеса'. "
+                        "Если чего-то не видно на изображении — не придумывай, просто опусти."
+                    ),
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": "Извлеки данные о записи на прием из этого изображения:"},
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": f"data:{mime_type};base64,{b64}"},
+                        },
+                    ],
+                },
+            ],
+            max_tokens=300,
+        )
     text = response.choices[0].message.content.strip()
     logger.info("Image parsing result: %s", text[:100])
+    if text:
+        _media_text_cache.set(key, text)
     return text
 
 
-async def parse_booking_text(raw_text: str) -> ParsedBooking:
-    """Парсинг текста (из голоса или изображения) в структурированные данные."""
-    client = _get_client()
+async def parse_booking_text(raw_text: str, service_names: Iterable[str] = ()) -> ParsedBooking:
+    """Парсинг текста (из голоса или изображения) в структурированные данные.
+
+    Сначала — локальные правила (booking_parser, микросекунды); GPT вызывается,
+    только если их уверенность ниже LOCAL_PARSE_MIN_CONFIDENCE.
+    service_names — названия услуг врача для сопоставления без LLM.
+    """
+    from app.services.booking_parser import parse_booking_locally
+
     today = date.today()
+    local = parse_booking_locally(raw_text, today, service_names)
+    if local.confidence >= LOCAL_PARSE_MIN_CONFIDENCE:
+        logger.info("Parsed booking (local): name=%s, date=%s, time=%s, service=%s, conf=%.2f",
+                    local.patient_name, local.date_str, local.time_str,
+                    local.service, local.confidence)
+        return local
+
+    # "завтра"/"в понедельник" зависят от текущей даты — она входит в ключ
+    cache_key = (raw_text.strip(), today.isoformat())
+    cached = _parsed_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Parsed booking (cache): name=%s, date=%s, time=%s",
+                    cached.patient_name, cached.date_str, cached.time_str)
+        return replace(cached, raw_text=raw_text, unclear_fields=list(cached.unclear_fields))
+
+    client = _get_client()
 
     system_prompt = f"""Ты помощник стоматолога. Из текста извлеки данные о записи на приём.
 Сегодня: {today.isoformat()} ({_weekday_ru(today)}).
@@ -112,15 +205,16 @@ async def parse_booking_text(raw_text: str) -> ParsedBooking:
 - Услуга: "лечение", "удаление", "консультация", "чистка", "имплантация" и т.д.
 - confidence: 0-1, насколько уверен в правильности парсинга"""
 
-    response = await client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": raw_text},
-        ],
-        max_tokens=300,
-        temperature=0.1,
-    )
+    with observe_call(OPENAI_SECONDS, OPENAI_FAILURES, operation="parse_booking"):
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": raw_text},
+            ],
+            max_tokens=300,
+            temperature=0.1,
+        )
 
     content = response.choices[0].message.content.strip()
     # Убираем markdown обёртку если есть
@@ -145,6 +239,7 @@ async def parse_booking_text(raw_text: str) -> ParsedBooking:
     logger.info("Parsed booking: name=%s, date=%s, time=%s, service=%s, conf=%.1f",
                 result.patient_name, result.date_str, result.time_str,
                 result.service, result.confidence)
+    _parsed_cache.set(cache_key, replace(result, unclear_fields=list(result.unclear_fields)))
     return result
 
 
@@ -1,5 +1,6 @@
 """
-Бэкап PostgreSQL: pg_dump → файл → отправка админам в Telegram.
+Бэкап PostgreSQL: pg_dump (сжатый, прямо на диск) → файл → отправка админам в Telegram
+(файлы больше лимита — нумерованными частями).
 
 Работает через DATABASE_URL. Запуск:
 - Автоматический: фоновая задача каждые BACKUP_INTERVAL_HOURS часов
@@ -27,6 +28,13 @@ BACKUP_INTERVAL_HOURS = int(os.getenv("BACKUP_INTERVAL_HOURS", "24"))
 MAX_LOCAL_BACKUPS = int(os.getenv("MAX_LOCAL_BACKUPS", "3"))
 # Директория для бэкапов
 BACKUP_DIR = Path(os.getenv("BACKUP_DIR", "/tmp/ministom_backups"))
+# Формат: custom (pg_dump -Fc, для pg_restore) или plain (SQL)
+BACKUP_FORMAT = os.getenv("BACKUP_FORMAT", "custom")
+# Значение --compress pg_dump: уровень gzip 0-9 или, для PostgreSQL 16+, «zstd:3»/«lz4»
+BACKUP_COMPRESSION = os.getenv("BACKUP_COMPRESSION", "6")
+# Размер части при отправке в Telegram (лимит документа — 50 MB)
+BACKUP_CHUNK_MB = int(os.getenv("BACKUP_CHUNK_MB", "49"))
+BACKUP_TIMEOUT_SECONDS = int(os.getenv("BACKUP_TIMEOUT_SECONDS", "600"))
 
 
 def _parse_db_url(url: str) -> dict:
@@ -43,45 +51,96 @@ def _parse_db_url(url: str) -> dict:
     }
 
 
-async def create_backup() -> Optional[Path]:
-    """Создаёт SQL-дамп базы данных через pg_dump.
+_PLAIN_SUFFIXES = {"0": ".sql", "none": ".sql", "zstd": ".sql.zst", "lz4": ".sql.lz4"}
 
-    Returns:
-        Path к файлу дампа или None при ошибке.
-    """
-    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
 
-    db = _parse_db_url(Config.DATABASE_URL)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"ministom_backup_{timestamp}.sql"
-    filepath = BACKUP_DIR / filename
+def _backup_suffix() -> str:
+    if BACKUP_FORMAT != "plain":
+        return ".dump"
+    method = BACKUP_COMPRESSION.split(":", 1)[0]
+    return _PLAIN_SUFFIXES.get(method, ".sql.gz")
+
 
+def _conn_args(db: dict) -> list[str]:
+    return ["-h", db["host"], "-p", str(db["port"]), "-U", db["user"], "-d", db["dbname"]]
+
+
+def _pg_env(db: dict) -> dict:
     env = os.environ.copy()
     env["PGPASSWORD"] = db["password"]
+    return env
 
+
+def _pg_dump_cmd(db: dict, filepath: Path, snapshot: Optional[str] = None) -> list[str]:
     cmd = [
         "pg_dump",
-        "-h", db["host"],
-        "-p", str(db["port"]),
-        "-U", db["user"],
-        "-d", db["dbname"],
+        *_conn_args(db),
         "--no-owner",
         "--no-acl",
+        # custom: сжатый архив для pg_restore; plain: SQL, сжатый самим pg_dump
+        "-F", "c" if BACKUP_FORMAT != "plain" else "p",
+        f"--compress={BACKUP_COMPRESSION}",
         "-f", str(filepath),
     ]
+    if snapshot:
+        # Снимок открытой транзакции — дамп согласован с посчитанными контрольными суммами
+        cmd.append(f"--snapshot={snapshot}")
+    return cmd
 
-    try:
+
+def _read_tail(fileobj, limit: int = 4096) -> str:
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(max(0, size - limit))
+    return fileobj.read().decode("utf-8", errors="replace")
+
+
+async def run_pg_tool(cmd: list[str], env: dict, timeout: float) -> tuple[int, str]:
+    """Запуск pg_dump/pg_restore/psql: stdout отбрасывается, stderr — во временный файл.
+
+    Returns:
+        (код возврата, хвост stderr). При таймауте процесс убивается, TimeoutError пробрасывается.
+    """
+    with tempfile.TemporaryFile() as stderr_file:
         process = await asyncio.create_subprocess_exec(
             *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=stderr_file,
             env=env,
         )
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=300)
+        try:
+            await asyncio.wait_for(process.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        return process.returncode, _read_tail(stderr_file)
+
+
+async def create_backup(snapshot: Optional[str] = None) -> Optional[Path]:
+    """Создаёт сжатый дамп базы данных через pg_dump.
+
+    pg_dump сам сжимает и пишет файл на диск (-f); stdout не используется,
+    stderr уходит во временный файл — в памяти процесса дамп не буферизуется.
+    snapshot — id снимка из pg_export_snapshot() (см. backup_verify).
+
+    Returns:
+        Path к файлу дампа или None при ошибке.
+    """
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+
+    db = _parse_db_url(Config.DATABASE_URL)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"ministom_backup_{timestamp}{_backup_suffix()}"
+    filepath = BACKUP_DIR / filename
+
+    cmd = _pg_dump_cmd(db, filepath, snapshot)
 
-        if process.returncode != 0:
-            error_msg = stderr.decode("utf-8", errors="replace")
-            logger.error("pg_dump failed (code %d): %s", process.returncode, error_msg)
+    try:
+        returncode, error_msg = await run_pg_tool(cmd, _pg_env(db), BACKUP_TIMEOUT_SECONDS)
+        if returncode != 0:
+            logger.error("pg_dump failed (code %d): %s", returncode, error_msg)
+            filepath.unlink(missing_ok=True)
             return None
 
         size_mb = filepath.stat().st_size / (1024 * 1024)
@@ -93,81 +152,122 @@ async def create_backup() -> Optional[Path]:
         return filepath
 
     except asyncio.TimeoutError:
-        logger.error("pg_dump timeout (300s)")
+        logger.error("pg_dump timeout (%ds)", BACKUP_TIMEOUT_SECONDS)
+        filepath.unlink(missing_ok=True)
         return None
     except FileNotFoundError:
         logger.error("pg_dump not found — установите postgresql-client")
         return None
     except Exception as e:
         logger.exception("Backup error: %s", e)
+        filepath.unlink(missing_ok=True)
         return None
 
 
+def _backup_stem(path: Path) -> str:
+    """«ministom_backup_20260316_030000» для файла дампа и всех его частей."""
+    return path.name.split(".", 1)[0]
+
+
 def _cleanup_old_backups():
-    """Удаляет старые бэкапы, оставляя MAX_LOCAL_BACKUPS последних."""
+    """Удаляет старые бэкапы (вместе с частями), оставляя MAX_LOCAL_BACKUPS последних."""
     if not BACKUP_DIR.exists():
         return
-    backups = sorted(
-        BACKUP_DIR.glob("ministom_backup_*.sql"),
-        key=lambda p: p.stat().st_mtime,
-        reverse=True,
-    )
-    for old in backups[MAX_LOCAL_BACKUPS:]:
-        try:
-            old.unlink()
-            logger.info("Deleted old backup: %s", old.name)
-        except Exception as e:
-            logger.warning("Failed to delete old backup %s: %s", old.name, e)
+    groups: dict[str, list[Path]] = {}
+    for path in BACKUP_DIR.glob("ministom_backup_*"):
+        groups.setdefault(_backup_stem(path), []).append(path)
+    # Имя содержит метку времени — сортировка по имени = по времени создания
+    for stem in sorted(groups, reverse=True)[MAX_LOCAL_BACKUPS:]:
+        for old in groups[stem]:
+            try:
+                old.unlink()
+                logger.info("Deleted old backup: %s", old.name)
+            except Exception as e:
+                logger.warning("Failed to delete old backup %s: %s", old.name, e)
+
+
+def split_backup(filepath: Path, chunk_bytes: int) -> list[Path]:
+    """Режет файл на части <имя>.part001, .part002… не больше chunk_bytes.
+
+    Файл меньше лимита возвращается как есть. Сборка: cat <имя>.part* > <имя>.
+    Копирование блоками — файл целиком в память не читается.
+    """
+    size = filepath.stat().st_size
+    if size <= chunk_bytes:
+        return [filepath]
+    parts = []
+    block = 1024 * 1024
+    with filepath.open("rb") as src:
+        number = 1
+        while True:
+            part = filepath.with_name(f"{filepath.name}.part{number:03d}")
+            written = 0
+            with part.open("wb") as dst:
+                while written < chunk_bytes:
+                    data = src.read(min(block, chunk_bytes - written))
+                    if not data:
+                        break
+                    dst.write(data)
+                    written += len(data)
+            if not written:
+                part.unlink()
+                break
+            parts.append(part)
+            number += 1
+    return parts
 
 
 async def send_backup_to_admins(bot: Bot, filepath: Path) -> int:
-    """Отправляет файл бэкапа всем админам. Возвращает количество успешных отправок."""
+    """Отправляет файл бэкапа всем админам (частями, если больше лимита Telegram).
+
+    Возвращает количество админов, получивших бэкап целиком.
+    """
     if not Config.ADMIN_IDS:
         logger.warning("No ADMIN_IDS configured, backup not sent")
         return 0
 
     size_mb = filepath.stat().st_size / (1024 * 1024)
-    if size_mb > 50:
-        # Telegram лимит 50 MB для документов
-        for admin_id in Config.ADMIN_IDS:
-            try:
-                await bot.send_message(
-                    admin_id,
-                    f"⚠️ Бэкап слишком большой ({size_mb:.1f} MB) для отправки через Telegram.\n"
-                    f"Файл сохранён на сервере: `{filepath}`"
-                )
-            except Exception:
-                pass
-        return 0
-
-    sent = 0
-    caption = (
+    parts = await asyncio.to_thread(split_backup, filepath, BACKUP_CHUNK_MB * 1024 * 1024)
+    header = (
         f"💾 Бэкап БД MiniStom\n"
         f"📅 {datetime.now().strftime('%d.%m.%Y %H:%M')}\n"
         f"📦 {size_mb:.1f} MB"
     )
 
-    for admin_id in Config.ADMIN_IDS:
-        try:
-            doc = FSInputFile(filepath, filename=filepath.name)
-            await bot.send_document(admin_id, doc, caption=caption)
-            sent += 1
-        except Exception as e:
-            logger.warning("Failed to send backup to admin %s: %s", admin_id, e)
-        await asyncio.sleep(0.1)
+    sent = 0
+    try:
+        for admin_id in Config.ADMIN_IDS:
+            try:
+                for number, part in enumerate(parts, 1):
+                    caption = header
+                    if len(parts) > 1:
+                        caption += f"\n🧩 Часть {number}/{len(parts)} (сборка: cat {filepath.name}.part* > {filepath.name})"
+                    doc = FSInputFile(part, filename=part.name)
+                    await bot.send_document(admin_id, doc, caption=caption)
+                    await asyncio.sleep(0.1)
+                sent += 1
+            except Exception as e:
+                logger.warning("Failed to send backup to admin %s: %s", admin_id, e)
+    finally:
+        # Части — только для отправки; на диске остаётся целый файл
+        for part in parts:
+            if part != filepath:
+                part.unlink(missing_ok=True)
 
     return sent
 
 
 async def run_backup_and_send(bot: Bot) -> str:
-    """Полный цикл: создать бэкап + отправить админам. Возвращает статус."""
-    filepath = await create_backup()
-    if not filepath:
+    """Полный цикл: бэкап (+ проверка восстановлением, если настроена) + отправка админам."""
+    from app.services.backup_verify import run_verified_backup
+
+    report = await run_verified_backup()
+    if not report.path:
         return "❌ Ошибка создания бэкапа (pg_dump). Проверьте логи."
 
-    sent = await send_backup_to_admins(bot, filepath)
-    size_mb = filepath.stat().st_size / (1024 * 1024)
-    return f"✅ Бэкап создан ({size_mb:.1f} MB), отправлен {sent} админам."
+    sent = await send_backup_to_admins(bot, report.path)
+    size_mb = report.size_bytes / (1024 * 1024)
+    return f"✅ Бэкап создан ({size_mb:.1f} MB), отправлен {sent} админам.\n{report.status_line()}"
 
 
 async def backup_scheduler(bot: Bot):
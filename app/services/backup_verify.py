@@ -0,0 +1,273 @@
+"""
+Проверка бэкапов восстановлением и история RTO.
+
+Если задан BACKUP_VERIFY_DATABASE_URL (отдельная пустая БД), цикл бэкапа такой:
+1. В транзакции REPEATABLE READ основной БД экспортируется снимок (pg_export_snapshot)
+   и считаются количество строк и контрольная сумма каждой таблицы.
+2. pg_dump --snapshot делает дамп ровно этого снимка.
+3. Схема public проверочной БД пересоздаётся, дамп восстанавливается
+   (pg_restore для custom, psql для plain/.sql.gz).
+4. Те же суммы считаются в проверочной БД и сравниваются.
+
+Размер, длительность дампа и восстановления (RTO) и результат дописываются
+в BACKUP_DIR/backup_history.jsonl — видно, как время восстановления растёт с данными.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import Config
+from app.database.models import Base
+from app.services import backup_service
+
+logger = logging.getLogger(__name__)
+
+BACKUP_VERIFY_DATABASE_URL = os.getenv("BACKUP_VERIFY_DATABASE_URL", "")
+BACKUP_RESTORE_TIMEOUT_SECONDS = int(os.getenv("BACKUP_RESTORE_TIMEOUT_SECONDS", "1800"))
+
+# Порядок строк в таблице не важен: сортируем хэши строк перед агрегацией
+_TABLE_STATS_SQL = (
+    'SELECT count(*), coalesce(md5(string_agg(md5(t::text), \'\' ORDER BY md5(t::text))), \'\') '
+    'FROM "{table}" t'
+)
+
+
+def history_file() -> Path:
+    return backup_service.BACKUP_DIR / "backup_history.jsonl"
+
+
+@dataclass
+class BackupReport:
+    """Результат одного цикла бэкапа."""
+    path: Optional[Path]
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    size_bytes: int = 0
+    dump_seconds: float = 0.0
+    restore_seconds: Optional[float] = None
+    verified: Optional[bool] = None  # None — проверка не настроена/не выполнялась
+    mismatches: list[str] = field(default_factory=list)
+    rows: int = 0
+    error: Optional[str] = None
+
+    def status_line(self) -> str:
+        if self.verified is None:
+            return f"⏱ Дамп: {self.dump_seconds:.1f} с (проверка восстановлением не настроена)"
+        if self.verified:
+            return (f"✅ Проверен восстановлением: {self.rows} строк совпадают, "
+                    f"RTO ≈ {self.restore_seconds:.1f} с (дамп {self.dump_seconds:.1f} с)")
+        problem = self.error or ", ".join(self.mismatches[:5])
+        return f"⚠️ Проверка восстановлением НЕ пройдена: {problem}"
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["path"] = str(self.path) if self.path else None
+        return json.dumps(data, ensure_ascii=False)
+
+
+def _asyncpg_url(url: str) -> str:
+    url = url.replace("postgres://", "postgresql://", 1)
+    if url.startswith("postgresql://"):
+        url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+def _same_database(a: str, b: str) -> bool:
+    pa, pb = backup_service._parse_db_url(a), backup_service._parse_db_url(b)
+    return (pa["host"], pa["port"], pa["dbname"]) == (pb["host"], pb["port"], pb["dbname"])
+
+
+def table_names() -> list[str]:
+    return [table.name for table in Base.metadata.sorted_tables]
+
+
+async def table_stats(conn: AsyncConnection, tables: list[str]) -> dict[str, tuple[int, str]]:
+    """{таблица: (строк, контрольная сумма)}; отсутствующая таблица — (-1, "")."""
+    stats = {}
+    for table in tables:
+        exists = await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f'public."{table}"'})
+        if not exists:
+            stats[table] = (-1, "")
+            continue
+        count, checksum = (await conn.execute(text(_TABLE_STATS_SQL.format(table=table)))).one()
+        stats[table] = (count, checksum)
+    return stats
+
+
+def compare_stats(source: dict[str, tuple[int, str]], restored: dict[str, tuple[int, str]]) -> list[str]:
+    """Расхождения по таблицам в читаемом виде (пустой список — всё совпало)."""
+    mismatches = []
+    for table, (count, checksum) in source.items():
+        r_count, r_checksum = restored.get(table, (-1, ""))
+        if r_count < 0:
+            mismatches.append(f"{table}: нет таблицы")
+        elif r_count != count:
+            mismatches.append(f"{table}: строк {r_count} вместо {count}")
+        elif r_checksum != checksum:
+            mismatches.append(f"{table}: контрольная сумма")
+    return mismatches
+
+
+@asynccontextmanager
+async def source_snapshot(url: str) -> AsyncIterator[tuple[str, dict[str, tuple[int, str]]]]:
+    """Открытая транзакция REPEATABLE READ: (id снимка для pg_dump, суммы по таблицам)."""
+    engine = create_async_engine(_asyncpg_url(url), poolclass=NullPool)
+    try:
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+            async with conn.begin():
+                snapshot = await conn.scalar(text("SELECT pg_export_snapshot()"))
+                stats = await table_stats(conn, table_names())
+                yield snapshot, stats
+    finally:
+        await engine.dispose()
+
+
+async def _reset_scratch(url: str) -> None:
+    engine = create_async_engine(_asyncpg_url(url), poolclass=NullPool)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP SCHEMA IF EXISTS public CASCADE"))
+            await conn.execute(text("CREATE SCHEMA public"))
+    finally:
+        await engine.dispose()
+
+
+async def _feed_gzip_to_psql(cmd: list[str], env: dict, filepath: Path) -> tuple[int, str]:
+    """psql читает SQL из stdin; файл распаковывается потоково блоками по 1 MB."""
+    with tempfile.TemporaryFile() as stderr_file:
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL, stderr=stderr_file, env=env,
+        )
+        try:
+            with gzip.open(filepath, "rb") as src:
+                while chunk := await asyncio.to_thread(src.read, 1024 * 1024):
+                    process.stdin.write(chunk)
+                    await process.stdin.drain()
+            process.stdin.close()
+            await process.wait()
+        except (BrokenPipeError, ConnectionResetError):
+            # psql завершился раньше (ON_ERROR_STOP) — код и stderr скажут почему
+            await process.wait()
+        except asyncio.CancelledError:
+            # Таймаут wait_for
+            process.kill()
+            await process.wait()
+            raise
+        return process.returncode, backup_service._read_tail(stderr_file)
+
+
+def _restore_cmd(db: dict, filepath: Path) -> list[str]:
+    conn = backup_service._conn_args(db)
+    if filepath.suffix == ".dump":
+        return ["pg_restore", *conn, "--no-owner", "--no-acl", "--exit-on-error", str(filepath)]
+    return ["psql", *conn, "-q", "-v", "ON_ERROR_STOP=1"] + (
+        ["-f", str(filepath)] if filepath.suffix == ".sql" else []
+    )
+
+
+async def restore_backup(filepath: Path, url: str) -> float:
+    """Восстановить дамп в чистую схему БД url. Возвращает длительность (с) или бросает RuntimeError."""
+    if filepath.name.endswith((".zst", ".lz4")):
+        raise RuntimeError("проверка plain-дампов zstd/lz4 не поддерживается — используйте custom")
+    db = backup_service._parse_db_url(url)
+    env = backup_service._pg_env(db)
+    await _reset_scratch(url)
+    cmd = _restore_cmd(db, filepath)
+    start = time.monotonic()
+    if filepath.suffix == ".gz":
+        returncode, error = await asyncio.wait_for(
+            _feed_gzip_to_psql(cmd, env, filepath), timeout=BACKUP_RESTORE_TIMEOUT_SECONDS
+        )
+    else:
+        returncode, error = await backup_service.run_pg_tool(cmd, env, BACKUP_RESTORE_TIMEOUT_SECONDS)
+    if returncode != 0:
+        raise RuntimeError(f"{cmd[0]} code {returncode}: {error.strip()[-300:]}")
+    return time.monotonic() - start
+
+
+async def verify_restored(url: str, source: dict[str, tuple[int, str]]) -> list[str]:
+    engine = create_async_engine(_asyncpg_url(url), poolclass=NullPool)
+    try:
+        async with engine.connect() as conn:
+            restored = await table_stats(conn, list(source))
+    finally:
+        await engine.dispose()
+    return compare_stats(source, restored)
+
+
+def record_history(report: BackupReport) -> None:
+    try:
+        path = history_file()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            f.write(report.to_json() + "\n")
+    except OSError as e:
+        logger.warning("Backup history write error: %s", e)
+
+
+def load_history(limit: int = 30) -> list[dict]:
+    """Последние записи истории бэкапов (старые — первыми)."""
+    path = history_file()
+    if not path.exists():
+        return []
+    lines = path.read_text(encoding="utf-8").splitlines()[-limit:]
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+async def run_verified_backup(verify_url: Optional[str] = None) -> BackupReport:
+    """Бэкап + (если задана проверочная БД) восстановление и сравнение; запись в историю."""
+    verify_url = verify_url if verify_url is not None else BACKUP_VERIFY_DATABASE_URL
+    if verify_url and _same_database(verify_url, Config.DATABASE_URL):
+        logger.error("BACKUP_VERIFY_DATABASE_URL указывает на основную БД — проверка отключена")
+        verify_url = ""
+
+    source: Optional[dict[str, tuple[int, str]]] = None
+    snapshot_error: Optional[str] = None
+    start = time.monotonic()
+    if verify_url:
+        try:
+            async with source_snapshot(Config.DATABASE_URL) as (snapshot, source):
+                path = await backup_service.create_backup(snapshot=snapshot)
+        except Exception as e:
+            # Бэкап важнее проверки: делаем обычный дамп
+            logger.exception("Snapshot backup failed, falling back to plain dump: %s", e)
+            source, snapshot_error = None, f"снимок БД: {e}"[:300]
+            path = await backup_service.create_backup()
+    else:
+        path = await backup_service.create_backup()
+    report = BackupReport(path=path, dump_seconds=time.monotonic() - start)
+    if not path:
+        return report
+    report.size_bytes = path.stat().st_size
+
+    if snapshot_error:
+        report.verified, report.error = False, snapshot_error
+    elif verify_url and source is not None:
+        try:
+            report.restore_seconds = await restore_backup(path, verify_url)
+            report.mismatches = await verify_restored(verify_url, source)
+            report.verified = not report.mismatches
+            report.rows = sum(count for count, _ in source.values())
+        except Exception as e:
+            logger.exception("Backup verification failed: %s", e)
+            report.verified = False
+            report.error = str(e)[:300]
+        log = logger.info if report.verified else logger.error
+        log("Backup verification: %s", report.status_line())
+
+    record_history(report)
+    return report
@@ -0,0 +1,317 @@
+"""
+Локальный (без LLM) разбор фраз записи на приём: «Иванов завтра в 14:00 консультация».
+
+Детерминированные правила: относительные даты («завтра», «послезавтра», дни недели),
+«15 марта», «15.03», время («в 14:00», «в 2», «в 9 утра»), услуги — по прайсу врача
+и словарю ключевых слов. Возвращает ParsedBooking с оценкой уверенности:
+ai_service.parse_booking_text обращается к GPT только если она ниже порога.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from app.services.ai_service import ParsedBooking
+
+_WEEKDAYS = {
+    "понедельник": 0, "вторник": 1, "среда": 2, "среду": 2, "четверг": 3,
+    "пятница": 4, "пятницу": 4, "суббота": 5, "субботу": 5, "воскресенье": 6,
+}
+_MONTHS = {
+    "января": 1, "февраля": 2, "марта": 3, "апреля": 4, "мая": 5, "июня": 6,
+    "июля": 7, "августа": 8, "сентября": 9, "октября": 10, "ноября": 11, "декабря": 12,
+}
+_HOUR_WORDS = {
+    "час": 1, "один": 1, "два": 2, "три": 3, "четыре": 4, "пять": 5, "шесть": 6,
+    "семь": 7, "восемь": 8, "девять": 9, "десять": 10, "одиннадцать": 11, "двенадцать": 12,
+}
+# Основа слова (первые 5 букв) → услуга; используется, если в прайсе врача совпадений нет
+_SERVICE_KEYWORDS = {
+    "консу", "осмот", "лечен", "карие", "удале", "чистк", "гигие", "импла", "отбел",
+    "канал", "корон", "проте", "бреке", "элайн", "пломб", "рентг", "сними", "синус",
+    "ретей", "винир",
+}
+_STOPWORDS = {
+    "запиши", "запишите", "записать", "записаться", "запись", "записал", "пожалуйста",
+    "на", "в", "во", "к", "ко", "и", "с", "у", "по", "для", "ну", "так", "это",
+    "пациент", "пациента", "пациентку", "пациентка", "прием", "приём", "приема", "приёма",
+    "нужно", "надо", "хочет", "хочу", "время", "час", "часа", "часов", "минут",
+    "утра", "дня", "вечера", "ночи", "года", "числа",
+}
+# Окончания косвенных падежей фамилий: «Иванову», «Петрова», «Сидорину» —
+# нормализацию в именительный падеж оставляем LLM
+_INFLECTED_ENDINGS = ("ову", "еву", "ёву", "ину", "ыну", "ому", "ему", "ого", "его", "ова", "ева", "ёва", "ина")
+
+_WORD_RE = re.compile(r"[А-Яа-яЁёA-Za-z][А-Яа-яЁёA-Za-z-]*")
+
+_RELATIVE_RE = re.compile(r"(?<!\w)(сегодня|послезавтра|завтра)(?!\w)", re.IGNORECASE)
+_WEEKDAY_RE = re.compile(
+    r"(?<!\w)(?:во?\s+)?(понедельник|вторник|сред[ау]|четверг|пятниц[ау]|суббот[ау]|воскресенье)(?!\w)",
+    re.IGNORECASE,
+)
+_DAY_MONTH_RE = re.compile(
+    r"(?<!\w)(?:на\s+)?(\d{1,2})(?:-?го)?\s+(" + "|".join(_MONTHS) + r")(?:\s+(\d{4})(?:\s+года)?)?(?!\w)",
+    re.IGNORECASE,
+)
+_NUMERIC_DATE_RE = re.compile(r"(?<![\w:.])(\d{1,2})[./](\d{1,2})(?:[./](\d{2}|\d{4}))?(?![\w:])")
+_CLOCK_RE = re.compile(r"(?<![\w.])(?:(?:в|к)\s+)?(\d{1,2}):(\d{2})(?![\w:])", re.IGNORECASE)
+_HOUR_RE = re.compile(
+    r"(?<!\w)(?:в|к)\s+(\d{1,2}(?:[.]\d{2})?|" + "|".join(_HOUR_WORDS) + r")"
+    r"(?:\s+час(?:а|ов)?)?(?:\s+(\d{2})(?:\s+минут\w*)?)?(?:\s+(утра|дня|вечера|ночи))?(?!\w)",
+    re.IGNORECASE,
+)
+_NOON_RE = re.compile(r"(?<!\w)в\s+полдень(?!\w)", re.IGNORECASE)
+
+
+@dataclass
+class _Scan:
+    """Промежуточное состояние разбора: текст с «вырезанными» найденными фрагментами."""
+    text: str
+    consumed: list[tuple[int, int]] = field(default_factory=list)
+
+    def free(self, start: int, end: int) -> bool:
+        return all(end <= s or start >= e for s, e in self.consumed)
+
+    def take(self, start: int, end: int) -> None:
+        self.consumed.append((start, end))
+
+
+def _next_weekday(today: date, weekday: int) -> date:
+    """Ближайший такой день недели начиная с завтра."""
+    days_ahead = (weekday - today.weekday()) % 7 or 7
+    return today + timedelta(days=days_ahead)
+
+
+def _future_date(today: date, day: int, month: int, year: Optional[int]) -> Optional[date]:
+    try:
+        if year is not None:
+            return date(year if year > 99 else 2000 + year, month, day)
+        d = date(today.year, month, day)
+        if d < today:
+            d = date(today.year + 1, month, day)
+        return d
+    except ValueError:
+        return None
+
+
+def _find_dates(scan: _Scan, today: date) -> list[date]:
+    found: list[date] = []
+    for m in _RELATIVE_RE.finditer(scan.text):
+        word = m.group(1).lower()
+        found.append(today + timedelta(days={"сегодня": 0, "завтра": 1, "послезавтра": 2}[word]))
+        scan.take(*m.span())
+    for m in _WEEKDAY_RE.finditer(scan.text):
+        if scan.free(*m.span()):
+            found.append(_next_weekday(today, _WEEKDAYS[m.group(1).lower()]))
+            scan.take(*m.span())
+    for m in _DAY_MONTH_RE.finditer(scan.text):
+        if scan.free(*m.span()):
+            year = int(m.group(3)) if m.group(3) else None
+            d = _future_date(today, int(m.group(1)), _MONTHS[m.group(2).lower()], year)
+            if d:
+                found.append(d)
+                scan.take(*m.span())
+    return found
+
+
+def _find_numeric_dates(scan: _Scan, today: date) -> list[date]:
+    found: list[date] = []
+    for m in _NUMERIC_DATE_RE.finditer(scan.text):
+        if not scan.free(*m.span()):
+            continue
+        year = int(m.group(3)) if m.group(3) else None
+        d = _future_date(today, int(m.group(1)), int(m.group(2)), year)
+        if d:
+            found.append(d)
+            scan.take(*m.span())
+    return found
+
+
+def _adjust_hour(hour: int, period: Optional[str]) -> int:
+    period = (period or "").lower()
+    if period in ("дня", "вечера") and hour < 12:
+        return hour + 12
+    if period in ("утра", "ночи"):
+        return 0 if hour == 12 else hour
+    # Без уточнения: «в 2» — рабочие часы, т.е. 14:00
+    if 1 <= hour <= 7:
+        return hour + 12
+    return hour
+
+
+def _find_times(scan: _Scan) -> list[str]:
+    found: list[str] = []
+    for m in _NOON_RE.finditer(scan.text):
+        found.append("12:00")
+        scan.take(*m.span())
+    for m in _CLOCK_RE.finditer(scan.text):
+        if not scan.free(*m.span()):
+            continue
+        hour, minute = int(m.group(1)), int(m.group(2))
+        if hour <= 23 and minute <= 59:
+            found.append(f"{hour:02d}:{minute:02d}")
+            scan.take(*m.span())
+    for m in _HOUR_RE.finditer(scan.text):
+        if not scan.free(*m.span()):
+            continue
+        raw_hour = m.group(1).lower()
+        minute = int(m.group(2)) if m.group(2) else 0
+        if "." in raw_hour:
+            raw_hour, raw_minute = raw_hour.split(".")
+            minute = int(raw_minute)
+        hour = _HOUR_WORDS[raw_hour] if raw_hour in _HOUR_WORDS else int(raw_hour)
+        hour = _adjust_hour(hour, m.group(3))
+        if hour <= 23 and minute <= 59:
+            found.append(f"{hour:02d}:{minute:02d}")
+            scan.take(*m.span())
+    return found
+
+
+def _stem(word: str) -> str:
+    return word.lower().replace("ё", "е")[:5]
+
+
+def _significant_stems(name: str) -> set[str]:
+    return {_stem(w) for w in _WORD_RE.findall(name) if len(w) >= 4}
+
+
+def _match_service(
+    words: list[tuple[str, int, int]],
+    service_names: Iterable[str],
+) -> tuple[Optional[str], set[int]]:
+    """Услуга по оставшимся словам. Возвращает (текст услуги, индексы слов услуги).
+
+    Регистр не важен: в тексте с фото услуга часто с заглавной («14:00, Консультация»).
+    Фамилия с основой услуги уйдёт в услугу — имя не найдётся, и фразу разберёт GPT.
+    """
+    stems = [(_stem(w), i) for i, (w, _, _) in enumerate(words) if len(w) >= 4]
+    text_stems = {s for s, _ in stems}
+
+    best: list[tuple[str, set[str]]] = []
+    best_score = 0
+    for name in service_names:
+        svc_stems = _significant_stems(name)
+        if not svc_stems or not svc_stems <= text_stems:
+            continue
+        if len(svc_stems) > best_score:
+            best, best_score = [(name, svc_stems)], len(svc_stems)
+        elif len(svc_stems) == best_score:
+            best.append((name, svc_stems))
+
+    if best:
+        matched = set().union(*(s for _, s in best))
+        indices = {i for s, i in stems if s in matched}
+        # Одна услуга прайса — её точное название; несколько — распознанные слова (уточнит пользователь)
+        if len(best) == 1:
+            return best[0][0], indices
+        return " ".join(words[i][0].lower() for i in sorted(indices)), indices
+
+    indices = {i for s, i in stems if s in _SERVICE_KEYWORDS}
+    if not indices:
+        return None, set()
+    # Слова между ключевыми словами тоже часть услуги: «лечение 2 каналов», «удаление зуба»
+    lo, hi = min(indices), max(indices)
+    span = {i for i in range(lo, hi + 1) if i in indices or words[i][0][0].islower()}
+    # «удаление зуба», «Удаление зуба» — следующее строчное слово-дополнение
+    nxt = hi + 1
+    if nxt < len(words) and words[nxt][0][0].islower() and words[nxt][0].lower() not in _STOPWORDS:
+        span.add(nxt)
+    return " ".join(words[i][0].lower() for i in sorted(span)), span
+
+
+def parse_date(text: str, today: Optional[date] = None) -> Optional[date]:
+    """Дата из короткого ответа пользователя («завтра», «в пятницу», «15 марта», «15.03»)."""
+    today = today or date.today()
+    scan = _Scan(text)
+    found = _find_dates(scan, today) + _find_numeric_dates(scan, today)
+    if len(set(found)) == 1:
+        return found[0]
+    return None
+
+
+def parse_booking_locally(
+    raw_text: str,
+    today: Optional[date] = None,
+    service_names: Iterable[str] = (),
+) -> ParsedBooking:
+    """Разбор фразы без LLM. confidence < ai_service.LOCAL_PARSE_MIN_CONFIDENCE — повод спросить GPT."""
+    today = today or date.today()
+    service_names = list(service_names)
+    scan = _Scan(raw_text)
+    dates = _find_dates(scan, today)
+    times = _find_times(scan)
+    dates += _find_numeric_dates(scan, today)
+
+    words = [
+        (m.group(0), m.start(), m.end())
+        for m in _WORD_RE.finditer(raw_text)
+        if scan.free(m.start(), m.end())
+    ]
+    service, service_idx = _match_service(words, service_names)
+
+    confidence = 1.0
+    unclear: list[str] = []
+
+    # Имя: подряд идущие слова с заглавной буквы среди оставшихся; группу обрывают
+    # пунктуация, дата и время между словами («Иванов Иван, 17.03, 14:00, …»)
+    name_groups: list[list[str]] = []
+    prev_idx = -2
+    unknown = 0
+    for i, (w, start, _) in enumerate(words):
+        if i in service_idx or w.lower() in _STOPWORDS:
+            continue
+        if w[0].isupper():
+            adjacent = prev_idx == i - 1 and not raw_text[words[prev_idx][2]:start].strip()
+            if adjacent and name_groups:
+                name_groups[-1].append(w)
+            else:
+                name_groups.append([w])
+            prev_idx = i
+        else:
+            unknown += 1
+
+    patient_name = None
+    if name_groups:
+        patient_name = " ".join(name_groups[0])
+        if len(name_groups) > 1 or len(name_groups[0]) > 3:
+            confidence -= 0.3
+        if any(len(w) >= 5 and w.lower().endswith(_INFLECTED_ENDINGS) for w in name_groups[0]):
+            confidence -= 0.25
+        # Слово услуги в ФИО — правила не разделили имя и услугу
+        service_stems = _SERVICE_KEYWORDS.union(*(_significant_stems(n) for n in service_names))
+        if any(len(w) >= 4 and _stem(w) in service_stems for group in name_groups for w in group):
+            confidence -= 0.3
+    else:
+        unclear.append("patient_name")
+        confidence -= 0.3
+
+    date_str = None
+    if len(set(dates)) == 1:
+        date_str = dates[0].isoformat()
+    else:
+        unclear.append("date")
+        confidence -= 0.3
+
+    time_str = None
+    if len(set(times)) == 1:
+        time_str = times[0]
+        # Вне рабочих часов (07:00–22:00) — скорее ошибка правил, чем ночной приём
+        if not "07:00" <= time_str <= "22:00":
+            confidence -= 0.3
+    else:
+        unclear.append("time")
+        confidence -= 0.3
+
+    # Непонятые слова («после обеда», «через неделю») — правила могли что-то упустить
+    confidence -= 0.1 * unknown
+
+    return ParsedBooking(
+        patient_name=patient_name,
+        date_str=date_str,
+        time_str=time_str,
+        service=service,
+        raw_text=raw_text,
+        confidence=round(max(0.0, min(0.95, confidence)), 2),
+        unclear_fields=unclear,
+        source="local",
+    )
@@ -4,51 +4,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func
 
 from app.database.models import Appointment, User, ClinicLocation, Service
-from sqlalchemy.orm import selectinload
-
-
-async def get_appointments_by_date(
-    db_session: AsyncSession,
-    doctor_id: int,
-    target_date: date
-) -> List[Appointment]:
-    """Получить записи на конкретную дату"""
-    start_datetime = datetime.combine(target_date, datetime.min.time())
-    end_datetime = datetime.combine(target_date, datetime.max.time())
-    
-    stmt = (
-        select(Appointment)
-        .options(
-            selectinload(Appointment.patient),
-            selectinload(Appointment.service),
-            selectinload(Appointment.location),
-        )
-        .where(
-            and_(
-                Appointment.doctor_id == doctor_id,
-                Appointment.date_time >= start_datetime,
-                Appointment.date_time <= end_datetime,
-                Appointment.status != "cancelled"
-            )
-        )
-        .order_by(Appointment.date_time)
-    )
-    
-    result = await db_session.execute(stmt)
-    return list(result.scalars().all())
-
-
-async def get_appointments_today(
-    db_session: AsyncSession,
-    doctor_id: int
-) -> List[Appointment]:
-    """Получить записи на сегодня"""
-    today = date.today()
-    return await get_appointments_by_date(db_session, doctor_id, today)
+from app.services.read_models import ScheduleRow, get_schedule_rows
+from app.utils.formatters import format_money
 
 
 async def format_appointments_list(
-    appointments: List[Appointment],
+    appointments: List[ScheduleRow],
     show_price: bool = True
 ) -> str:
     """Форматирование списка записей для отображения"""
@@ -59,17 +20,16 @@ async def format_appointments_list(
     for apt in appointments:
         time_str = apt.date_time.strftime("%H:%M")
         location_emoji = ""
-        if apt.location:
-            location_emoji = apt.location.emoji + " "
+        if apt.location_emoji:
+            location_emoji = apt.location_emoji + " "
         
-        patient_info = apt.patient.full_name if apt.patient else (apt.service_description or "Без описания")
+        patient_info = apt.patient_name or apt.service_description or "Без описания"
         service_part = ""
-        if apt.service:
-            service_part = f" — {apt.service.name}"
+        if apt.service_name is not None:
+            service_part = f" — {apt.service_name}"
             if show_price:
-                from app.utils.formatters import format_money
-                service_part += f" ({format_money(apt.service.price)})"
-        elif apt.service_description and apt.patient:
+                service_part += f" ({format_money(apt.service_price)})"
+        elif apt.service_description and apt.patient_name:
             service_part = f" — {apt.service_description}"
         
         lines.append(f"{location_emoji}{time_str} - {patient_info}{service_part}")
@@ -78,7 +38,7 @@ async def format_appointments_list(
 
 
 async def format_schedule_with_contacts(
-    appointments: List[Appointment],
+    appointments: List[ScheduleRow],
     show_price: bool = True
 ) -> str:
     """Форматирование расписания с ФИО, услугой и телефоном"""
@@ -88,15 +48,14 @@ async def format_schedule_with_contacts(
     lines = []
     for apt in appointments:
         time_str = apt.date_time.strftime("%H:%M")
-        patient_name = apt.patient.full_name if apt.patient else (apt.service_description or "Без описания")
-        patient_phone = (apt.patient.phone or "—") if apt.patient else "—"
+        patient_name = apt.patient_name or apt.service_description or "Без описания"
+        patient_phone = (apt.patient_phone or "—") if apt.patient_name else "—"
         
         service_line = ""
-        if apt.service:
-            service_line = f"🏥 Услуга: {apt.service.name}"
+        if apt.service_name is not None:
+            service_line = f"🏥 Услуга: {apt.service_name}"
             if show_price:
-                from app.utils.formatters import format_money
-                service_line += f" — {format_money(apt.service.price)}"
+                service_line += f" — {format_money(apt.service_price)}"
             service_line += "\n"
         elif apt.service_description:
             service_line = f"🏥 Услуга: {apt.service_description}\n"
@@ -147,15 +106,15 @@ async def get_busy_ranges_for_date(
     exclude_appointment_id: int | None = None
 ) -> List[tuple]:
     """Занятые интервалы на дату: [(start, end), ...]. exclude_appointment_id — не учитывать при переносе"""
-    appointments = await get_appointments_by_date(db_session, doctor_id, target_date)
+    appointments = await get_schedule_rows(db_session, doctor_id, target_date)
     ranges = []
     for apt in appointments:
         if exclude_appointment_id and apt.id == exclude_appointment_id:
             continue
         start_dt = apt.date_time
-        dur = getattr(apt, 'duration_minutes', None)
-        if dur is None and apt.service:
-            dur = getattr(apt.service, 'duration_minutes', 30)
+        dur = apt.duration_minutes
+        if dur is None:
+            dur = apt.service_duration
         dur = dur or 30
         end_dt = start_dt + timedelta(minutes=dur)
         ranges.append((start_dt, end_dt))
@@ -54,6 +54,7 @@ class ErrorMonitor:
         self._bot: Optional[Bot] = None
         self._recent: dict[str, datetime] = {}  # key → last_sent_at
         self._suppressed: defaultdict[str, int] = defaultdict(int)  # key → count
+        self._slow: dict[str, str] = {}  # хендлер → последний подавленный отчёт о латентности
         self._digest_task: Optional[asyncio.Task] = None
         self._total_errors = 0
         self._started_at: Optional[datetime] = None
@@ -122,6 +123,26 @@ class ErrorMonitor:
         text = _truncate("\n".join(parts))
         await self._send_to_admins(text)
 
+    async def report_slow_handler(self, handler: str, details: str) -> None:
+        """
+        Хендлер медленнее бюджета (p95, см. app.middleware.tracing). Антиспам — как у ошибок:
+        повторы за 5 мин не отправляются, последний отчёт попадает в дайджест.
+        """
+        key = f"slow:{handler}"
+        now = datetime.now()
+        last_sent = self._recent.get(key)
+        if last_sent and (now - last_sent).total_seconds() < _DEDUP_SECONDS:
+            self._slow[handler] = details
+            return
+
+        self._recent[key] = now
+        text = (
+            f"🐢 <b>Медленный хендлер</b>\n\n"
+            f"{details}\n\n"
+            f"🕐 {now.strftime('%d.%m.%Y %H:%M:%S')}"
+        )
+        await self._send_to_admins(_truncate(text))
+
     async def report_warning(self, message: str) -> None:
         """Отправка предупреждения (не исключение, а важное событие)."""
         now = datetime.now()
@@ -160,14 +181,18 @@ class ErrorMonitor:
                 logger.warning("ErrorMonitor: не удалось отправить admin=%s: %s", admin_id, e)
 
     async def _send_digest(self) -> None:
-        """Сводка подавленных ошибок."""
-        if not self._suppressed:
+        """Сводка подавленных ошибок и медленных хендлеров."""
+        if not self._suppressed and not self._slow:
             return
         lines = ["📋 <b>Дайджест подавленных ошибок</b>\n"]
         for key, count in sorted(self._suppressed.items(), key=lambda x: -x[1]):
             lines.append(f"  • <code>{key}</code> — {count} раз")
+        if self._slow:
+            lines.append("\n🐢 <b>Медленные хендлеры</b>")
+            lines.extend(f"\n{details}" for details in self._slow.values())
         lines.append(f"\n🕐 {datetime.now().strftime('%d.%m.%Y %H:%M')}")
         self._suppressed.clear()
+        self._slow.clear()
         await self._send_to_admins(_truncate("\n".join(lines)))
 
     async def _digest_loop(self) -> None:
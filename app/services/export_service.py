@@ -15,6 +15,7 @@ from app.database.models import (
     Treatment,
     ImplantLog,
 )
+from app.services.metrics import DOCUMENT_SECONDS
 
 
 def _date_fmt(d: datetime | date | None) -> str:
@@ -45,6 +46,7 @@ async def get_patients_with_relations(
     return list(result.scalars().unique().all())
 
 
+@DOCUMENT_SECONDS.time(kind="patients_excel")
 def build_patients_excel(patients: List[Patient]) -> BytesIO:
     """Собрать Excel: листы Пациенты, Записи, История лечения, Импланты."""
     wb = Workbook()
@@ -56,7 +58,7 @@ def build_patients_excel(patients: List[Patient]) -> BytesIO:
     ws_p.title = "Пациенты"
     headers_p = ["ID", "ФИО", "Телефон", "Дата рождения", "Заметки", "Создан"]
     for col, h in enumerate(headers_p, 1):
-        ws_p.cell(row=1, column=col, value=h, font=bold)
+        ws_p.cell(row=1, column=col, value=h).font = bold
     for row_idx, p in enumerate(patients, 2):
         ws_p.cell(row=row_idx, column=1, value=p.id)
         ws_p.cell(row=row_idx, column=2, value=p.full_name or "")
@@ -70,7 +72,7 @@ def build_patients_excel(patients: List[Patient]) -> BytesIO:
     ws_a = wb.create_sheet("Записи на приём")
     headers_a = ["ID пациента", "ФИО пациента", "Дата и время", "Услуга/описание", "Длительность (мин)", "Статус", "Локация", "Создан"]
     for col, h in enumerate(headers_a, 1):
-        ws_a.cell(row=1, column=col, value=h, font=bold)
+        ws_a.cell(row=1, column=col, value=h).font = bold
     row_idx = 2
     for p in patients:
         for a in sorted(p.appointments, key=lambda x: x.date_time):
@@ -93,7 +95,7 @@ def build_patients_excel(patients: List[Patient]) -> BytesIO:
         "Цена", "Скидка %", "Скидка сумма", "Оплачено", "Способ оплаты", "Статус оплаты"
     ]
     for col, h in enumerate(headers_t, 1):
-        ws_t.cell(row=1, column=col, value=h, font=bold)
+        ws_t.cell(row=1, column=col, value=h).font = bold
     row_idx = 2
     for p in patients:
         for t in sorted(p.treatments, key=lambda x: x.created_at or datetime.min):
@@ -116,7 +118,7 @@ def build_patients_excel(patients: List[Patient]) -> BytesIO:
     ws_i = wb.create_sheet("Импланты")
     headers_i = ["ID пациента", "ФИО", "Зуб", "Система", "Размер", "Дата операции", "Заметки"]
     for col, h in enumerate(headers_i, 1):
-        ws_i.cell(row=1, column=col, value=h, font=bold)
+        ws_i.cell(row=1, column=col, value=h).font = bold
     row_idx = 2
     for p in patients:
         for imp in p.implant_logs:
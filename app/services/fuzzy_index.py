@@ -0,0 +1,202 @@
+"""
+Нечёткий поиск пациентов и услуг врача в памяти (голосовая запись).
+
+ILIKE по распознанному тексту не находит «Иванову» (падеж) и «Иваноф» (ошибка Whisper).
+Индекс хранит нормализованные токены (нижний регистр, ё→е, отсечённые падежные
+окончания) и триграммы словаря основ. Поиск: похожие основы по общим триграммам →
+сходство (совпадение / префикс / расстояние Левенштейна) → оценки записей → топ-5.
+
+Индексы строятся лениво на врача и живут в GenerationCache; при изменении Patient/Service
+через ORM индекс врача сбрасывается после коммита (invalidate_on_commit), а индекс,
+собранный до этого коммита, в кэш не попадает. TTL — страховка для изменений из других процессов.
+"""
+import heapq
+import os
+import re
+from collections import defaultdict
+from typing import Callable, Generic, Iterable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.cache_events import GenerationCache, invalidate_on_commit
+from app.database.models import Patient, Service
+from app.services.patient_service import PatientRef, get_patient_name_index
+from app.services.service_service import ServiceRef, get_service_refs
+
+T = TypeVar("T")
+
+FUZZY_INDEX_TTL_SECONDS = float(os.getenv("FUZZY_INDEX_TTL_SECONDS", "600"))
+
+_TOKEN_RE = re.compile(r"[a-zа-я0-9]+")
+# Падежные окончания (длинные — первыми); основа не короче 3 букв
+_ENDINGS = (
+    "ого", "его", "ому", "ему", "ыми", "ими", "ами", "ями",
+    "ой", "ей", "ый", "ий", "ая", "яя", "ым", "им", "ом", "ем", "ую", "юю", "ах", "ях",
+    "а", "я", "у", "ю", "е", "ы", "и", "о", "ь", "й",
+)
+_MIN_STEM = 3
+
+
+def normalize(text: str) -> list[str]:
+    """Токены текста: нижний регистр, ё→е, только буквы и цифры."""
+    return _TOKEN_RE.findall((text or "").lower().replace("ё", "е"))
+
+
+def stem(token: str) -> str:
+    """Основа слова: «иванову», «ивановой» → «иванов»; числа не меняются."""
+    if token.isdigit():
+        return token
+    for ending in _ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= _MIN_STEM:
+            return token[: -len(ending)]
+    return token
+
+
+def _trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _levenshtein(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def token_similarity(query: str, token: str) -> float:
+    """Сходство основ 0..1: равенство, префикс, иначе 1 − Левенштейн / длина."""
+    if query == token:
+        return 1.0
+    if query.isdigit() or token.isdigit():
+        # Часть номера телефона
+        return 1.0 if query.isdigit() and len(query) >= 4 and query in token else 0.0
+    shorter = min(len(query), len(token))
+    if shorter >= _MIN_STEM and (token.startswith(query) or query.startswith(token)):
+        return 0.9
+    return 1.0 - _levenshtein(query, token) / max(len(query), len(token))
+
+
+class FuzzyIndex(Generic[T]):
+    """Индекс записей по тексту key(item); search() — ранжированный топ без БД.
+
+    Сходство считается по словарю различных основ (фамилии и имена повторяются),
+    а не по каждой записи: слово запроса сравнивается только с основами, у которых
+    достаточно общих триграмм, затем оценки раздаются записям через списки вхождений.
+    """
+
+    def __init__(self, items: Iterable[T], key: Callable[[T], str]):
+        self.items: list[T] = list(items)
+        self._sizes: list[int] = []
+        self._postings: dict[str, list[int]] = defaultdict(list)  # основа → записи
+        self._grams: dict[str, set[str]] = defaultdict(set)        # триграмма → основы
+        for idx, item in enumerate(self.items):
+            tokens = dict.fromkeys(stem(t) for t in normalize(key(item)))
+            self._sizes.append(len(tokens))
+            for token in tokens:
+                self._postings[token].append(idx)
+        for token in self._postings:
+            if not token.isdigit():
+                for gram in _trigrams(token):
+                    self._grams[gram].add(token)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _similar_tokens(self, query: str, min_similarity: float) -> dict[str, float]:
+        """Основы словаря, похожие на слово запроса: {основа: сходство}."""
+        if query.isdigit():
+            return {t: 1.0 for t in self._postings if t.isdigit() and token_similarity(query, t)}
+        grams = _trigrams(query)
+        shared: dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for token in self._grams.get(gram, ()):
+                shared[token] += 1
+        # Одна опечатка портит не больше трёх триграмм
+        need = max(1, len(grams) - 3 * max(1, len(query) // 4))
+        result = {}
+        for token, count in shared.items():
+            if count >= need or token.startswith(query) or query.startswith(token):
+                similarity = token_similarity(query, token)
+                if similarity >= min_similarity:
+                    result[token] = similarity
+        return result
+
+    def search_scored(self, query: str, limit: int = 5, min_score: float = 0.6) -> list[tuple[T, float]]:
+        """[(запись, оценка)] по убыванию; оценка — средняя по словам запроса лучшая похожесть."""
+        query_tokens = list(dict.fromkeys(stem(t) for t in normalize(query)))
+        if not query_tokens:
+            return []
+        # Слово запроса, не похожее ни на что (< 0.5), лишь снижает оценку записи
+        totals: dict[int, float] = defaultdict(float)
+        for q in query_tokens:
+            best: dict[int, float] = {}
+            for token, similarity in self._similar_tokens(q, 0.5).items():
+                for idx in self._postings[token]:
+                    if similarity > best.get(idx, 0.0):
+                        best[idx] = similarity
+            for idx, similarity in best.items():
+                totals[idx] += similarity
+        count = len(query_tokens)
+        scored = [(idx, total / count) for idx, total in totals.items() if total / count >= min_score]
+        # При равной оценке выше запись с меньшим числом лишних слов, затем — порядок загрузки
+        top = heapq.nsmallest(limit, scored, key=lambda pair: (-pair[1], self._sizes[pair[0]], pair[0]))
+        return [(self.items[idx], score) for idx, score in top]
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.6, spread: float = 0.15) -> list[T]:
+        """Топ записей, близких к лучшей (не хуже лучшей оценки на spread).
+
+        Точные совпадения (оценка 1.0) возвращаются без похожих — как прежний ILIKE.
+        """
+        scored = self.search_scored(query, limit, min_score)
+        if not scored:
+            return []
+        best = scored[0][1]
+        if best >= 1.0:
+            return [item for item, score in scored if score >= 1.0]
+        return [item for item, score in scored if score >= best - spread]
+
+
+_patient_indexes: GenerationCache[FuzzyIndex[PatientRef]] = GenerationCache(maxsize=512, ttl=FUZZY_INDEX_TTL_SECONDS)
+_service_indexes: GenerationCache[FuzzyIndex[ServiceRef]] = GenerationCache(maxsize=512, ttl=FUZZY_INDEX_TTL_SECONDS)
+
+
+def _patient_key(p: PatientRef) -> str:
+    return f"{p.full_name} {''.join(ch for ch in (p.phone or '') if ch.isdigit())}"
+
+
+async def get_patient_index(db_session: AsyncSession, doctor_id: int) -> FuzzyIndex[PatientRef]:
+    """Индекс пациентов врача (строится при первом обращении после сброса)."""
+    index = _patient_indexes.get(doctor_id)
+    if index is None:
+        generation = _patient_indexes.generation(doctor_id)
+        index = FuzzyIndex(await get_patient_name_index(db_session, doctor_id), _patient_key)
+        _patient_indexes.set(doctor_id, index, generation)
+    return index
+
+
+async def get_service_index(db_session: AsyncSession, doctor_id: int) -> FuzzyIndex[ServiceRef]:
+    """Индекс услуг врача (строится при первом обращении после сброса)."""
+    index = _service_indexes.get(doctor_id)
+    if index is None:
+        generation = _service_indexes.generation(doctor_id)
+        index = FuzzyIndex(await get_service_refs(db_session, doctor_id), lambda s: s.name)
+        _service_indexes.set(doctor_id, index, generation)
+    return index
+
+
+def invalidate_patients(doctor_id: int) -> None:
+    _patient_indexes.invalidate(doctor_id)
+
+
+def invalidate_services(doctor_id: int) -> None:
+    _service_indexes.invalidate(doctor_id)
+
+
+invalidate_on_commit(Patient, lambda p: p.doctor_id, invalidate_patients)
+invalidate_on_commit(Service, lambda s: s.doctor_id, invalidate_services)
@@ -0,0 +1,81 @@
+"""
+Состояние фоновых задач бота для /health/deep веб-админки.
+
+Бот и веб-админка — разные процессы (app.start), поэтому бот раз в
+HEALTH_STATE_INTERVAL_SECONDS пишет снимок в HEALTH_STATE_FILE (JSON, атомарная
+замена файла), а админка его читает. В снимке: когда каждый фоновый цикл последний
+раз проснулся (отставание от расписания) и исходящие запросы к Telegram в полёте.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.services.metrics import LOOP_LAG
+
+logger = logging.getLogger(__name__)
+
+HEALTH_STATE_FILE = Path(
+    os.getenv("HEALTH_STATE_FILE") or Path(tempfile.gettempdir()) / "ministom_health.json"
+)
+HEALTH_STATE_INTERVAL_SECONDS = float(os.getenv("HEALTH_STATE_INTERVAL_SECONDS", "15"))
+
+# имя цикла → {"interval": период, с; "last_tick": unix-время последнего пробуждения}
+_loops: dict[str, dict[str, float]] = {}
+# Исходящие запросы к Bot API (см. app.middleware.outbound)
+outbound = {"in_flight": 0, "peak": 0, "sent": 0, "failed": 0}
+
+
+def loop_tick(name: str, interval: float) -> None:
+    """Отметить пробуждение фонового цикла, который должен просыпаться раз в interval секунд."""
+    now = time.time()
+    previous = _loops.get(name)
+    if previous is not None:
+        LOOP_LAG.set(loop_lag(previous, now), loop=name)
+    _loops[name] = {"interval": interval, "last_tick": now}
+
+
+def loop_lag(state: dict[str, float], now: Optional[float] = None) -> float:
+    """На сколько секунд цикл опаздывает относительно расписания (0 — вовремя)."""
+    now = time.time() if now is None else now
+    return max(0.0, now - state["last_tick"] - state["interval"])
+
+
+def snapshot() -> dict:
+    return {
+        "pid": os.getpid(),
+        "written_at": time.time(),
+        "loops": {name: dict(state) for name, state in _loops.items()},
+        "outbound": dict(outbound),
+    }
+
+
+def write_state(path: Optional[Path] = None) -> None:
+    path = path or HEALTH_STATE_FILE
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(snapshot()), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Health state write error: %s", e)
+
+
+def read_state(path: Optional[Path] = None) -> Optional[dict]:
+    """Последний снимок бота или None, если бот его ещё не писал."""
+    path = path or HEALTH_STATE_FILE
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+async def state_writer() -> None:
+    """Фоновая задача бота: периодически сохранять снимок."""
+    while True:
+        write_state()
+        await asyncio.sleep(HEALTH_STATE_INTERVAL_SECONDS)
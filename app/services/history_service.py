@@ -0,0 +1,78 @@
+"""
+История болезни пациента: сводка одним агрегатным запросом и страницы записей
+по keyset-курсору (created_at, id) — без загрузки всей истории.
+"""
+import os
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import and_, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Patient, Treatment
+from app.services.read_models import debt_sql, effective_price_sql
+
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "10"))
+
+
+class HistorySummary(NamedTuple):
+    """Итоги по пациенту: записи, сумма со скидками, оплачено, долг, последний визит"""
+    full_name: str
+    count: int
+    total: float
+    paid: float
+    debt: float
+    last_visit: Optional[datetime]
+
+
+async def get_history_summary(
+    db_session: AsyncSession,
+    doctor_id: int,
+    patient_id: int
+) -> Optional[HistorySummary]:
+    """Сводка по пациенту врача (None — пациент не найден или чужой)"""
+    stmt = (
+        select(
+            Patient.full_name,
+            func.count(Treatment.id),
+            func.coalesce(func.sum(effective_price_sql()), 0),
+            func.coalesce(func.sum(Treatment.paid_amount), 0),
+            func.coalesce(func.sum(debt_sql()), 0),
+            func.max(Treatment.created_at),
+        )
+        .outerjoin(Treatment, and_(Treatment.patient_id == Patient.id, Treatment.doctor_id == doctor_id))
+        .where(and_(Patient.id == patient_id, Patient.doctor_id == doctor_id))
+        .group_by(Patient.id, Patient.full_name)
+    )
+    row = (await db_session.execute(stmt)).first()
+    if row is None:
+        return None
+    name, count, total, paid, debt_sum, last_visit = row
+    return HistorySummary(name, count, round(float(total), 2), round(float(paid), 2),
+                          round(float(debt_sum), 2), last_visit)
+
+
+async def get_history_page(
+    db_session: AsyncSession,
+    doctor_id: int,
+    patient_id: int,
+    after_id: Optional[int] = None,
+    limit: int = HISTORY_PAGE_SIZE
+) -> List[Treatment]:
+    """Записи новее→старше после записи after_id; до limit + 1 строк (лишняя — признак следующей страницы).
+
+    Курсор — id последней показанной записи: её (created_at, id) берётся подзапросом,
+    чтобы callback_data укладывалась в 64 байта Telegram.
+    """
+    stmt = select(Treatment).where(
+        and_(
+            Treatment.patient_id == patient_id,
+            Treatment.doctor_id == doctor_id
+        )
+    )
+    if after_id is not None:
+        anchor = select(Treatment.created_at).where(Treatment.id == after_id).scalar_subquery()
+        stmt = stmt.where(tuple_(Treatment.created_at, Treatment.id) < tuple_(anchor, after_id))
+    stmt = stmt.order_by(Treatment.created_at.desc(), Treatment.id.desc()).limit(limit + 1)
+    result = await db_session.execute(stmt)
+    return list(result.scalars().all())
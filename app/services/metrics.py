@@ -0,0 +1,162 @@
+"""
+Метрики бота и веб-админки (реализация — app.utils.metrics).
+
+Веб-админка отдаёт их на /metrics; бот — на своём порту BOT_METRICS_PORT
+(отдельный процесс, см. app.start). SQL считается событиями SQLAlchemy:
+всего по процессу и на один апдейт (track_db_usage в MetricsMiddleware).
+"""
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.utils.metrics import CONTENT_TYPE, REGISTRY, Counter, Gauge, Histogram, render
+
+logger = logging.getLogger(__name__)
+
+BOT_METRICS_PORT = int(os.getenv("BOT_METRICS_PORT", "0"))
+
+HANDLER_SECONDS = Histogram(
+    "ministom_handler_seconds", "Обработка апдейта (с middleware), с",
+    ("handler", "event", "callback"),
+)
+UPDATE_DB_QUERIES = Histogram(
+    "ministom_update_db_queries", "SQL-запросов на один апдейт", ("handler",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+UPDATE_DB_SECONDS = Histogram("ministom_update_db_seconds", "Время SQL на один апдейт, с", ("handler",))
+DB_QUERIES = Counter("ministom_db_queries_total", "SQL-запросы")
+DB_QUERY_SECONDS = Histogram("ministom_db_query_seconds", "Длительность SQL-запроса, с")
+LOOP_LAG = Gauge("ministom_loop_lag_seconds", "Опоздание фонового цикла относительно расписания, с", ("loop",))
+TELEGRAM_SECONDS = Histogram("ministom_telegram_request_seconds", "Запросы к Bot API, с", ("method",))
+TELEGRAM_FAILURES = Counter(
+    "ministom_telegram_request_failures_total", "Неудачные запросы к Bot API", ("method", "error"),
+)
+OPENAI_SECONDS = Histogram("ministom_openai_request_seconds", "Запросы к OpenAI, с", ("operation",))
+OPENAI_FAILURES = Counter("ministom_openai_request_failures_total", "Неудачные запросы к OpenAI", ("operation",))
+DOCUMENT_SECONDS = Histogram("ministom_document_seconds", "Генерация PDF/Excel, с", ("kind",))
+HTTP_SECONDS = Histogram("ministom_http_request_seconds", "HTTP-запросы веб-админки, с", ("path", "status"))
+DB_POOL = Gauge("ministom_db_pool_connections", "Соединения пула БД по состоянию", ("pool", "state"))
+DB_DISCONNECTS = Counter("ministom_db_disconnects_total", "Ошибки обрыва соединения с БД", ("pool",))
+
+# Пулы, отдаваемые в /metrics: имя → движок (основная БД, реплика)
+_pools: dict[str, AsyncEngine] = {}
+
+
+@dataclass
+class DbUsage:
+    """SQL одного апдейта; statements — [(секунды, SQL)], если включён сбор текста запросов."""
+    queries: int = 0
+    seconds: float = 0.0
+    statements: Optional[list[tuple[float, str]]] = None
+
+
+# Вложенные замеры (метрики → профилировщик → тест) видят все запросы блока
+_db_usage: contextvars.ContextVar[tuple[DbUsage, ...]] = contextvars.ContextVar("db_usage", default=())
+
+
+@contextmanager
+def track_db_usage(capture_statements: bool = False) -> Iterator[DbUsage]:
+    """Считать SQL-запросы, выполненные внутри блока (в этой задаче asyncio)."""
+    usage = DbUsage(statements=[] if capture_statements else None)
+    token = _db_usage.set(_db_usage.get() + (usage,))
+    try:
+        yield usage
+    finally:
+        _db_usage.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    DB_QUERIES.inc()
+    DB_QUERY_SECONDS.observe(elapsed)
+    for usage in _db_usage.get():
+        usage.queries += 1
+        usage.seconds += elapsed
+        if usage.statements is not None:
+            usage.statements.append((elapsed, statement))
+
+
+def _on_handle_error(context) -> None:
+    if not context.is_disconnect:
+        return
+    # Пул сам инвалидирует соединение (и более старые); здесь — только учёт
+    name = next((n for n, e in _pools.items() if e.sync_engine is context.engine), "unknown")
+    DB_DISCONNECTS.inc(pool=name)
+    logger.warning("Обрыв соединения с БД (пул %s): %s", name, context.original_exception)
+
+
+def pool_status(engine: AsyncEngine) -> dict:
+    """Состояние пула: класс, размер, свободные, выданные, сверх лимита (что умеет пул)."""
+    pool = engine.pool
+    stats = {"class": type(pool).__name__}
+    for key, attr in (("size", "size"), ("checked_in", "checkedin"),
+                      ("checked_out", "checkedout"), ("overflow", "overflow")):
+        method = getattr(pool, attr, None)
+        if method is not None:
+            stats[key] = method()
+    return stats
+
+
+def _collect_pools() -> None:
+    for name, engine in _pools.items():
+        for state, value in pool_status(engine).items():
+            if isinstance(value, int):
+                DB_POOL.set(value, pool=name, state=state)
+
+
+REGISTRY.add_collector(_collect_pools)
+
+
+def install_db_metrics(engine: AsyncEngine, pool: str = "primary") -> None:
+    """Подписаться на события движка (повторный вызов ничего не делает); pool — имя пула в метриках."""
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _on_handle_error)
+    _pools[pool] = engine
+
+
+@contextmanager
+def observe_call(histogram: Histogram, failures: Counter, **labels) -> Iterator[None]:
+    """Длительность внешнего вызова + счётчик ошибок."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        failures.inc(**labels)
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+async def start_metrics_server(port: int = BOT_METRICS_PORT):
+    """HTTP /metrics процесса бота (aiohttp из зависимостей aiogram). Возвращает runner или None."""
+    if not port:
+        return None
+    from aiohttp import web
+
+    async def metrics_handler(request):
+        return web.Response(body=render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    web_app = web.Application()
+    web_app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(web_app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", port).start()
+    logger.info("Метрики бота: http://0.0.0.0:%s/metrics", port)
+    return runner
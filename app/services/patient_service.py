@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, NamedTuple, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 
@@ -28,6 +28,24 @@ async def search_patients(
     return list(result.scalars().all())
 
 
+class PatientRef(NamedTuple):
+    """Лёгкая запись пациента для сопоставления по имени (без загрузки ORM-объектов)"""
+    id: int
+    full_name: str
+    phone: Optional[str]
+
+
+async def get_patient_name_index(db_session: AsyncSession, doctor_id: int) -> List[PatientRef]:
+    """Индекс имён и телефонов пациентов врача (один запрос, только нужные колонки)"""
+    stmt = (
+        select(Patient.id, Patient.full_name, Patient.phone)
+        .where(Patient.doctor_id == doctor_id)
+        .order_by(Patient.full_name)
+    )
+    result = await db_session.execute(stmt)
+    return [PatientRef(*row) for row in result.all()]
+
+
 async def get_patient_by_id(
     db_session: AsyncSession,
     patient_id: int,
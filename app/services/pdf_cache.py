@@ -0,0 +1,214 @@
+"""
+Кэш PDF (счета, карты имплантации) с адресацией по содержимому.
+
+Ключ — SHA-256 от входных данных документа: поля профиля врача, пациента,
+строки лечения/имплантов, версия шаблона (хэш файла) и день формирования —
+документ печатает «Дата формирования», поэтому кэш живёт не дольше суток
+(время в документе — первого за день формирования). Пока данные не менялись,
+повторный запрос не запускает WeasyPrint, а после первой отправки — и не загружает
+файл в Telegram заново (переиспользуется file_id).
+
+Хранение: директория PDF_CACHE_DIR, вытеснение LRU по mtime,
+суммарный размер ограничен PDF_CACHE_MAX_MB.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, Message
+
+from app.database.models import User, Patient, Treatment, ImplantLog
+from app.services.pdf_generator import TEMPLATE_DIR, INVOICE_TEMPLATE, IMPLANT_CARD_TEMPLATE
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR", "/tmp/ministom_pdf_cache"))
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "200"))
+
+_DOCTOR_FIELDS = ("id", "full_name", "specialization", "phone", "address", "logo_url")
+_PATIENT_FIELDS = ("id", "full_name", "phone", "birth_date")
+_TREATMENT_FIELDS = (
+    "id", "service_name", "price", "discount_percent", "discount_amount",
+    "paid_amount", "payment_status",
+)
+_IMPLANT_FIELDS = ("id", "tooth_number", "system_name", "implant_size", "operation_date", "notes")
+
+_template_versions: dict[str, str] = {}
+
+
+def template_version(name: str) -> str:
+    """Версия шаблона — хэш содержимого файла (считается один раз на процесс)."""
+    version = _template_versions.get(name)
+    if version is None:
+        version = hashlib.sha256((TEMPLATE_DIR / name).read_bytes()).hexdigest()[:16]
+        _template_versions[name] = version
+    return version
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _fields(obj: Any, names: Iterable[str]) -> list:
+    return [getattr(obj, name, None) for name in names]
+
+
+def _digest(kind: str, template: str, payload: dict, day: Optional[date]) -> str:
+    # День — по тем же часам, что generation_date в pdf_generator (datetime.now())
+    payload = {"kind": kind, "template": template_version(template), "day": day or datetime.now().date(), **payload}
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=_json_default)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def invoice_cache_key(
+    doctor: User, patient: Patient, treatments: list[Treatment], day: Optional[date] = None
+) -> str:
+    """Ключ кэша счёта (day — день формирования, по умолчанию сегодня)."""
+    return _digest("invoice", INVOICE_TEMPLATE, {
+        "doctor": _fields(doctor, _DOCTOR_FIELDS),
+        "patient": _fields(patient, _PATIENT_FIELDS),
+        "rows": [_fields(t, _TREATMENT_FIELDS) for t in treatments],
+    }, day)
+
+
+def implant_card_cache_key(
+    doctor: User, patient: Patient, implants: list[ImplantLog], day: Optional[date] = None
+) -> str:
+    """Ключ кэша карты имплантации (day — день формирования, по умолчанию сегодня)."""
+    return _digest("implant_card", IMPLANT_CARD_TEMPLATE, {
+        "doctor": _fields(doctor, _DOCTOR_FIELDS),
+        "patient": _fields(patient, _PATIENT_FIELDS),
+        "rows": [_fields(imp, _IMPLANT_FIELDS) for imp in implants],
+    }, day)
+
+
+class PdfCache:
+    """Дисковый LRU-кэш PDF + file_id Telegram рядом с файлом (<key>.pdf / <key>.fid)."""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self._dir = directory
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _pdf_path(self, key: str) -> Path:
+        return self._dir / f"{key}.pdf"
+
+    def _fid_path(self, key: str) -> Path:
+        return self._dir / f"{key}.fid"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """PDF из кэша (и отметка использования для LRU) или None."""
+        path = self._pdf_path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("PDF cache read error %s: %s", path.name, e)
+            return None
+
+    def put(self, key: str, pdf_bytes: bytes) -> None:
+        """Сохранить PDF и вытеснить самые старые файлы сверх лимита."""
+        with self._lock:
+            try:
+                self._dir.mkdir(parents=True, exist_ok=True)
+                tmp = self._pdf_path(key).with_suffix(".tmp")
+                tmp.write_bytes(pdf_bytes)
+                tmp.replace(self._pdf_path(key))
+                self._evict()
+            except OSError as e:
+                logger.warning("PDF cache write error: %s", e)
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for path in self._dir.glob("*.pdf"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self._max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._fid_path(path.stem).unlink(missing_ok=True)
+            total -= size
+            logger.info("PDF cache evicted %s", path.name)
+
+    def get_file_id(self, key: str) -> Optional[str]:
+        """file_id Telegram для уже отправленного документа или None."""
+        try:
+            file_id = self._fid_path(key).read_text().strip()
+        except OSError:
+            return None
+        # file_id используется — PDF тоже «свежий» для LRU
+        try:
+            os.utime(self._pdf_path(key))
+        except OSError:
+            pass
+        return file_id or None
+
+    def set_file_id(self, key: str, file_id: str) -> None:
+        try:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            self._fid_path(key).write_text(file_id)
+        except OSError as e:
+            logger.warning("PDF cache file_id write error: %s", e)
+
+    def forget_file_id(self, key: str) -> None:
+        self._fid_path(key).unlink(missing_ok=True)
+
+
+pdf_cache = PdfCache(PDF_CACHE_DIR, PDF_CACHE_MAX_MB * 1024 * 1024)
+
+
+def _render_cached(key: str, render: Callable[[], bytes]) -> bytes:
+    """PDF из кэша или render() с сохранением (выполняется в потоке)."""
+    pdf_bytes = pdf_cache.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = render()
+        pdf_cache.put(key, pdf_bytes)
+    return pdf_bytes
+
+
+async def send_cached_pdf(
+    message: Message,
+    key: str,
+    render: Callable[[], bytes],
+    filename: str,
+    caption: str,
+) -> None:
+    """Отправить PDF: по file_id → из дискового кэша → render() (WeasyPrint в потоке)."""
+    file_id = pdf_cache.get_file_id(key)
+    if file_id:
+        try:
+            await message.answer_document(document=file_id, caption=caption)
+            return
+        except TelegramBadRequest as e:
+            # file_id от другого бота/устарел — загружаем заново
+            logger.info("PDF cache: file_id rejected (%s), re-uploading", e)
+            pdf_cache.forget_file_id(key)
+
+    pdf_bytes = await asyncio.to_thread(_render_cached, key, render)
+    sent = await message.answer_document(
+        document=BufferedInputFile(pdf_bytes, filename=filename),
+        caption=caption,
+    )
+    document = getattr(sent, "document", None)
+    file_id = getattr(document, "file_id", None)
+    if isinstance(file_id, str):
+        pdf_cache.set_file_id(key, file_id)
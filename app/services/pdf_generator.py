@@ -1,19 +1,107 @@
+"""Генерация PDF: карта имплантации и счёт (Jinja2 → HTML → WeasyPrint).
+
+Окружение Jinja и скомпилированные шаблоны создаются один раз на процесс,
+фильтр format_money регистрируется один раз. На каждый документ остаётся
+только render() шаблона и вёрстка WeasyPrint.
+
+Пакетные счета (generate_invoices_zip) верстаются параллельно в пуле процессов:
+WeasyPrint — чистый Python, в потоках он упирается в GIL.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML
+from typing import Optional
+
+from jinja2 import Environment, FileSystemLoader, Template
 
 from app.database.models import User, Patient, ImplantLog, Treatment, Service
+from app.services.metrics import DOCUMENT_SECONDS
 from app.utils.formatters import format_money, treatment_effective_price
 
 
+TEMPLATE_DIR = Path(__file__).parent.parent.parent / "templates"
+INVOICE_TEMPLATE = "invoice.html"
+IMPLANT_CARD_TEMPLATE = "implant_card.html"
+
 # Цвета для имплантов на карте зубов
 IMPLANT_COLORS = [
     "#4CAF50", "#2196F3", "#FF9800", "#9C27B0", "#E91E63",
     "#00BCD4", "#795548", "#607D8B", "#8BC34A", "#3F51B5"
 ]
 
+# Карта зубов FDI: 4 ряда
+TOOTH_ROWS_FDI = [
+    [18, 17, 16, 15, 14, 13, 12, 11],
+    [21, 22, 23, 24, 25, 26, 27, 28],
+    [31, 32, 33, 34, 35, 36, 37, 38],
+    [41, 42, 43, 44, 45, 46, 47, 48],
+]
+
+# Размер пула процессов для пакетной генерации счетов
+PDF_BATCH_WORKERS = int(os.getenv("PDF_BATCH_WORKERS", "2"))
+
+# Реестр шаблонов: одно Environment на процесс (шаблоны на диске не меняются
+# во время работы, поэтому auto_reload выключен — нет stat() на каждый вызов)
+_env: Optional[Environment] = None
+_env_lock = threading.Lock()
+# FontConfiguration WeasyPrint не потокобезопасна — держим по одной на поток
+# (PDF рендерятся через asyncio.to_thread, потоки пула переиспользуются)
+_thread_local = threading.local()
+_batch_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_env() -> Environment:
+    global _env
+    if _env is None:
+        with _env_lock:
+            if _env is None:
+                env = Environment(
+                    loader=FileSystemLoader(str(TEMPLATE_DIR)),
+                    auto_reload=False,
+                )
+                env.filters["format_money"] = format_money
+                _env = env
+    return _env
+
+
+def get_template(name: str) -> Template:
+    """Скомпилированный шаблон из реестра (компиляция — только при первом обращении)."""
+    return _get_env().get_template(name)
+
+
+def _get_font_config():
+    """FontConfiguration текущего потока (создаётся один раз на поток)."""
+    font_config = getattr(_thread_local, "font_config", None)
+    if font_config is None:
+        from weasyprint.text.fonts import FontConfiguration
+        font_config = FontConfiguration()
+        _thread_local.font_config = font_config
+    return font_config
+
+
+def warm_up(fonts: bool = False) -> None:
+    """Предкомпиляция шаблонов при старте; fonts=True — ещё и загрузка шрифтов WeasyPrint.
+
+    Стили в шаблонах инлайновые (<style>), поэтому CSS разбирается вместе с документом;
+    дорогая часть, которую можно вынести, — конфигурация шрифтов (fontconfig/pango).
+    """
+    get_template(INVOICE_TEMPLATE)
+    get_template(IMPLANT_CARD_TEMPLATE)
+    if fonts:
+        _get_font_config()
+
+
+def html_to_pdf(html_content: str) -> bytes:
+    """Вёрстка HTML в PDF (WeasyPrint импортируется лениво — тяжёлая нативная зависимость)."""
+    from weasyprint import HTML
+    return HTML(string=html_content).write_pdf(font_config=_get_font_config())
+
 
 def _parse_implant_size(implant_size: str) -> tuple[str, str]:
     """Парсинг размера '4.0 x 10.0' -> (диаметр, длина)"""
@@ -30,20 +118,8 @@ def _parse_implant_size(implant_size: str) -> tuple[str, str]:
     return implant_size, "-"
 
 
-def generate_implant_card_pdf(doctor: User, patient: Patient, implants: list[ImplantLog]) -> bytes:
-    """Генерация PDF карты имплантации с картой зубов и цветовой индикацией"""
-    template_dir = Path(__file__).parent.parent.parent / "templates"
-    env = Environment(loader=FileSystemLoader(str(template_dir)))
-    template = env.get_template("implant_card.html")
-
-    # Карта зубов FDI: 4 ряда
-    tooth_rows_fdi = [
-        [18, 17, 16, 15, 14, 13, 12, 11],
-        [21, 22, 23, 24, 25, 26, 27, 28],
-        [31, 32, 33, 34, 35, 36, 37, 38],
-        [41, 42, 43, 44, 45, 46, 47, 48],
-    ]
-
+def render_implant_card_html(doctor: User, patient: Patient, implants: list[ImplantLog]) -> str:
+    """HTML карты имплантации с картой зубов и цветовой индикацией"""
     # Словарь: номер зуба -> индекс импланта (для цвета)
     tooth_to_implant_idx = {}
     for i, imp in enumerate(implants):
@@ -55,7 +131,7 @@ def generate_implant_card_pdf(doctor: User, patient: Patient, implants: list[Imp
 
     # Строим строки для карты зубов
     tooth_rows = []
-    for row in tooth_rows_fdi:
+    for row in TOOTH_ROWS_FDI:
         tooth_row = []
         for num in row:
             idx = tooth_to_implant_idx.get(num)
@@ -81,7 +157,7 @@ def generate_implant_card_pdf(doctor: User, patient: Patient, implants: list[Imp
             "color": color,
         })
 
-    html_content = template.render(
+    return get_template(IMPLANT_CARD_TEMPLATE).render(
         doctor=doctor,
         patient=patient,
         implants=implants,
@@ -90,24 +166,20 @@ def generate_implant_card_pdf(doctor: User, patient: Patient, implants: list[Imp
         generation_date=datetime.now()
     )
 
-    html = HTML(string=html_content)
-    pdf_bytes = html.write_pdf()
-    return pdf_bytes
 
+@DOCUMENT_SECONDS.time(kind="implant_card_pdf")
+def generate_implant_card_pdf(doctor: User, patient: Patient, implants: list[ImplantLog]) -> bytes:
+    """Генерация PDF карты имплантации с картой зубов и цветовой индикацией"""
+    return html_to_pdf(render_implant_card_html(doctor, patient, implants))
 
-def generate_invoice_pdf(
+
+def render_invoice_html(
     doctor: User,
     patient: Patient,
     treatments: list[Treatment],
     services: list[Service] | None = None
-) -> bytes:
-    """Генерация PDF счета (для Premium)"""
-    # Загружаем шаблон
-    template_dir = Path(__file__).parent.parent.parent / "templates"
-    env = Environment(loader=FileSystemLoader(str(template_dir)))
-    env.filters["format_money"] = format_money
-    template = env.get_template("invoice.html")
-    
+) -> str:
+    """HTML счёта (для Premium)"""
     # Вычисляем итоговую сумму с учётом скидок (процент и сумма)
     total = sum(t.price or 0 for t in treatments)
     final_total = sum(
@@ -115,14 +187,14 @@ def generate_invoice_pdf(
         for t in treatments
     )
     total_discount = total - final_total
-    
+
     effective_prices = {
         t.id: treatment_effective_price(t.price, t.discount_percent, t.discount_amount)
         for t in treatments
     }
     total_paid = sum(getattr(t, "paid_amount", None) or 0 for t in treatments)
     total_debt = max(0, final_total - total_paid)
-    html_content = template.render(
+    return get_template(INVOICE_TEMPLATE).render(
         doctor=doctor,
         patient=patient,
         treatments=treatments,
@@ -135,10 +207,65 @@ def generate_invoice_pdf(
         total_debt=total_debt,
         generation_date=datetime.now(),
     )
-    
-    # Генерируем PDF
-    html = HTML(string=html_content)
-    pdf_bytes = html.write_pdf()
-    
-    return pdf_bytes
 
+
+@DOCUMENT_SECONDS.time(kind="invoice_pdf")
+def generate_invoice_pdf(
+    doctor: User,
+    patient: Patient,
+    treatments: list[Treatment],
+    services: list[Service] | None = None
+) -> bytes:
+    """Генерация PDF счета (для Premium)"""
+    return html_to_pdf(render_invoice_html(doctor, patient, treatments, services))
+
+
+def _get_batch_pool() -> ProcessPoolExecutor:
+    global _batch_pool
+    if _batch_pool is None:
+        # spawn: не форкаем процесс бота с его event loop и потоками
+        _batch_pool = ProcessPoolExecutor(
+            max_workers=max(1, PDF_BATCH_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _batch_pool
+
+
+def shutdown_batch_pool() -> None:
+    """Остановка пула процессов пакетной генерации (при завершении бота)."""
+    global _batch_pool
+    if _batch_pool is not None:
+        _batch_pool.shutdown(wait=False, cancel_futures=True)
+        _batch_pool = None
+
+
+def _invoice_filename(patient: Patient) -> str:
+    name = (patient.full_name or "patient").replace(" ", "_").replace("/", "_")
+    return f"invoice_{name}_{patient.id}.pdf"
+
+
+def _build_zip(files: list[tuple[str, bytes]]) -> bytes:
+    buf = BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for filename, data in files:
+            zf.writestr(filename, data)
+    return buf.getvalue()
+
+
+async def generate_invoices_zip(
+    doctor: User,
+    invoices: list[tuple[Patient, list[Treatment]]],
+    executor: Executor | None = None,
+) -> bytes:
+    """Пакет счетов одним ZIP-архивом: по PDF на пациента.
+
+    HTML рендерится в текущем процессе (шаблон уже скомпилирован, это доли мс),
+    в пул уходят только строки HTML — ORM-объекты между процессами не передаются.
+    """
+    loop = asyncio.get_running_loop()
+    pool = executor or _get_batch_pool()
+    with DOCUMENT_SECONDS.time(kind="invoices_zip"):
+        htmls = [render_invoice_html(doctor, patient, treatments) for patient, treatments in invoices]
+        pdfs = await asyncio.gather(*(loop.run_in_executor(pool, html_to_pdf, html) for html in htmls))
+        files = [(_invoice_filename(patient), pdf) for (patient, _), pdf in zip(invoices, pdfs)]
+        return await asyncio.to_thread(_build_zip, files)
@@ -0,0 +1,106 @@
+"""
+Read-модели для списков и расписания: только нужные колонки одним SELECT
+вместо ORM-сущностей со связями. Строки — NamedTuple (без __dict__, без
+identity map и отслеживания изменений сессией); для записи в БД по-прежнему ORM.
+"""
+from datetime import date, datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Appointment, ClinicLocation, Patient, Service, Treatment
+from app.services.patient_service import PatientRef
+
+
+class ScheduleRow(NamedTuple):
+    """Запись расписания: время, пациент, услуга, локация"""
+    id: int
+    date_time: datetime
+    duration_minutes: Optional[int]
+    service_description: Optional[str]
+    patient_name: Optional[str]
+    patient_phone: Optional[str]
+    service_name: Optional[str]
+    service_price: Optional[float]
+    service_duration: Optional[int]
+    location_emoji: Optional[str]
+
+
+class DebtorRow(NamedTuple):
+    """Пациент и его суммарный долг"""
+    id: int
+    full_name: str
+    debt: float
+
+
+def effective_price_sql():
+    """SQL-аналог treatment_effective_price (цена со скидками, не меньше 0)."""
+    price = (
+        Treatment.price * (1 - func.coalesce(Treatment.discount_percent, 0) / 100.0)
+        - func.coalesce(Treatment.discount_amount, 0)
+    )
+    return case((Treatment.price.is_(None), 0.0), (price < 0, 0.0), else_=price)
+
+
+def debt_sql():
+    """SQL-аналог долга по позиции: итоговая цена минус оплачено, не меньше 0."""
+    debt = effective_price_sql() - func.coalesce(Treatment.paid_amount, 0)
+    return case((and_(Treatment.price.is_not(None), debt > 0), debt), else_=0.0)
+
+
+async def get_schedule_rows(
+    db_session: AsyncSession,
+    doctor_id: int,
+    target_date: date
+) -> List[ScheduleRow]:
+    """Расписание врача на дату без отменённых — один запрос с LEFT JOIN"""
+    start_datetime = datetime.combine(target_date, datetime.min.time())
+    end_datetime = datetime.combine(target_date, datetime.max.time())
+    stmt = (
+        select(
+            Appointment.id, Appointment.date_time, Appointment.duration_minutes, Appointment.service_description,
+            Patient.full_name, Patient.phone,
+            Service.name, Service.price, Service.duration_minutes,
+            ClinicLocation.emoji,
+        )
+        .outerjoin(Patient, Patient.id == Appointment.patient_id)
+        .outerjoin(Service, Service.id == Appointment.service_id)
+        .outerjoin(ClinicLocation, ClinicLocation.id == Appointment.location_id)
+        .where(
+            and_(
+                Appointment.doctor_id == doctor_id,
+                Appointment.date_time >= start_datetime,
+                Appointment.date_time <= end_datetime,
+                Appointment.status != "cancelled"
+            )
+        )
+        .order_by(Appointment.date_time)
+    )
+    result = await db_session.execute(stmt)
+    return [ScheduleRow(*row) for row in result.all()]
+
+
+async def get_patient_rows(db_session: AsyncSession, doctor_id: int, limit: int = 50) -> List[PatientRef]:
+    """Последние добавленные пациенты врача (как get_all_patients, но только id, ФИО, телефон)"""
+    stmt = (
+        select(Patient.id, Patient.full_name, Patient.phone)
+        .where(Patient.doctor_id == doctor_id)
+        .order_by(Patient.created_at.desc())
+        .limit(limit)
+    )
+    result = await db_session.execute(stmt)
+    return [PatientRef(*row) for row in result.all()]
+
+
+async def get_debtor_rows(db_session: AsyncSession, doctor_id: int) -> List[DebtorRow]:
+    """Пациенты врача по алфавиту с суммарным долгом — один агрегатный запрос"""
+    stmt = (
+        select(Patient.id, Patient.full_name, func.coalesce(func.sum(debt_sql()), 0))
+        .outerjoin(Treatment, and_(Treatment.patient_id == Patient.id, Treatment.doctor_id == doctor_id))
+        .where(Patient.doctor_id == doctor_id)
+        .group_by(Patient.id, Patient.full_name)
+        .order_by(Patient.full_name)
+    )
+    result = await db_session.execute(stmt)
+    return [DebtorRow(pid, name, round(float(debt), 2)) for pid, name, debt in result.all()]
@@ -1,9 +1,23 @@
-"""Сервис услуг по категориям"""
-from typing import List
+"""
+Сервис услуг по категориям.
+
+Прайс врача кэшируется целиком (get_service_catalog) и общий для календаря, истории,
+голосовой записи и прайс-листа. При изменении Service через ORM каталог врача
+сбрасывается после коммита (invalidate_on_commit); массовые DELETE/INSERT сбрасывают его явно
+(invalidate_service_catalog), TTL — страховка для изменений из других процессов.
+"""
+import os
+from collections import defaultdict
+from typing import Iterable, List, NamedTuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 
-from app.database.models import Service
+from app.database.cache_events import GenerationCache, invalidate_on_commit
+from app.database.models import Service, User
+
+SERVICE_CATALOG_TTL_SECONDS = float(os.getenv("SERVICE_CATALOG_TTL_SECONDS", "600"))
+# Отметка в User.settings: услуги по умолчанию уже созданы
+DEFAULTS_SEEDED_KEY = "default_services_seeded"
 
 # Категории услуг
 CATEGORIES = {
@@ -54,46 +68,98 @@ async def get_categories() -> List[tuple[str, str, str]]:
     return [(cat_id, name, emoji) for cat_id, (name, emoji) in CATEGORIES.items()]
 
 
-async def get_services_by_category(
-    db_session: AsyncSession,
-    doctor_id: int,
+class CatalogService(NamedTuple):
+    """Услуга в кэше каталога — не привязана к сессии"""
+    id: int
     category: str
-) -> List[Service]:
-    """Услуги врача по категории"""
-    stmt = (
-        select(Service)
-        .where(
-            and_(
-                Service.doctor_id == doctor_id,
-                Service.category == category
-            )
-        )
-        .order_by(Service.sort_order, Service.name)
-    )
-    result = await db_session.execute(stmt)
-    return list(result.scalars().all())
+    name: str
+    price: float
+    duration_minutes: int
+    sort_order: int
 
 
-async def ensure_default_services(db_session: AsyncSession, doctor_id: int) -> None:
-    """Создать услуги по умолчанию: для каждой категории, где у врача ещё нет услуг."""
-    for category, default_list in DEFAULT_SERVICES.items():
+class ServiceCatalog:
+    """Прайс врача: услуги по категориям в порядке (sort_order, name)"""
+
+    def __init__(self, services: Iterable[CatalogService]):
+        self.services: List[CatalogService] = list(services)
+        self._by_category: dict[str, List[CatalogService]] = defaultdict(list)
+        for svc in self.services:
+            self._by_category[svc.category].append(svc)
+
+    def categories(self) -> set[str]:
+        return set(self._by_category)
+
+    def by_category(self, category: str) -> List[CatalogService]:
+        return list(self._by_category.get(category, ()))
+
+
+_catalogs: GenerationCache[ServiceCatalog] = GenerationCache(maxsize=1024, ttl=SERVICE_CATALOG_TTL_SECONDS)
+
+
+async def get_service_catalog(db_session: AsyncSession, doctor_id: int) -> ServiceCatalog:
+    """Каталог услуг врача: один SELECT при первом обращении после сброса"""
+    catalog = _catalogs.get(doctor_id)
+    if catalog is None:
+        generation = _catalogs.generation(doctor_id)
         stmt = (
-            select(Service)
-            .where(
-                and_(
-                    Service.doctor_id == doctor_id,
-                    Service.category == category
-                )
+            select(
+                Service.id, Service.category, Service.name, Service.price,
+                Service.duration_minutes, Service.sort_order,
             )
-            .limit(1)
+            .where(Service.doctor_id == doctor_id)
+            .order_by(Service.category, Service.sort_order, Service.name)
         )
         result = await db_session.execute(stmt)
-        if result.scalar_one_or_none():
+        catalog = ServiceCatalog(CatalogService(*row) for row in result.all())
+        _catalogs.set(doctor_id, catalog, generation)
+    return catalog
+
+
+def invalidate_service_catalog(doctor_id: int) -> None:
+    _catalogs.invalidate(doctor_id)
+
+
+async def get_services_by_category(
+    db_session: AsyncSession,
+    doctor_id: int,
+    category: str
+) -> List[CatalogService]:
+    """Услуги врача по категории (из каталога)"""
+    catalog = await get_service_catalog(db_session, doctor_id)
+    return catalog.by_category(category)
+
+
+class ServiceRef(NamedTuple):
+    """Лёгкая запись услуги для сопоставления с распознанным текстом"""
+    id: int
+    name: str
+    price: float
+    duration_minutes: int
+
+
+async def get_service_refs(db_session: AsyncSession, doctor_id: int) -> List[ServiceRef]:
+    """Все услуги врача — только нужные для записи поля, в порядке прайса"""
+    catalog = await get_service_catalog(db_session, doctor_id)
+    return [ServiceRef(s.id, s.name, s.price, s.duration_minutes) for s in catalog.services]
+
+
+async def ensure_default_services(db_session: AsyncSession, doctor: User) -> None:
+    """Создать услуги по умолчанию для категорий, где у врача нет услуг, — один раз.
+
+    После первой проверки в настройках врача ставится отметка DEFAULTS_SEEDED_KEY:
+    дальше — ни одного запроса, а категория, которую врач очистил сам, не заполняется заново.
+    """
+    if (doctor.settings or {}).get(DEFAULTS_SEEDED_KEY):
+        return
+    existing = (await get_service_catalog(db_session, doctor.id)).categories()
+    for category, default_list in DEFAULT_SERVICES.items():
+        if category in existing:
             continue  # В этой категории уже есть услуги
 
         for i, (name, price) in enumerate(default_list):
             service = Service(
-                doctor_id=doctor_id,
+                doctor_id=doctor.id,
                 category=category,
                 name=name,
                 price=price,
@@ -101,6 +167,7 @@ async def ensure_default_services(db_session: AsyncSession, doctor_id: int) -> N
                 sort_order=i,
             )
             db_session.add(service)
+    doctor.settings = {**(doctor.settings or {}), DEFAULTS_SEEDED_KEY: True}
     await db_session.commit()
 
 
@@ -118,3 +185,6 @@ async def get_service_by_id(
     )
     result = await db_session.execute(stmt)
     return result.scalar_one_or_none()
+
+
+invalidate_on_commit(Service, lambda s: s.doctor_id, invalidate_service_catalog)
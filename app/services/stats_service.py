@@ -0,0 +1,166 @@
+"""
+Статистика дашборда админки: итоги одним запросом и тренды из свёртки по дням.
+
+Итоги (пользователи по тарифам, пациенты, записи, лечения) — один SELECT:
+тарифы считаются через count(*) FILTER (WHERE ...), остальные таблицы — скалярными
+подзапросами. На PostgreSQL для таблиц больше STATS_ESTIMATE_MIN_ROWS строк вместо
+count(*) берётся оценка pg_class.reltuples (её обновляют autovacuum/ANALYZE) — без полного скана.
+
+Тренды читаются из daily_stats. Пересчитываются только дни, строка которых ещё не
+окончательна (последний пересчёт был до конца дня), — обычно вчера и сегодня.
+Готовый ответ кэшируется на ADMIN_STATS_TTL_SECONDS.
+"""
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy import BigInteger, case, cast, delete, false, func, insert, literal_column, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Appointment, DailyStats, Patient, Treatment, User
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATS_TTL_SECONDS = float(os.getenv("ADMIN_STATS_TTL_SECONDS", "60"))
+STATS_TREND_DAYS = int(os.getenv("STATS_TREND_DAYS", "30"))
+STATS_ESTIMATE_MIN_ROWS = int(os.getenv("STATS_ESTIMATE_MIN_ROWS", "1000000"))
+
+_TIERS = {"basic": 0, "standard": 1, "premium": 2}
+_TOTALS = {
+    "total_patients": Patient,
+    "total_appointments": Appointment,
+    "total_treatments": Treatment,
+}
+_ROLLUP_SOURCES = {
+    "new_users": User,
+    "new_patients": Patient,
+    "new_appointments": Appointment,
+    "new_treatments": Treatment,
+}
+
+_cache: TTLCache[dict] = TTLCache(maxsize=4, ttl=ADMIN_STATS_TTL_SECONDS)
+
+
+def _total_column(model, use_estimate: bool):
+    """(количество, признак оценки) для таблицы model."""
+    exact = select(func.count()).select_from(model).scalar_subquery()
+    if not use_estimate:
+        return exact, false()
+    # Некоррелированные подзапросы — InitPlan: count(*) выполняется, только если оценка мала
+    estimate = literal_column(
+        f"(SELECT reltuples FROM pg_class WHERE oid = '{model.__tablename__}'::regclass)"
+    )
+    is_big = estimate >= STATS_ESTIMATE_MIN_ROWS
+    return case((is_big, cast(estimate, BigInteger)), else_=exact), is_big
+
+
+async def get_totals(db: AsyncSession) -> dict:
+    """Итоги по проекту одним запросом (ключи — как в ответе /api/stats)."""
+    use_estimate = db.get_bind().dialect.name == "postgresql"
+    columns = [
+        func.count().filter(User.subscription_tier == tier).label(name)
+        for name, tier in _TIERS.items()
+    ]
+    for key, model in _TOTALS.items():
+        value, is_estimate = _total_column(model, use_estimate)
+        columns += [value.label(key), is_estimate.label(f"{key}_estimated")]
+    row = (await db.execute(select(*columns).select_from(User))).mappings().one()
+
+    tier_counts = {name: row[name] or 0 for name in _TIERS}
+    totals = {
+        "total_users": sum(tier_counts.values()),
+        "tier_counts": tier_counts,
+        "estimated": [key for key in _TOTALS if row[f"{key}_estimated"]],
+    }
+    for key in _TOTALS:
+        totals[key] = int(row[key] or 0)
+    return totals
+
+
+def _as_date(value) -> date:
+    # SQLite возвращает date() строкой
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+async def refresh_daily_stats(db: AsyncSession, days: int = STATS_TREND_DAYS,
+                              now: Optional[datetime] = None) -> list[date]:
+    """Пересчитать неокончательные дни свёртки за последние days дней. Возвращает пересчитанные дни."""
+    now = now or datetime.now()
+    today = now.date()
+    window = [today - timedelta(days=i) for i in range(days - 1, -1, -1)]
+    result = await db.execute(
+        select(DailyStats.day, DailyStats.updated_at).where(DailyStats.day >= window[0])
+    )
+    updated = {_as_date(day): updated_at for day, updated_at in result.all()}
+    stale = [
+        day for day in window
+        if day not in updated or updated[day] < datetime.combine(day + timedelta(days=1), time.min)
+    ]
+    if not stale:
+        return []
+
+    counts: dict[date, dict[str, int]] = {day: dict.fromkeys(_ROLLUP_SOURCES, 0) for day in stale}
+    since = datetime.combine(stale[0], time.min)
+    for key, model in _ROLLUP_SOURCES.items():
+        day_col = func.date(model.created_at)
+        rows = await db.execute(
+            select(day_col, func.count()).where(model.created_at >= since).group_by(day_col)
+        )
+        for day, count in rows.all():
+            day = _as_date(day)
+            if day in counts:
+                counts[day][key] = count
+
+    try:
+        await db.execute(delete(DailyStats).where(DailyStats.day.in_(stale)))
+        await db.execute(insert(DailyStats), [
+            {"day": day, "updated_at": now, **values} for day, values in counts.items()
+        ])
+        await db.commit()
+    except IntegrityError:
+        # Параллельный пересчёт из другого процесса успел раньше — его данные не хуже
+        await db.rollback()
+        logger.info("daily_stats refresh skipped: concurrent refresh")
+        return []
+    return stale
+
+
+async def get_trends(db: AsyncSession, days: int = STATS_TREND_DAYS,
+                     now: Optional[datetime] = None) -> list[dict]:
+    """Ряды по дням (старые — первыми) из свёртки; пропущенные дни — нули."""
+    today = (now or datetime.now()).date()
+    start = today - timedelta(days=days - 1)
+    result = await db.execute(select(DailyStats).where(DailyStats.day >= start, DailyStats.day <= today))
+    by_day = {_as_date(row.day): row for row in result.scalars().all()}
+    trends = []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        row = by_day.get(day)
+        trends.append({
+            "day": day.isoformat(),
+            **{key: (getattr(row, key) if row else 0) for key in _ROLLUP_SOURCES},
+        })
+    return trends
+
+
+async def get_dashboard_stats(db: AsyncSession, rollup_db: Optional[AsyncSession] = None) -> dict:
+    """Итоги + тренды для дашборда (кэш ADMIN_STATS_TTL_SECONDS).
+
+    db — для тяжёлых итогов (может быть репликой); свёртка daily_stats пишется
+    и читается через rollup_db (основная БД), по умолчанию — тоже db.
+    """
+    stats = _cache.get("dashboard")
+    if stats is None:
+        rollup_db = rollup_db or db
+        stats = await get_totals(db)
+        await refresh_daily_stats(rollup_db)
+        stats["trends"] = await get_trends(rollup_db)
+        _cache.set("dashboard", stats)
+    return stats
+
+
+def invalidate_stats() -> None:
+    _cache.clear()
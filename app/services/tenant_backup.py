@@ -0,0 +1,304 @@
+"""
+Логический бэкап одного врача: экспорт/восстановление его данных без затрагивания других.
+
+Формат — NDJSON в gzip: строка-заголовок, затем строки {"t": таблица, "r": строка}
+в порядке зависимостей (врач и ассистенты → связи → локации, услуги → пациенты →
+записи → лечение → импланты) и завершающая строка {"end": {таблица: количество}}.
+Экспорт читает таблицы потоково (yield_per) и пишет в файл, не собирая данные в памяти.
+
+Восстановление — в одной транзакции: текущие данные врача удаляются, строки вставляются
+пачками (INSERT … RETURNING id), внешние ключи переназначаются на новые id.
+Файл без завершающей строки (обрезан) отклоняется — транзакция откатывается.
+"""
+import gzip
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, BinaryIO, Iterator, Optional
+
+from sqlalchemy import Date, DateTime, Table, delete, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import (
+    User,
+    DoctorAssistant,
+    ClinicLocation,
+    Service,
+    Patient,
+    Appointment,
+    Treatment,
+    ImplantLog,
+)
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NAME = "ministom-tenant"
+FORMAT_VERSION = 1
+BATCH_SIZE = 1000
+
+# Порядок экспорта = порядок вставки (родители раньше детей)
+_TABLES: list[Table] = [
+    User.__table__,
+    DoctorAssistant.__table__,
+    ClinicLocation.__table__,
+    Service.__table__,
+    Patient.__table__,
+    Appointment.__table__,
+    Treatment.__table__,
+    ImplantLog.__table__,
+]
+_TABLES_BY_NAME = {t.name: t for t in _TABLES}
+# Поля профиля врача, которые восстанавливаются. Подписка, роль и статус регистрации
+# остаются текущими: старый бэкап не откатывает оплату, чужой — не переносит тариф
+_USER_PROFILE = (
+    "full_name", "specialization", "phone", "address", "location_lat", "location_lon",
+    "photo_url", "logo_url", "timezone", "settings",
+)
+
+
+class TenantBackupError(ValueError):
+    """Файл не является бэкапом врача или повреждён."""
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _doctor_filter(table: Table, doctor_id: int):
+    if table.name == User.__tablename__:
+        # Сам врач и его ассистенты
+        return or_(table.c.id == doctor_id, table.c.owner_id == doctor_id)
+    return table.c.doctor_id == doctor_id
+
+
+async def export_doctor(db: AsyncSession, doctor_id: int, out: BinaryIO) -> dict[str, int]:
+    """Записать данные врача в out (gzip NDJSON). Возвращает количество строк по таблицам."""
+    counts: dict[str, int] = {}
+    with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6) as gz:
+        def write(obj: dict) -> None:
+            line = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+            gz.write(line.encode("utf-8") + b"\n")
+
+        write({
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "doctor_id": doctor_id,
+            "created_at": datetime.now(),
+        })
+        for table in _TABLES:
+            stmt = (
+                select(table)
+                .where(_doctor_filter(table, doctor_id))
+                .order_by(table.c.id)
+                .execution_options(yield_per=BATCH_SIZE)
+            )
+            result = await db.stream(stmt)
+            count = 0
+            async for partition in result.mappings().partitions():
+                for row in partition:
+                    write({"t": table.name, "r": dict(row)})
+                count += len(partition)
+            counts[table.name] = count
+        write({"end": counts})
+    logger.info("Tenant export doctor_id=%s: %s", doctor_id, counts)
+    return counts
+
+
+def _read_lines(src: BinaryIO) -> Iterator[dict]:
+    try:
+        with gzip.GzipFile(fileobj=src, mode="rb") as gz:
+            for raw in gz:
+                if raw.strip():
+                    yield json.loads(raw)
+    except (OSError, EOFError, json.JSONDecodeError) as e:
+        raise TenantBackupError(f"Повреждённый файл бэкапа: {e}") from e
+
+
+def _decode_row(table: Table, row: dict) -> dict:
+    """Строка из JSON → значения для вставки (даты обратно в date/datetime, только известные колонки)."""
+    values = {}
+    for column in table.columns:
+        if column.name not in row:
+            continue
+        value = row[column.name]
+        if isinstance(value, str):
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column.type, Date):
+                value = date.fromisoformat(value)
+        values[column.name] = value
+    return values
+
+
+class _Restorer:
+    """Вставка строк пачками с переназначением id (старый id из файла → новый в БД)."""
+
+    def __init__(self, db: AsyncSession, doctor: User, source_doctor_id: int):
+        self.db = db
+        self.doctor = doctor
+        self.ids: dict[str, dict[int, int]] = {t.name: {} for t in _TABLES}
+        self.ids[User.__tablename__][source_doctor_id] = doctor.id
+        self.source_doctor_id = source_doctor_id
+        self.counts: dict[str, int] = {}
+        # Ассистенты из файла, чьи аккаунты сейчас привязаны к другому врачу (старые id)
+        self.skipped_assistants: set[int] = set()
+
+    def _remap(self, table: Table, values: dict) -> dict:
+        for column in table.columns:
+            value = values.get(column.name)
+            if value is None or not column.foreign_keys:
+                continue
+            target = next(iter(column.foreign_keys)).column.table.name
+            new_id = self.ids.get(target, {}).get(value)
+            if new_id is None:
+                if not column.nullable:
+                    raise TenantBackupError(f"{table.name}.{column.name}: нет строки {target} id={value}")
+                new_id = None  # ссылка за пределы данных врача (SET NULL)
+            values[column.name] = new_id
+        return values
+
+    async def _restore_users(self, rows: list[dict]) -> None:
+        table = User.__table__
+        for row in rows:
+            old_id = row["id"]
+            values = _decode_row(table, row)
+            if old_id == self.source_doctor_id:
+                profile = {k: v for k, v in values.items() if k in _USER_PROFILE}
+                if "settings" in profile:
+                    # Поверх текущих: служебные отметки (default_services_seeded) не теряются
+                    current = await self.db.scalar(select(table.c.settings).where(table.c.id == self.doctor.id))
+                    profile["settings"] = {**(current or {}), **(profile["settings"] or {})}
+                await self.db.execute(update(table).where(table.c.id == self.doctor.id).values(**profile))
+                continue
+            # Ассистент — отдельный аккаунт: находим по telegram_id, профиль не трогаем
+            existing = (await self.db.execute(
+                select(table.c.id, table.c.owner_id).where(table.c.telegram_id == values["telegram_id"])
+            )).first()
+            link = {"owner_id": self.doctor.id, "role": values.get("role", "assistant")}
+            if existing is not None:
+                if not await self._can_link(existing.id, existing.owner_id):
+                    # Аккаунт работает у другого врача (или это сам врач) — не переносим
+                    self.skipped_assistants.add(old_id)
+                    continue
+                await self.db.execute(update(table).where(table.c.id == existing.id).values(**link))
+                self.ids[table.name][old_id] = existing.id
+            else:
+                values.pop("id", None)
+                values.update(link)
+                new_id = await self.db.scalar(insert(table).values(**values).returning(table.c.id))
+                self.ids[table.name][old_id] = new_id
+
+    async def _can_link(self, user_id: int, owner_id: Optional[int]) -> bool:
+        """Аккаунт можно привязать к врачу: уже его ассистент или свободен (не врач со своими пациентами)."""
+        if user_id == self.doctor.id:
+            return False
+        if owner_id is not None:
+            return owner_id == self.doctor.id
+        has_patients = await self.db.scalar(
+            select(Patient.__table__.c.id).where(Patient.__table__.c.doctor_id == user_id).limit(1)
+        )
+        return has_patients is None
+
+    async def unlink_missing_assistants(self) -> int:
+        """Отвязать текущих ассистентов врача, которых нет в файле (как удаление из команды)."""
+        table = User.__table__
+        restored = set(self.ids[table.name].values())
+        stmt = (
+            update(table)
+            .where(table.c.owner_id == self.doctor.id, table.c.id.not_in(restored))
+            .values(owner_id=None, role="owner")
+        )
+        return (await self.db.execute(stmt)).rowcount
+
+    async def flush(self, table_name: str, rows: list[dict]) -> None:
+        if table_name == DoctorAssistant.__tablename__:
+            rows = [row for row in rows if row.get("assistant_id") not in self.skipped_assistants]
+        if not rows:
+            return
+        self.counts[table_name] = self.counts.get(table_name, 0) + len(rows)
+        if table_name == User.__tablename__:
+            await self._restore_users(rows)
+            return
+        table = _TABLES_BY_NAME[table_name]
+        old_ids = [row["id"] for row in rows]
+        params = []
+        for row in rows:
+            values = self._remap(table, _decode_row(table, row))
+            values.pop("id", None)
+            params.append(values)
+        stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        result = await self.db.execute(stmt, params)
+        self.ids[table_name].update(zip(old_ids, result.scalars().all()))
+
+
+async def _delete_doctor_data(db: AsyncSession, doctor_id: int) -> None:
+    """Удалить данные врача (кроме самой строки врача и аккаунтов ассистентов).
+
+    Ассистенты, которых нет в файле, отвязываются после вставки (unlink_missing_assistants).
+    """
+    for table in reversed(_TABLES):
+        if table.name == User.__tablename__:
+            continue
+        await db.execute(delete(table).where(table.c.doctor_id == doctor_id))
+
+
+async def restore_doctor(db: AsyncSession, doctor: User, src: BinaryIO) -> dict[str, int]:
+    """Заменить данные врача данными из бэкапа. Возвращает количество строк по таблицам.
+
+    Подписка и роль врача не восстанавливаются. Ассистент из файла, чей аккаунт сейчас
+    у другого врача, пропускается (assistants_skipped); текущие ассистенты врача, которых
+    нет в файле, отвязываются (assistants_unlinked). Коммит — только после успешного чтения всего файла; при ошибке — откат.
+    """
+    lines = _read_lines(src)
+    header = next(lines, None)
+    if not header or header.get("format") != FORMAT_NAME:
+        raise TenantBackupError("Это не бэкап врача MiniStom")
+    if header.get("version") != FORMAT_VERSION:
+        raise TenantBackupError(f"Неподдерживаемая версия бэкапа: {header.get('version')}")
+
+    restorer = _Restorer(db, doctor, header["doctor_id"])
+    trailer: Optional[dict] = None
+    try:
+        await _delete_doctor_data(db, doctor.id)
+        table_name: Optional[str] = None
+        batch: list[dict] = []
+        for line in lines:
+            if "end" in line:
+                trailer = line["end"]
+                break
+            if line.get("t") not in _TABLES_BY_NAME:
+                raise TenantBackupError(f"Неизвестная таблица: {line.get('t')}")
+            if line["t"] != table_name or len(batch) >= BATCH_SIZE:
+                await restorer.flush(table_name, batch)
+                table_name, batch = line["t"], []
+            batch.append(line["r"])
+        await restorer.flush(table_name, batch)
+        if trailer is None:
+            raise TenantBackupError("Файл бэкапа обрезан (нет завершающей строки)")
+        unlinked = await restorer.unlink_missing_assistants()
+        if unlinked:
+            restorer.counts["assistants_unlinked"] = unlinked
+        if restorer.skipped_assistants:
+            # Аккаунты у другого врача: ни привязки, ни прав из файла
+            restorer.counts["assistants_skipped"] = len(restorer.skipped_assistants)
+            logger.warning("Tenant restore doctor_id=%s: skipped assistants of other doctors %s",
+                           doctor.id, sorted(restorer.skipped_assistants))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    # Профиль врача обновлён через Core — перечитываем ORM-объект
+    await db.refresh(doctor)
+
+    # Массовые INSERT/DELETE не вызывают ORM-события — сбрасываем индексы поиска явно
+    from app.services.fuzzy_index import invalidate_patients, invalidate_services
+    from app.services.service_service import invalidate_service_catalog
+    invalidate_patients(doctor.id)
+    invalidate_services(doctor.id)
+    invalidate_service_catalog(doctor.id)
+
+    logger.info("Tenant restore doctor_id=%s from doctor_id=%s: %s",
+                doctor.id, header["doctor_id"], restorer.counts)
+    return restorer.counts
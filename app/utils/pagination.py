@@ -0,0 +1,45 @@
+"""Keyset-пагинация по (дата, id) и дешёвый подсчёт строк."""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(moment: datetime, row_id: int) -> str:
+    """Непрозрачный курсор «после строки (moment, row_id)»."""
+    raw = f"{moment.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """(moment, row_id) из курсора; ValueError — если курсор испорчен."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        moment, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(moment), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+async def exact_count(db: AsyncSession, stmt: Select) -> int:
+    return (await db.execute(select(func.count()).select_from(stmt.order_by(None).subquery()))).scalar() or 0
+
+
+async def estimate_count(db: AsyncSession, stmt: Select) -> tuple[int, bool]:
+    """(количество строк stmt, оценка ли это).
+
+    На PostgreSQL — оценка планировщика из EXPLAIN (статистика таблицы и индексов,
+    без чтения строк); на других СУБД — точный count.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql":
+        return await exact_count(db, stmt), False
+    sql = stmt.order_by(None).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    # exec_driver_sql: двоеточия в литералах поиска не должны разбираться как параметры text()
+    conn = await db.connection()
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"]), True
@@ -0,0 +1,30 @@
+"""Замер длительности этапов обработки (голосовая запись и т.п.) для логов."""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class StageTimer:
+    """Длительность этапов в мс; параллельные этапы замеряются каждый в своей задаче."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages: dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def summary(self) -> str:
+        parts = [f"{stage}={ms:.0f}ms" for stage, ms in self.stages.items()]
+        parts.append(f"total={self.total_ms:.0f}ms")
+        return f"{self.name}: " + " ".join(parts)
@@ -0,0 +1 @@
+"""Бенчмарки MiniStom (запуск: python -m benchmarks.<имя>)."""
@@ -0,0 +1,51 @@
+"""
+Бенчмарк бэкапа и восстановления: дамп основной БД → восстановление в проверочную →
+сравнение сумм по таблицам. Каждый прогон дописывается в историю
+(BACKUP_DIR/backup_history.jsonl); таблица истории показывает рост размера и RTO.
+
+Нужны DATABASE_URL, BACKUP_VERIFY_DATABASE_URL (пустая отдельная БД) и pg_dump/pg_restore.
+
+Запуск: python -m benchmarks.bench_backup_restore [--runs 1] [--history-only]
+"""
+import argparse
+import asyncio
+
+from app.services.backup_verify import BACKUP_VERIFY_DATABASE_URL, load_history, run_verified_backup
+
+
+def _print_history(limit: int) -> None:
+    history = load_history(limit)
+    if not history:
+        print("история пуста")
+        return
+    print(f"{'дата':19}  {'размер, MB':>10}  {'дамп, с':>8}  {'RTO, с':>8}  {'строк':>9}  проверка")
+    for item in history:
+        restore = item.get("restore_seconds")
+        verified = {True: "ok", False: "FAIL", None: "—"}[item.get("verified")]
+        print(f"{item['created_at']:19}  {item['size_bytes'] / 1024 / 1024:10.2f}  "
+              f"{item['dump_seconds']:8.1f}  {restore if restore is not None else float('nan'):8.1f}  "
+              f"{item.get('rows', 0):9d}  {verified}")
+
+
+async def _run(runs: int) -> None:
+    for _ in range(runs):
+        report = await run_verified_backup()
+        print(report.status_line())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=1, help="сколько циклов бэкап+восстановление выполнить")
+    parser.add_argument("--history-only", action="store_true", help="только показать историю")
+    parser.add_argument("--limit", type=int, default=30, help="строк истории")
+    args = parser.parse_args()
+
+    if not args.history_only:
+        if not BACKUP_VERIFY_DATABASE_URL:
+            parser.error("задайте BACKUP_VERIFY_DATABASE_URL (отдельная БД для восстановления)")
+        asyncio.run(_run(args.runs))
+    _print_history(args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Точность и скорость локального разбора фраз записи (booking_parser) на корпусе
+tests/booking_phrases.json (общий с тестами booking_parser).
+
+Для каждой фразы в корпусе — ожидаемые поля или "llm": true (фраза должна уйти в GPT).
+Выводит: долю фраз, принятых локально, точность принятых (все ожидаемые поля совпали),
+ложные принятия «llm»-фраз и время разбора на фразу.
+
+Запуск: python -m benchmarks.bench_booking_parser [-n 2000] [--threshold 0.8] [-v]
+"""
+import argparse
+import time
+
+from app.services.ai_service import LOCAL_PARSE_MIN_CONFIDENCE
+from app.services.booking_parser import parse_booking_locally
+from tests.booking_corpus import load_corpus, mismatches, service_names
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=2000, help="проходов по корпусу для замера времени")
+    parser.add_argument("--threshold", type=float, default=LOCAL_PARSE_MIN_CONFIDENCE)
+    parser.add_argument("-v", "--verbose", action="store_true", help="печатать каждую фразу")
+    args = parser.parse_args()
+
+    today, cases = load_corpus()
+    names = service_names()
+
+    accepted = correct = false_accept = 0
+    expected_local = sum(1 for c in cases if not c.get("llm"))
+    for case in cases:
+        parsed = parse_booking_locally(case["text"], today, names)
+        local = parsed.confidence >= args.threshold
+        bad = mismatches(case, parsed) if local and not case.get("llm") else []
+        if local:
+            accepted += 1
+            if case.get("llm"):
+                false_accept += 1
+            elif not bad:
+                correct += 1
+        if args.verbose:
+            verdict = "LOCAL" if local else "LLM  "
+            print(f"{verdict} {parsed.confidence:.2f} {case['text']!r} -> "
+                  f"{parsed.patient_name} {parsed.date_str} {parsed.time_str} {parsed.service}"
+                  + (f"  MISMATCH {bad}" if bad else ""))
+
+    start = time.perf_counter()
+    for _ in range(args.n):
+        for case in cases:
+            parse_booking_locally(case["text"], today, names)
+    per_phrase = (time.perf_counter() - start) / (args.n * len(cases)) * 1_000_000
+
+    print(f"фраз в корпусе:           {len(cases)} (ожидается локально: {expected_local})")
+    print(f"принято локально:         {accepted} ({accepted / len(cases):.0%})")
+    print(f"точность принятых:        {correct}/{accepted - false_accept}")
+    print(f"ложно принятых (llm):     {false_accept}")
+    print(f"время разбора:            {per_phrase:8.1f} мкс/фраза")
+
+
+if __name__ == "__main__":
+    main()
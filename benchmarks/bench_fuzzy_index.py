@@ -0,0 +1,50 @@
+"""
+Бенчмарк нечёткого индекса пациентов: построение и поиск топ-5 в памяти.
+
+Запуск: python -m benchmarks.bench_fuzzy_index [--patients 5000] [-n 2000]
+"""
+import argparse
+import random
+import time
+
+from app.services.fuzzy_index import FuzzyIndex
+from app.services.patient_service import PatientRef
+
+_SURNAMES = ["Иванов", "Петров", "Сидоров", "Каримов", "Юсупов", "Алиев", "Ким", "Смирнов", "Орлов", "Рахимов"]
+_NAMES = ["Иван", "Азиз", "Мария", "Анна", "Дильшод", "Виктор", "Ольга", "Шахноза"]
+_QUERIES = ["Иванову", "Иваноф Иван", "Каримова", "Ким", "Рахимову Дильшоду", "Абдуллаев", "901234"]
+
+
+def _patients(count: int, seed: int = 1) -> list[PatientRef]:
+    rnd = random.Random(seed)
+    return [
+        PatientRef(i, f"{rnd.choice(_SURNAMES)}{rnd.choice(['', 'а'])} {rnd.choice(_NAMES)}",
+                   f"+99890{rnd.randrange(10**7):07d}")
+        for i in range(1, count + 1)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=5000, help="пациентов у врача")
+    parser.add_argument("-n", type=int, default=200, help="проходов по набору запросов")
+    args = parser.parse_args()
+
+    patients = _patients(args.patients)
+    start = time.perf_counter()
+    index = FuzzyIndex(patients, lambda p: f"{p.full_name} {p.phone.lstrip('+')}")
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(args.n):
+        for query in _QUERIES:
+            index.search(query)
+    per_query = (time.perf_counter() - start) / (args.n * len(_QUERIES)) * 1_000_000
+
+    print(f"пациентов:           {len(index)}")
+    print(f"построение индекса:  {build_ms:8.1f} мс")
+    print(f"поиск топ-5:         {per_query:8.1f} мкс/запрос")
+
+
+if __name__ == "__main__":
+    main()
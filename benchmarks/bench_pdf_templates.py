@@ -0,0 +1,81 @@
+"""
+Бенчмарк подготовки PDF: новое Environment + компиляция шаблона на каждый документ
+(как было раньше) против реестра скомпилированных шаблонов pdf_generator.
+
+Запуск: python -m benchmarks.bench_pdf_templates [-n 200] [--pdf]
+--pdf — дополнительно замерить полный цикл с WeasyPrint (нужны Cairo/Pango).
+"""
+import argparse
+import time
+from datetime import date, datetime
+
+from jinja2 import Environment, FileSystemLoader
+
+from app.database.models import User, Patient, Treatment, ImplantLog
+from app.services import pdf_generator
+from app.utils.formatters import format_money
+
+
+def _sample_data(rows: int = 15) -> tuple[User, Patient, list[Treatment], list[ImplantLog]]:
+    doctor = User(id=1, telegram_id=1, full_name="Доктор Бенчмарков", specialization="Хирург",
+                  phone="+998900000000", address="Ташкент")
+    patient = Patient(id=1, doctor_id=1, full_name="Иванов Иван", phone="+998901234567",
+                      birth_date=date(1985, 5, 1))
+    treatments = [
+        Treatment(id=i, patient_id=1, doctor_id=1, service_name=f"Услуга {i}", price=100_000 + i * 1000,
+                  discount_percent=10 if i % 3 == 0 else None, paid_amount=50_000,
+                  payment_status="partial", created_at=datetime(2026, 1, 1, 10, 0))
+        for i in range(1, rows + 1)
+    ]
+    implants = [
+        ImplantLog(id=i, patient_id=1, doctor_id=1, tooth_number=str(n), system_name="Straumann",
+                   implant_size="4.1 x 10", operation_date=date(2026, 1, 10))
+        for i, n in enumerate((36, 46, 14, 25), 1)
+    ]
+    return doctor, patient, treatments, implants
+
+
+def _render_uncached(doctor, patient, treatments) -> str:
+    """Путь до реестра: Environment и компиляция шаблона на каждый вызов."""
+    env = Environment(loader=FileSystemLoader(str(pdf_generator.TEMPLATE_DIR)))
+    env.filters["format_money"] = format_money
+    template = env.get_template(pdf_generator.INVOICE_TEMPLATE)
+    return template.render(
+        doctor=doctor, patient=patient, treatments=treatments,
+        effective_prices={t.id: t.price for t in treatments}, services=[],
+        total=0, total_discount=0, final_total=0, total_paid=0, total_debt=0,
+        generation_date=datetime.now(),
+    )
+
+
+def _timeit(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=200, help="итераций на вариант")
+    parser.add_argument("--pdf", action="store_true", help="замерить и WeasyPrint")
+    args = parser.parse_args()
+
+    doctor, patient, treatments, implants = _sample_data()
+    pdf_generator.warm_up()
+
+    uncached = _timeit(lambda: _render_uncached(doctor, patient, treatments), args.n)
+    cached = _timeit(lambda: pdf_generator.render_invoice_html(doctor, patient, treatments), args.n)
+    card = _timeit(lambda: pdf_generator.render_implant_card_html(doctor, patient, implants), args.n)
+    print(f"invoice HTML, без кэша шаблонов:  {uncached:8.3f} мс/док")
+    print(f"invoice HTML, реестр шаблонов:    {cached:8.3f} мс/док  (x{uncached / cached:.1f})")
+    print(f"implant card HTML, реестр:        {card:8.3f} мс/док")
+
+    if args.pdf:
+        pdf_n = max(1, args.n // 20)
+        full = _timeit(lambda: pdf_generator.generate_invoice_pdf(doctor, patient, treatments), pdf_n)
+        print(f"invoice PDF (WeasyPrint), полный: {full:8.3f} мс/док")
+
+
+if __name__ == "__main__":
+    main()
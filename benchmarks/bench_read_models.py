@@ -0,0 +1,186 @@
+"""
+Read-модели против ORM: расписание дня, список пациентов и список должников на
+детерминированном наборе (benchmarks.dataset). Для каждого представления — медиана
+времени и пик выделенной памяти (tracemalloc) на вызов для ORM-пути и проекции.
+
+Запуск:
+    python -m benchmarks.bench_read_models [--doctors 5 --patients 500 --years 2 --seed 42] [-n 20]
+        [--database-url postgresql+asyncpg://...] [--output read_models.json]
+
+Без --database-url — временный SQLite-файл; указанная БД должна быть пустой.
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from app.database.models import Appointment, Base, Patient, Treatment
+from app.handlers.finance import _treatment_debt
+from app.services.calendar_service import format_schedule_with_contacts
+from app.services.patient_service import get_all_patients
+from app.services.read_models import ScheduleRow, get_debtor_rows, get_patient_rows, get_schedule_rows
+from app.utils.formatters import format_money
+from benchmarks.bench_services import summarize
+from benchmarks.dataset import DatasetSpec, seed
+
+
+async def _schedule_orm(session: AsyncSession, doctor_id: int, day: date) -> str:
+    # Прежний путь: ORM-записи + selectinload связей, поля переписываются для форматтера
+    start, end = datetime.combine(day, datetime.min.time()), datetime.combine(day, datetime.max.time())
+    appointments = (await session.execute(
+        select(Appointment)
+        .options(
+            selectinload(Appointment.patient),
+            selectinload(Appointment.service),
+            selectinload(Appointment.location),
+        )
+        .where(and_(
+            Appointment.doctor_id == doctor_id,
+            Appointment.date_time >= start,
+            Appointment.date_time <= end,
+            Appointment.status != "cancelled",
+        ))
+        .order_by(Appointment.date_time)
+    )).scalars().all()
+    rows = [
+        ScheduleRow(
+            a.id, a.date_time, a.duration_minutes, a.service_description,
+            a.patient.full_name if a.patient else None, a.patient.phone if a.patient else None,
+            a.service.name if a.service else None, a.service.price if a.service else None,
+            a.service.duration_minutes if a.service else None, a.location.emoji if a.location else None,
+        )
+        for a in appointments
+    ]
+    return await format_schedule_with_contacts(rows)
+
+
+async def _schedule_projection(session: AsyncSession, doctor_id: int, day: date) -> str:
+    return await format_schedule_with_contacts(await get_schedule_rows(session, doctor_id, day))
+
+
+async def _patients_orm(session: AsyncSession, doctor_id: int, day: date) -> list[str]:
+    return [p.full_name for p in await get_all_patients(session, doctor_id)]
+
+
+async def _patients_projection(session: AsyncSession, doctor_id: int, day: date) -> list[str]:
+    return [p.full_name for p in await get_patient_rows(session, doctor_id)]
+
+
+async def _debtors_orm(session: AsyncSession, doctor_id: int, day: date) -> list[str]:
+    # Прежний finance_payments_list: все пациенты и все позиции лечения врача
+    patients = (await session.execute(
+        select(Patient).where(Patient.doctor_id == doctor_id).order_by(Patient.full_name)
+    )).scalars().all()
+    by_patient: dict[int, list[Treatment]] = {}
+    for t in (await session.execute(select(Treatment).where(Treatment.doctor_id == doctor_id))).scalars():
+        by_patient.setdefault(t.patient_id, []).append(t)
+    labels = []
+    for p in patients:
+        debt = sum(_treatment_debt(t) for t in by_patient.get(p.id, []) if t.price is not None)
+        labels.append(f"{p.full_name} — {format_money(debt)}")
+    return labels
+
+
+async def _debtors_projection(session: AsyncSession, doctor_id: int, day: date) -> list[str]:
+    return [f"{p.full_name} — {format_money(p.debt)}" for p in await get_debtor_rows(session, doctor_id)]
+
+
+VIEWS = {
+    "schedule_day": (_schedule_orm, _schedule_projection),
+    "patient_list": (_patients_orm, _patients_projection),
+    "debtor_list": (_debtors_orm, _debtors_projection),
+}
+
+
+async def _measure(
+    runs: int,
+    session_maker: async_sessionmaker,
+    fn: Callable[[AsyncSession, int, date], Awaitable],
+    doctor_id: int,
+    day: date,
+) -> dict:
+    """Медиана времени и медиана пика памяти (КБ) по вызовам; сессия — своя на вызов, как у апдейта."""
+    async def call() -> None:
+        async with session_maker() as session:
+            await fn(session, doctor_id, day)
+
+    await call()  # прогрев
+    samples, peaks = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - start)
+    for _ in range(max(1, runs // 4)):
+        tracemalloc.start()
+        await call()
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+    result = summarize(samples)
+    result["peak_kb"] = round(sorted(peaks)[len(peaks) // 2], 1)
+    return result
+
+
+async def run(database_url: str, spec: DatasetSpec, runs: int) -> dict:
+    engine = create_async_engine(database_url)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as session:
+            counts = await seed(session, spec, date.today())
+            # Самый загруженный день врача 1 — худший случай для расписания
+            day_expr = func.date(Appointment.date_time)
+            busiest = (await session.execute(
+                select(day_expr).where(Appointment.doctor_id == 1, Appointment.status != "cancelled")
+                .group_by(day_expr).order_by(func.count().desc()).limit(1)
+            )).scalar()
+        day = busiest if isinstance(busiest, date) else date.fromisoformat(str(busiest))
+
+        results = {}
+        for view, (orm_fn, projection_fn) in VIEWS.items():
+            orm = await _measure(runs, session_maker, orm_fn, 1, day)
+            projection = await _measure(runs, session_maker, projection_fn, 1, day)
+            results[f"{view}_orm"], results[f"{view}_projection"] = orm, projection
+            print(
+                f"{view:14} ORM {orm['median_ms']:8.3f} мс {orm['peak_kb']:9.1f} КБ | "
+                f"проекция {projection['median_ms']:8.3f} мс {projection['peak_kb']:9.1f} КБ"
+            )
+    finally:
+        await engine.dispose()
+    return {
+        "meta": {"database": engine.dialect.name, "dataset": spec.to_dict(), "rows": counts, "day": day.isoformat()},
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=DatasetSpec.doctors)
+    parser.add_argument("--patients", type=int, default=DatasetSpec.patients_per_doctor, help="пациентов у врача")
+    parser.add_argument("--years", type=int, default=DatasetSpec.years, help="лет истории записей")
+    parser.add_argument("--seed", type=int, default=DatasetSpec.seed)
+    parser.add_argument("-n", type=int, default=20, help="замеров времени на путь (памяти — в 4 раза меньше)")
+    parser.add_argument("--database-url", help="пустая БД для набора (по умолчанию временный SQLite)")
+    parser.add_argument("--output", type=Path, help="записать результаты в JSON")
+    args = parser.parse_args()
+
+    spec = DatasetSpec(seed=args.seed, doctors=args.doctors, patients_per_doctor=args.patients, years=args.years)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        report = asyncio.run(run(url, spec, args.n))
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"результаты: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Бенчмарк основных сервисов на детерминированном наборе (benchmarks.dataset):
+напоминания, поиск пациентов, занятость дня, запросы статистики финансов,
+Excel-экспорт и документы PDF. Результаты — JSON для сравнения между коммитами.
+
+Запуск:
+    python -m benchmarks.bench_services [--doctors 5 --patients 500 --years 2 --seed 42] [-n 20]
+        [--database-url postgresql+asyncpg://...] [--pdf] [--output bench.json]
+        [--compare baseline.json --tolerance 0.2]
+
+Без --database-url — временный SQLite-файл. Указанная БД должна быть пустой (таблицы
+создаются, строки вставляются с фиксированными id). --pdf — полный PDF через WeasyPrint
+(нужны Cairo/Pango), иначе замеряется рендер HTML. С --compare код выхода 1, если медиана
+какого-либо замера выросла больше чем на tolerance (и больше чем на 0.5 мс).
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database.models import Base, ImplantLog, Patient, Treatment, User
+from app.handlers.finance import finance_stats_show
+from app.services import pdf_generator
+from app.services.calendar_service import get_busy_ranges_for_date
+from app.services.export_service import build_patients_excel, get_patients_with_relations
+from app.services.patient_service import search_patients
+from app.services.reminder_service import get_appointments_due_for_reminder
+from app.utils.permissions import full_permissions
+from benchmarks.dataset import DatasetSpec, seed
+
+_MIN_REGRESSION_MS = 0.5
+_SEARCH_QUERIES = ["Иванов", "Ким", "+99890", "ова Ан", "Несуществующий"]
+
+
+class _StubMessage:
+    async def edit_text(self, *args, **kwargs) -> None:
+        pass
+
+
+class _StubCallback:
+    """Минимальный CallbackQuery для вызова хендлера без Telegram."""
+
+    def __init__(self, data: str):
+        self.data = data
+        self.message = _StubMessage()
+
+    async def answer(self, *args, **kwargs) -> None:
+        pass
+
+
+def summarize(samples: list[float]) -> dict:
+    """Секунды → мс: медиана, минимум, p95."""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "runs": len(ms),
+        "median_ms": round(statistics.median(ms), 3),
+        "min_ms": round(ms[0], 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Замеры, медиана которых выросла больше допустимого."""
+    regressions = []
+    for name, result in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        new_ms, old_ms = result["median_ms"], old["median_ms"]
+        if new_ms > old_ms * (1 + tolerance) and new_ms - old_ms > _MIN_REGRESSION_MS:
+            regressions.append(f"{name}: {old_ms:.3f} → {new_ms:.3f} мс (+{(new_ms / old_ms - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _measure(runs: int, fn: Callable[[], Awaitable | None]) -> dict:
+    # Первый вызов — прогрев (компиляция запросов, шаблонов, кэши драйвера)
+    result = fn()
+    if asyncio.iscoroutine(result):
+        await result
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        if asyncio.iscoroutine(result):
+            await result
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def run(database_url: str, spec: DatasetSpec, runs: int, full_pdf: bool) -> dict:
+    engine = create_async_engine(database_url)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    today = date.today()
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        start = time.perf_counter()
+        async with session_maker() as session:
+            counts = await seed(session, spec, today)
+        seed_seconds = time.perf_counter() - start
+
+        async with session_maker() as session:
+            doctor = await session.get(User, 1)
+            patients = await get_patients_with_relations(session, doctor.id)
+            implant_patient = (await session.execute(
+                select(Patient).join(ImplantLog, ImplantLog.patient_id == Patient.id).limit(1)
+            )).scalars().first()
+            implants = list((await session.execute(
+                select(ImplantLog).where(ImplantLog.patient_id == implant_patient.id)
+            )).scalars().all()) if implant_patient else []
+        invoice_patient = max(patients, key=lambda p: len(p.treatments))
+        invoice_treatments: list[Treatment] = invoice_patient.treatments
+        busy_day = today - timedelta(days=30)
+
+        def with_session(fn: Callable[[AsyncSession], Awaitable]) -> Callable[[], Awaitable]:
+            async def call():
+                async with session_maker() as session:
+                    await fn(session)
+            return call
+
+        async def search_all(session: AsyncSession) -> None:
+            for query in _SEARCH_QUERIES:
+                await search_patients(session, doctor.id, query)
+
+        def finance_stats(period: str):
+            async def call(session: AsyncSession) -> None:
+                await finance_stats_show(_StubCallback(f"finance_stats_{period}"), doctor, full_permissions(), session)
+            return call
+
+        benches: dict[str, Callable[[], Awaitable | None]] = {
+            "reminders_due": with_session(get_appointments_due_for_reminder),
+            "search_patients_x5": with_session(search_all),
+            "busy_ranges_for_date": with_session(lambda s: get_busy_ranges_for_date(s, doctor.id, busy_day)),
+            "finance_stats_30": with_session(finance_stats("30")),
+            "finance_stats_all": with_session(finance_stats("all")),
+            "export_load_patients": with_session(lambda s: get_patients_with_relations(s, doctor.id)),
+            "export_patients_excel": lambda: build_patients_excel(patients),
+        }
+        pdf_generator.warm_up()
+        if full_pdf:
+            benches["invoice_pdf"] = lambda: pdf_generator.generate_invoice_pdf(doctor, invoice_patient, invoice_treatments)
+            if implant_patient:
+                benches["implant_card_pdf"] = lambda: pdf_generator.generate_implant_card_pdf(doctor, implant_patient, implants)
+        else:
+            benches["invoice_html"] = lambda: pdf_generator.render_invoice_html(doctor, invoice_patient, invoice_treatments)
+            if implant_patient:
+                benches["implant_card_html"] = lambda: pdf_generator.render_implant_card_html(doctor, implant_patient, implants)
+
+        results = {}
+        for name, fn in benches.items():
+            pdf_runs = max(1, runs // 5) if name.endswith("_pdf") else runs
+            results[name] = await _measure(pdf_runs, fn)
+            print(f"{name:24} {results[name]['median_ms']:10.3f} мс (медиана, p95 {results[name]['p95_ms']:.3f})")
+    finally:
+        await engine.dispose()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "dataset": spec.to_dict(),
+            "rows": counts,
+            "seed_seconds": round(seed_seconds, 2),
+            "invoice_treatments": len(invoice_treatments),
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=DatasetSpec.doctors)
+    parser.add_argument("--patients", type=int, default=DatasetSpec.patients_per_doctor, help="пациентов у врача")
+    parser.add_argument("--years", type=int, default=DatasetSpec.years, help="лет истории записей")
+    parser.add_argument("--seed", type=int, default=DatasetSpec.seed)
+    parser.add_argument("-n", type=int, default=20, help="замеров на сценарий (PDF — в 5 раз меньше)")
+    parser.add_argument("--database-url", help="пустая БД для набора (по умолчанию временный SQLite)")
+    parser.add_argument("--pdf", action="store_true", help="полный PDF через WeasyPrint")
+    parser.add_argument("--output", type=Path, help="записать результаты в JSON")
+    parser.add_argument("--compare", type=Path, help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост медианы (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    spec = DatasetSpec(seed=args.seed, doctors=args.doctors, patients_per_doctor=args.patients, years=args.years)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        report = asyncio.run(run(url, spec, args.n, args.pdf))
+
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"результаты: {args.output}")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if baseline.get("meta", {}).get("dataset") != report["meta"]["dataset"]:
+            print("внимание: параметры набора в baseline отличаются — сравнение неточное")
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("регрессии:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"регрессий нет (baseline {baseline.get('meta', {}).get('commit')})")
+
+
+if __name__ == "__main__":
+    main()
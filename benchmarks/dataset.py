@@ -0,0 +1,151 @@
+"""
+Детерминированный набор данных для бенчмарков: N врачей, M пациентов у каждого,
+годы записей и лечения, ассистенты врачей. Одинаковые seed и параметры дают одинаковые строки;
+даты отсчитываются от сегодняшнего дня (напоминания ищутся относительно now).
+"""
+import random
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Appointment, DoctorAssistant, ImplantLog, Patient, Service, Treatment, User
+from app.utils.permissions import full_permissions
+
+SURNAMES = ["Иванов", "Петров", "Сидоров", "Каримов", "Юсупов", "Алиев", "Ким", "Смирнов", "Орлов", "Рахимов",
+            "Абдуллаев", "Насыров", "Турсунов", "Волков", "Ахмедов"]
+_NAMES = ["Иван", "Азиз", "Мария", "Анна", "Дильшод", "Виктор", "Ольга", "Шахноза", "Тимур", "Нодира"]
+_SERVICES = [("therapy", "Пломба", 250_000, 60), ("therapy", "Чистка", 150_000, 45),
+             ("surgery", "Удаление", 200_000, 30), ("surgery", "Имплантация", 3_500_000, 90),
+             ("orthopedics", "Коронка", 1_200_000, 60), ("endodontics", "Лечение каналов", 600_000, 90),
+             ("therapy", "Консультация", 50_000, 30), ("orthodontics", "Брекеты", 8_000_000, 60)]
+_TIMEZONES = ["Asia/Tashkent", "Europe/Moscow", "Asia/Almaty"]
+_BATCH = 5000
+DOCTOR_TELEGRAM_BASE = 900_000_000
+ASSISTANT_TELEGRAM_BASE = 910_000_000
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Параметры набора; to_dict() попадает в JSON результатов."""
+    seed: int = 42
+    doctors: int = 5
+    patients_per_doctor: int = 500
+    years: int = 2
+    visits_per_patient_year: int = 4
+    assistants_per_doctor: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _phone(rnd: random.Random) -> str:
+    return f"+99890{rnd.randrange(10**7):07d}"
+
+
+def generate(spec: DatasetSpec, today: date | None = None) -> dict[type, list[dict]]:
+    """Строки для вставки по моделям (id задаются явно — связи без round-trip к БД)."""
+    rnd = random.Random(spec.seed)
+    today = today or date.today()
+    anchor = datetime.combine(today, datetime.min.time())
+    rows: dict[type, list[dict]] = {User: [], DoctorAssistant: [], Service: [], Patient: [], Appointment: [],
+                                    Treatment: [], ImplantLog: []}
+    patient_id = appointment_id = treatment_id = implant_id = service_id = 0
+    days = spec.years * 365
+
+    for doctor_id in range(1, spec.doctors + 1):
+        rows[User].append({
+            "id": doctor_id, "telegram_id": DOCTOR_TELEGRAM_BASE + doctor_id, "full_name": f"Доктор {doctor_id}",
+            "specialization": "Стоматолог", "subscription_tier": 2, "role": "owner",
+            "owner_id": None, "registration_completed": True, "timezone": _TIMEZONES[doctor_id % len(_TIMEZONES)],
+            "settings": {"reminder_minutes": rnd.choice([60, 120, 1440])},
+            "created_at": anchor - timedelta(days=days),
+        })
+        # Ассистенты — без rnd, чтобы их число не меняло остальные строки набора
+        for k in range(spec.assistants_per_doctor):
+            assistant_id = spec.doctors + (doctor_id - 1) * spec.assistants_per_doctor + k + 1
+            rows[User].append({
+                "id": assistant_id, "telegram_id": ASSISTANT_TELEGRAM_BASE + assistant_id,
+                "full_name": f"Ассистент {assistant_id}", "specialization": None, "subscription_tier": 0,
+                "role": "assistant", "owner_id": doctor_id, "registration_completed": True,
+                "timezone": None, "settings": None, "created_at": anchor - timedelta(days=days),
+            })
+            rows[DoctorAssistant].append({
+                "id": assistant_id, "doctor_id": doctor_id, "assistant_id": assistant_id,
+                "permissions": full_permissions(),
+            })
+        services = []
+        for order, (category, name, price, duration) in enumerate(_SERVICES):
+            service_id += 1
+            services.append((service_id, name, price, duration))
+            rows[Service].append({
+                "id": service_id, "doctor_id": doctor_id, "category": category, "name": name,
+                "price": price, "duration_minutes": duration, "sort_order": order,
+            })
+
+        for _ in range(spec.patients_per_doctor):
+            patient_id += 1
+            created = anchor - timedelta(days=rnd.randrange(days), minutes=rnd.randrange(600))
+            rows[Patient].append({
+                "id": patient_id, "doctor_id": doctor_id,
+                "full_name": f"{rnd.choice(SURNAMES)}{rnd.choice(['', 'а'])} {rnd.choice(_NAMES)}",
+                "phone": _phone(rnd), "birth_date": date(1950 + rnd.randrange(60), 1 + rnd.randrange(12), 1 + rnd.randrange(28)),
+                "created_at": created, "updated_at": created,
+            })
+            visits = max(1, round(rnd.gauss(spec.visits_per_patient_year * spec.years, 2)))
+            for _ in range(visits):
+                appointment_id += 1
+                # ~2% записей — в ближайшие двое суток (кандидаты для напоминаний)
+                if rnd.random() < 0.02:
+                    when = anchor + timedelta(days=rnd.randrange(2), hours=9 + rnd.randrange(9))
+                else:
+                    when = anchor - timedelta(days=rnd.randrange(days)) + timedelta(hours=9 + rnd.randrange(9))
+                sid, name, price, duration = rnd.choice(services)
+                past = when < anchor
+                rows[Appointment].append({
+                    "id": appointment_id, "doctor_id": doctor_id, "patient_id": patient_id, "service_id": sid,
+                    "date_time": when, "duration_minutes": duration, "service_description": name,
+                    "status": ("completed" if rnd.random() < 0.9 else "cancelled") if past else "planned",
+                    "reminder_sent_at": when - timedelta(hours=2) if past else None,
+                    "created_at": when - timedelta(days=rnd.randrange(1, 14)),
+                })
+                if not past:
+                    continue
+                treatment_id += 1
+                paid = rnd.choice([price, price, price, price / 2, 0])
+                rows[Treatment].append({
+                    "id": treatment_id, "patient_id": patient_id, "doctor_id": doctor_id,
+                    "appointment_id": appointment_id, "tooth_number": str(rnd.choice([11, 16, 26, 36, 46, 47])),
+                    "service_name": name, "price": price,
+                    "discount_percent": 10 if rnd.random() < 0.1 else None, "paid_amount": paid,
+                    "payment_status": "full" if paid == price else ("partial" if paid else "debt"),
+                    "created_at": when,
+                })
+                if name == "Имплантация":
+                    implant_id += 1
+                    rows[ImplantLog].append({
+                        "id": implant_id, "patient_id": patient_id, "doctor_id": doctor_id,
+                        "tooth_number": rows[Treatment][-1]["tooth_number"], "system_name": "Straumann",
+                        "implant_size": "4.1 x 10", "operation_date": when.date(), "created_at": when,
+                    })
+    return rows
+
+
+async def seed(session: AsyncSession, spec: DatasetSpec, today: date | None = None) -> dict[str, int]:
+    """Записать набор в пустую БД пачками; возвращает число строк по таблицам."""
+    counts = {}
+    rows = generate(spec, today)
+    for model, items in rows.items():
+        for i in range(0, len(items), _BATCH):
+            await session.execute(insert(model), items[i:i + _BATCH])
+        counts[model.__tablename__] = len(items)
+    if session.bind.dialect.name == "postgresql":
+        # id заданы явно — сдвигаем последовательности, чтобы вставки приложения не конфликтовали
+        for model in rows:
+            table = model.__tablename__
+            await session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT max(id) FROM {table}), 1))"
+            ))
+    await session.commit()
+    return counts
@@ -0,0 +1,370 @@
+"""
+Нагрузочный стенд бота: настоящий Dispatcher из app.main (все middleware и роутеры)
+получает синтетические апдейты от врачей и ассистентов набора benchmarks.dataset.
+
+Bot API заглушен (StubSession: без сети, ответ через --api-latency-ms), БД — локальная.
+Отчёт: пропускная способность (апдейтов/с), p50/p95/p99 обработки апдейта по шагам
+сценария и по хендлерам (трасса app.middleware.tracing), загрузка пула соединений.
+
+Сценарии:
+    morning_rush         — утро: расписание на сегодня, день в календаре, история пациента, поиск
+    end_of_day_payments  — вечер: финансы, должники, история пациента, внесение оплаты
+
+Запуск:
+    python -m benchmarks.load_bot [--scenario all] [--sessions 2000] [--concurrency 100]
+        [--doctors 1000 --assistants 1 --patients 20] [--api-latency-ms 40] [--sqlite] [--output load.json]
+
+По умолчанию БД — DATABASE_URL приложения: только локальная пустая PostgreSQL (набор
+вставляется с фиксированными id), пул как в проде. --sqlite — временный SQLite-файл
+(пул другой; цифры годятся только для сравнения прогонов между собой).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import AsyncGenerator, Callable, Iterator, NamedTuple, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import CallbackQuery, Chat, Message, Update, User as TgUser
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.database import base as db_base, session as db_session_module
+from app.database.models import Base
+from app.middleware import tracing, user as user_middleware
+from app.middleware.outbound import OutboundCounterMiddleware
+from app.services.metrics import install_db_metrics
+from benchmarks.bench_services import summarize
+from benchmarks.dataset import (
+    ASSISTANT_TELEGRAM_BASE, DOCTOR_TELEGRAM_BASE, DatasetSpec, SURNAMES, seed,
+)
+
+_TOKEN = "123456789:LOAD-test-token"
+_POOL_SAMPLE_SECONDS = 0.05
+
+
+class StubSession(BaseSession):
+    """Сессия Bot API без сети: считает методы, отвечает через заданную задержку."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self.throttled = 0
+        self._message_id = 0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None):
+        self.calls[type(method).__name__] += 1
+        if (getattr(method, "text", None) or "").startswith("⏳"):
+            self.throttled += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method.__returning__ is Message:
+            self._message_id += 1
+            chat_id = getattr(method, "chat_id", 0)
+            return Message(
+                message_id=self._message_id, date=datetime.now(),
+                chat=Chat(id=chat_id if isinstance(chat_id, int) else 0, type="private"),
+            ).as_(bot)
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536,
+                             raise_for_status=True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+
+@dataclass
+class Actor:
+    telegram_id: int
+    doctor_id: int
+
+
+class Step(NamedTuple):
+    """Шаг сценария: kind — "msg" (текст) или "cb" (callback_data); label — имя в отчёте."""
+    kind: str
+    payload: str
+    label: str
+
+
+def msg(text: str, label: Optional[str] = None) -> Step:
+    return Step("msg", text, f"msg:{label or text}")
+
+
+def cb(data: str, label: Optional[str] = None) -> Step:
+    return Step("cb", data, f"cb:{label or data}")
+
+
+def morning_rush(actor: Actor, rnd: random.Random, spec: DatasetSpec) -> Iterator[Step]:
+    today = date.today()
+    yield msg("/menu")
+    yield msg("/today")
+    yield msg("📋 Расписание")
+    yield cb(f"sched_date_{today.year}_{today.month}_{today.day}", "sched_date")
+    yield cb(f"patient_history_{_patient_id(actor, rnd, spec)}", "patient_history")
+    yield cb("patient_search")
+    yield msg(rnd.choice(SURNAMES), "поиск пациента")
+
+
+def end_of_day_payments(actor: Actor, rnd: random.Random, spec: DatasetSpec) -> Iterator[Step]:
+    patient_id = _patient_id(actor, rnd, spec)
+    yield msg("/menu")
+    yield msg("💰 Финансы")
+    yield cb("finance_payments")
+    yield cb(f"patient_history_{patient_id}", "patient_history")
+    yield cb(f"history_payment_{patient_id}", "history_payment")
+    yield msg("/skip", "скидка /skip")
+    yield msg("1000", "сумма оплаты")
+    yield cb("pay_method_cash")
+    yield cb(rnd.choice(["finance_stats_month", "finance_stats_30"]), "finance_stats")
+
+
+SCENARIOS: dict[str, Callable[[Actor, random.Random, DatasetSpec], Iterator[Step]]] = {
+    "morning_rush": morning_rush,
+    "end_of_day_payments": end_of_day_payments,
+}
+
+
+def _patient_id(actor: Actor, rnd: random.Random, spec: DatasetSpec) -> int:
+    return (actor.doctor_id - 1) * spec.patients_per_doctor + rnd.randrange(spec.patients_per_doctor) + 1
+
+
+def actors(spec: DatasetSpec) -> list[Actor]:
+    """Врачи и ассистенты набора (id и telegram_id — как в benchmarks.dataset)."""
+    result = [Actor(DOCTOR_TELEGRAM_BASE + d, d) for d in range(1, spec.doctors + 1)]
+    for d in range(1, spec.doctors + 1):
+        for k in range(spec.assistants_per_doctor):
+            assistant_id = spec.doctors + (d - 1) * spec.assistants_per_doctor + k + 1
+            result.append(Actor(ASSISTANT_TELEGRAM_BASE + assistant_id, d))
+    return result
+
+
+def make_update(update_id: int, telegram_id: int, step: Step) -> Update:
+    kind, payload, _ = step
+    tg_user = TgUser(id=telegram_id, is_bot=False, first_name="Load")
+    message = Message(
+        message_id=update_id, date=datetime.now(), chat=Chat(id=telegram_id, type="private"),
+        from_user=tg_user, text=payload if kind == "msg" else "…",
+    )
+    if kind == "msg":
+        return Update(update_id=update_id, message=message)
+    return Update(update_id=update_id, callback_query=CallbackQuery(
+        id=str(update_id), from_user=tg_user, chat_instance="load", data=payload, message=message,
+    ))
+
+
+def use_engine(engine: AsyncEngine) -> None:
+    """Переключить приложение на движок стенда (--sqlite): middleware берут сессии отсюда."""
+    maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    db_base.engine = engine
+    db_base.async_session_maker = maker
+    db_session_module.async_session_maker = maker
+    user_middleware.async_session_maker = maker
+
+
+class PoolSampler:
+    """Периодические снимки пула: пик выданных соединений и доля времени без свободных."""
+
+    def __init__(self):
+        self.samples = 0
+        self.exhausted = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.size: Optional[int] = None
+
+    def sample(self) -> None:
+        stats = db_base.pool_stats()
+        self.samples += 1
+        self.size = stats.get("size", self.size)
+        checked_out = stats.get("checked_out", 0)
+        self.peak_checked_out = max(self.peak_checked_out, checked_out)
+        self.peak_overflow = max(self.peak_overflow, stats.get("overflow", 0))
+        if checked_out and stats.get("checked_in", 1) == 0:
+            self.exhausted += 1
+
+    async def run(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(_POOL_SAMPLE_SECONDS)
+
+    def report(self) -> dict:
+        return {
+            "pool_class": db_base.pool_stats().get("class"),
+            "size": self.size,
+            "peak_checked_out": self.peak_checked_out,
+            "peak_overflow": self.peak_overflow,
+            "exhausted_share": round(self.exhausted / self.samples, 3) if self.samples else 0.0,
+        }
+
+
+class _ErrorCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+
+async def run_scenario(dp, bot: Bot, name: str, spec: DatasetSpec, sessions: int,
+                       concurrency: int, think: float, seed_value: int) -> dict:
+    rnd = random.Random(seed_value)
+    people = actors(spec)
+    plans = []
+    for _ in range(sessions):
+        actor = rnd.choice(people)
+        plans.append((actor, list(SCENARIOS[name](actor, rnd, spec))))
+
+    latencies: list[float] = []
+    by_step: defaultdict[str, list[float]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+    update_ids = iter(range(1, 10**9))
+    sampler = PoolSampler()
+    errors = _ErrorCounter()
+    logging.getLogger().addHandler(errors)
+    tracing.reset_latency()
+
+    async def play(actor: Actor, steps: list[Step]) -> None:
+        async with semaphore:
+            for step in steps:
+                update = make_update(next(update_ids), actor.telegram_id, step)
+                start = time.perf_counter()
+                await dp.feed_update(bot, update)
+                elapsed = time.perf_counter() - start
+                latencies.append(elapsed)
+                by_step[step.label].append(elapsed)
+                if think:
+                    await asyncio.sleep(think)
+
+    sampler_task = asyncio.create_task(sampler.run())
+    calls_before = sum(bot.session.calls.values())
+    throttled_before = bot.session.throttled
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(play(actor, steps) for actor, steps in plans))
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler_task.cancel()
+        logging.getLogger().removeHandler(errors)
+
+    handlers = {
+        handler: {"samples": s.samples, "p50_ms": round(s.p50, 2), "p95_ms": round(s.p95, 2), "p99_ms": round(s.p99, 2)}
+        for handler, s in sorted(tracing.get_latency().items(), key=lambda item: -item[1].p95)
+    }
+    return {
+        "sessions": sessions,
+        "updates": len(latencies),
+        "seconds": round(elapsed, 2),
+        "updates_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency": _percentiles(latencies),
+        "steps": {label: _percentiles(values) for label, values in by_step.items()},
+        "handlers": handlers,
+        "pool": sampler.report(),
+        "bot_api_calls": sum(bot.session.calls.values()) - calls_before,
+        "throttled": bot.session.throttled - throttled_before,
+        "errors": errors.count,
+    }
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    result = summarize(samples)
+    result["p99_ms"] = round(tracing.percentile(ordered, 99) * 1000, 3) if ordered else 0.0
+    return result
+
+
+def _print(name: str, report: dict) -> None:
+    lat, pool = report["latency"], report["pool"]
+    print(f"\n== {name}: {report['updates']} апдейтов за {report['seconds']} с — "
+          f"{report['updates_per_second']} апд/с")
+    print(f"   задержка: p50 {lat['median_ms']:.1f} / p95 {lat['p95_ms']:.1f} / p99 {lat['p99_ms']:.1f} мс")
+    print(f"   пул: {pool['pool_class']} size={pool['size']} пик выдано={pool['peak_checked_out']} "
+          f"overflow={pool['peak_overflow']} без свободных {pool['exhausted_share']:.0%} времени")
+    print(f"   Bot API: {report['bot_api_calls']} вызовов, throttle: {report['throttled']}, ошибок: {report['errors']}")
+    for label, stats in sorted(report["steps"].items(), key=lambda item: -item[1]["p95_ms"]):
+        print(f"   {label:32} p50 {stats['median_ms']:8.1f}  p95 {stats['p95_ms']:8.1f}  p99 {stats['p99_ms']:8.1f} мс")
+    print("   самые медленные хендлеры (без ожидания в очереди), p95:")
+    for handler, stats in list(report["handlers"].items())[:5]:
+        print(f"   {handler:40} {stats['p95_ms']:8.1f} мс ({stats['samples']} апд.)")
+
+
+async def main_async(args: argparse.Namespace, spec: DatasetSpec, sqlite_path: Optional[Path]) -> dict:
+    if sqlite_path:
+        # Пул с размерами по умолчанию, как у движка PostgreSQL, — чтобы насыщение было видно
+        use_engine(create_async_engine(f"sqlite+aiosqlite:///{sqlite_path}", poolclass=AsyncAdaptedQueuePool))
+    engine = db_base.engine
+    install_db_metrics(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with db_base.async_session_maker() as session:
+        counts = await seed(session, spec)
+
+    # Импорт здесь: app.main настраивает логирование и регистрирует роутеры
+    from app.main import create_dispatcher
+    dp = create_dispatcher()
+    bot = Bot(token=_TOKEN, session=StubSession(args.api_latency_ms / 1000))
+    bot.session.middleware(OutboundCounterMiddleware())
+    logging.getLogger().setLevel(logging.ERROR)
+
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = {}
+    try:
+        for offset, name in enumerate(names):
+            results[name] = await run_scenario(
+                dp, bot, name, spec, args.sessions, args.concurrency, args.think_ms / 1000, args.seed + offset,
+            )
+            _print(name, results[name])
+    finally:
+        await engine.dispose()
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "database": engine.dialect.name,
+            "dataset": spec.to_dict(),
+            "rows": counts,
+            "concurrency": args.concurrency,
+            "api_latency_ms": args.api_latency_ms,
+            "think_ms": args.think_ms,
+        },
+        "scenarios": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="all")
+    parser.add_argument("--sessions", type=int, default=2000, help="сессий пользователей на сценарий")
+    parser.add_argument("--concurrency", type=int, default=100, help="одновременных сессий")
+    parser.add_argument("--think-ms", type=float, default=0, help="пауза пользователя между шагами")
+    parser.add_argument("--api-latency-ms", type=float, default=40, help="задержка ответа заглушки Bot API")
+    parser.add_argument("--doctors", type=int, default=1000)
+    parser.add_argument("--assistants", type=int, default=1, help="ассистентов у врача")
+    parser.add_argument("--patients", type=int, default=20, help="пациентов у врача")
+    parser.add_argument("--years", type=int, default=1, help="лет истории записей")
+    parser.add_argument("--seed", type=int, default=DatasetSpec.seed)
+    parser.add_argument("--sqlite", action="store_true", help="временный SQLite вместо DATABASE_URL")
+    parser.add_argument("--output", type=Path, help="записать отчёт в JSON")
+    args = parser.parse_args()
+
+    spec = DatasetSpec(seed=args.seed, doctors=args.doctors, patients_per_doctor=args.patients,
+                       years=args.years, assistants_per_doctor=args.assistants)
+    with tempfile.TemporaryDirectory() as tmp:
+        report = asyncio.run(main_async(args, spec, Path(tmp) / "load.db" if args.sqlite else None))
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nотчёт: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Корпус фраз записи (tests/booking_phrases.json): тесты booking_parser и бенчмарк разбора."""
+import json
+from datetime import date
+from pathlib import Path
+
+from app.services.service_service import DEFAULT_SERVICES
+
+CORPUS = Path(__file__).with_name("booking_phrases.json")
+_FIELDS = {"patient_name": "patient_name", "date": "date_str", "time": "time_str", "service": "service"}
+
+
+def load_corpus(path: Path = CORPUS) -> tuple[date, list[dict]]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return date.fromisoformat(data["today"]), data["phrases"]
+
+
+def service_names() -> list[str]:
+    return [name for items in DEFAULT_SERVICES.values() for name, _ in items]
+
+
+def mismatches(case: dict, parsed) -> list[str]:
+    """Поля, в которых результат расходится с ожидаемым."""
+    return [
+        key for key, attr in _FIELDS.items()
+        if key in case and getattr(parsed, attr) != case[key]
+    ]
@@ -5,6 +5,7 @@ from datetime import datetime, date
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
 from app.database.models import Base, User, Patient, Appointment, Service
+from app.services.service_service import _catalogs
 from app.utils.permissions import (
     full_permissions, default_permissions,
     FEATURE_CALENDAR, FEATURE_PATIENTS, FEATURE_HISTORY,
@@ -16,6 +17,14 @@ from app.utils.permissions import (
 
 # --- Async DB fixtures (SQLite in-memory) ---
 
+@pytest.fixture(autouse=True)
+def clear_service_catalog():
+    """Каталог услуг кэшируется по doctor_id, а id в каждой тестовой БД начинаются с 1."""
+    _catalogs.clear()
+    yield
+    _catalogs.clear()
+
+
 @pytest_asyncio.fixture
 async def db_engine():
     """Async SQLite engine для тестов."""
@@ -6,6 +6,7 @@ import time
 from unittest.mock import patch, AsyncMock, MagicMock
 
 import pytest
+import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 
 # Мокаем Config до импорта admin_webapp
@@ -26,6 +27,24 @@ def _build_init_data(bot_token: str, user_id: int = 100) -> str:
     return f"{raw}&hash={h}"
 
 
+@pytest.fixture(autouse=True)
+def clear_ready_cache():
+    from admin_webapp.main import _ready_cache
+    _ready_cache.clear()
+    yield
+    _ready_cache.clear()
+
+
+def _mock_session_maker(mock_sm, execute):
+    mock_session = AsyncMock()
+    mock_session.execute = execute
+    mock_ctx = AsyncMock()
+    mock_ctx.__aenter__ = AsyncMock(return_value=mock_session)
+    mock_ctx.__aexit__ = AsyncMock(return_value=False)
+    mock_sm.return_value = mock_ctx
+    return mock_session
+
+
 @pytest.fixture
 def valid_headers():
     return {"X-Telegram-Init-Data": _build_init_data(_TEST_TOKEN, user_id=100)}
@@ -105,3 +124,121 @@ async def test_security_headers():
             assert resp.headers.get("x-frame-options") == "SAMEORIGIN"
             assert resp.headers.get("x-xss-protection") == "1; mode=block"
             assert "strict-origin" in resp.headers.get("referrer-policy", "")
+
+
+
+@pytest_asyncio.fixture
+async def admin_client(db_session):
+    """Клиент админки с БД из фикстуры db_session и админом 100."""
+    from admin_webapp.main import app, get_db
+    from app.services.stats_service import invalidate_stats
+
+    async def override_db():
+        yield db_session
+
+    invalidate_stats()
+    app.dependency_overrides[get_db] = override_db
+    try:
+        with patch("admin_webapp.main.Config") as mock_config:
+            mock_config.BOT_TOKEN = _TEST_TOKEN
+            mock_config.ADMIN_IDS = [100]
+            transport = ASGITransport(app=app)
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                yield client
+    finally:
+        app.dependency_overrides.clear()
+        invalidate_stats()
+
+
+@pytest.mark.asyncio
+async def test_api_stats(admin_client, appointment, valid_headers):
+    """api/stats: прежние ключи ответа + тренды по дням."""
+    resp = await admin_client.get("/api/stats", headers=valid_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total_users"] == 1
+    assert data["tier_counts"] == {"basic": 0, "standard": 1, "premium": 0}
+    assert data["total_patients"] == 1
+    assert data["total_appointments"] == 1
+    assert data["total_treatments"] == 0
+    assert {"day", "new_users", "new_appointments"} <= set(data["trends"][-1])
+
+
+@pytest.mark.asyncio
+async def test_api_users_keyset_pages(admin_client, db_session, valid_headers):
+    """api/users: страницы по курсору без пропусков и повторов, total без OFFSET."""
+    from datetime import datetime, timedelta
+    from app.database.models import User
+
+    base = datetime(2026, 1, 1, 12, 0)
+    for i in range(5):
+        # Двое с одинаковым created_at — порядок добирается по id
+        created = base + timedelta(minutes=min(i, 3))
+        db_session.add(User(telegram_id=700 + i, full_name=f"Врач {i}", created_at=created))
+    await db_session.commit()
+
+    seen, cursor = [], None
+    for _ in range(3):
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        resp = await admin_client.get("/api/users", params=params, headers=valid_headers)
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["total"] == 5
+        seen += [u["telegram_id"] for u in data["users"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [704, 703, 702, 701, 700]
+
+    resp = await admin_client.get("/api/users", params={"cursor": "garbage!", "count": "none"},
+                                  headers=valid_headers)
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_health_ready_cached_and_503_on_db_error():
+    """ready: SELECT 1 кэшируется между пробами; при ошибке БД — 503 и статистика пула."""
+    from admin_webapp.main import app, _ready_cache
+    transport = ASGITransport(app=app)
+    with patch("admin_webapp.main.async_session_maker") as mock_sm:
+        session = _mock_session_maker(mock_sm, AsyncMock())
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.get("/health/ready")).status_code == 200
+            resp = await client.get("/health/ready")
+        assert resp.status_code == 200
+        assert session.execute.await_count == 1
+        assert "checked_out" in resp.json()["pool"]
+
+        _ready_cache.clear()
+        _mock_session_maker(mock_sm, AsyncMock(side_effect=OSError("connection refused")))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.get("/health/ready")
+            live = await client.get("/health/live")
+    assert resp.status_code == 503
+    assert resp.json()["status"] == "unavailable"
+    assert live.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_health_deep_reports_bot_state(tmp_path):
+    """deep: задержка БД и отставание цикла напоминаний из снимка бота."""
+    from admin_webapp.main import app
+    from app.services import health_state
+
+    state_file = tmp_path / "health.json"
+    with patch.object(health_state, "HEALTH_STATE_FILE", state_file), \
+            patch.dict(health_state._loops, clear=True):
+        health_state.loop_tick("reminders", 60)
+        health_state._loops["reminders"]["last_tick"] -= 200  # проснулся 200 с назад при периоде 60
+        health_state.write_state()
+        with patch("admin_webapp.main.async_session_maker") as mock_sm:
+            _mock_session_maker(mock_sm, AsyncMock())
+            transport = ASGITransport(app=app)
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                resp = await client.get("/health/deep")
+    data = resp.json()
+    assert data["db"]["status"] == "connected"
+    assert data["bot"]["status"] == "lagging"
+    assert data["bot"]["loops"]["reminders"]["lag_seconds"] >= 139
+    assert data["bot"]["outbound"]["in_flight"] == 0
+    assert data["status"] == "degraded"
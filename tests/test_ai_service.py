@@ -0,0 +1,106 @@
+"""Тесты ai_service: кэш результатов OpenAI (без реальных запросов)."""
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services import ai_service
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    ai_service._media_text_cache.clear()
+    ai_service._parsed_cache.clear()
+    yield
+    ai_service._media_text_cache.clear()
+    ai_service._parsed_cache.clear()
+
+
+def _client_mock(transcript: str = "Иванов завтра в 14:00", chat_content: str = "{}"):
+    client = MagicMock()
+    client.audio.transcriptions.create = AsyncMock(return_value=SimpleNamespace(text=transcript))
+    client.chat.completions.create = AsyncMock(return_value=SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=chat_content))]
+    ))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_transcribe_cached_by_file_unique_id():
+    client = _client_mock()
+    with patch.object(ai_service, "_get_client", return_value=client):
+        t1 = await ai_service.transcribe_voice(b"ogg-1", cache_key="uniq1")
+        t2 = await ai_service.transcribe_voice(b"ogg-other-bytes", cache_key="uniq1")
+    assert t1 == t2 == "Иванов завтра в 14:00"
+    assert client.audio.transcriptions.create.await_count == 1
+    assert ai_service.get_cached_transcription("uniq1") == t1
+
+
+@pytest.mark.asyncio
+async def test_transcribe_cached_by_content_hash():
+    client = _client_mock()
+    with patch.object(ai_service, "_get_client", return_value=client):
+        await ai_service.transcribe_voice(b"same")
+        await ai_service.transcribe_voice(b"same")
+        await ai_service.transcribe_voice(b"different")
+    assert client.audio.transcriptions.create.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_empty_transcription_not_cached():
+    client = _client_mock(transcript="  ")
+    with patch.object(ai_service, "_get_client", return_value=client):
+        await ai_service.transcribe_voice(b"x", cache_key="u")
+        await ai_service.transcribe_voice(b"x", cache_key="u")
+    assert client.audio.transcriptions.create.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_image_text_cached():
+    client = _client_mock(chat_content="Петров, 15 марта в 10:00")
+    with patch.object(ai_service, "_get_client", return_value=client):
+        await ai_service.parse_image_for_booking(b"jpg", cache_key="ph1")
+        await ai_service.parse_image_for_booking(b"jpg", cache_key="ph1")
+    assert client.chat.completions.create.await_count == 1
+    assert ai_service.get_cached_image_text("ph1") == "Петров, 15 марта в 10:00"
+
+
+@pytest.mark.asyncio
+async def test_parse_booking_text_cached_copy():
+    content = json.dumps({"patient_name": "Иванов", "date": "2026-03-15", "time": "14:00",
+                          "service": None, "confidence": 0.9, "unclear": ["service"]})
+    client = _client_mock(chat_content=content)
+    with patch.object(ai_service, "_get_client", return_value=client):
+        p1 = await ai_service.parse_booking_text("Запиши Иванову на пятнадцатое к двум")
+        p1.unclear_fields.append("mutated")
+        p2 = await ai_service.parse_booking_text("Запиши Иванову на пятнадцатое к двум")
+    assert client.chat.completions.create.await_count == 1
+    assert p2.patient_name == "Иванов"
+    assert p2.unclear_fields == ["service"]
+
+
+@pytest.mark.asyncio
+async def test_parse_booking_text_local_fast_path():
+    client = _client_mock()
+    with patch.object(ai_service, "_get_client", return_value=client):
+        parsed = await ai_service.parse_booking_text(
+            "Иванов завтра в 14:00 консультация", ["Консультация", "Удаление зуба"]
+        )
+    assert client.chat.completions.create.await_count == 0
+    assert parsed.source == "local"
+    assert parsed.patient_name == "Иванов"
+    assert parsed.time_str == "14:00"
+    assert parsed.service == "Консультация"
+
+
+@pytest.mark.asyncio
+async def test_parse_booking_text_low_confidence_falls_back_to_llm():
+    content = json.dumps({"patient_name": "Иванова", "date": "2026-03-15", "time": "14:00",
+                          "service": None, "confidence": 0.9, "unclear": []})
+    client = _client_mock(chat_content=content)
+    with patch.object(ai_service, "_get_client", return_value=client):
+        parsed = await ai_service.parse_booking_text("Запиши Иванову на пятнадцатое к двум")
+    assert client.chat.completions.create.await_count == 1
+    assert parsed.source == "llm"
+    assert parsed.patient_name == "Иванова"
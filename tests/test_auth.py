@@ -4,9 +4,12 @@ import hmac
 import json
 import time
 
+from unittest.mock import patch
+
 import pytest
 
-from admin_webapp.auth import validate_init_data, _verify_signature
+from admin_webapp import auth
+from admin_webapp.auth import validate_init_data, validate_init_data_cached, _verify_signature
 
 
 def _build_init_data(bot_token: str, user_id: int = 123456, extra_pairs: dict | None = None, expire: bool = False) -> str:
@@ -110,3 +113,37 @@ class TestVerifySignature:
 
     def test_empty_token(self):
         assert _verify_signature("raw", "data", "hash", "") is False
+
+
+class TestValidateInitDataCached:
+    """Кэш успешно проверенного initData."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        auth.clear_auth_cache()
+        yield
+        auth.clear_auth_cache()
+
+    def test_repeat_call_skips_hmac(self):
+        init_data = _build_init_data(BOT_TOKEN, user_id=42)
+        assert validate_init_data_cached(init_data, BOT_TOKEN) == (42, False)
+        with patch.object(auth, "_verify_signature", side_effect=AssertionError("HMAC не нужен")):
+            assert validate_init_data_cached(init_data, BOT_TOKEN) == (42, True)
+
+    def test_other_token_not_served_from_cache(self):
+        init_data = _build_init_data(BOT_TOKEN, user_id=42)
+        validate_init_data_cached(init_data, BOT_TOKEN)
+        assert validate_init_data_cached(init_data, "wrong_token") == (None, False)
+
+    def test_failures_not_cached(self):
+        init_data = _build_init_data(BOT_TOKEN, user_id=42).replace("42", "99")
+        assert validate_init_data_cached(init_data, BOT_TOKEN) == (None, False)
+        assert len(auth._verified) == 0
+
+    def test_ttl_capped_by_auth_date(self):
+        init_data = _build_init_data(BOT_TOKEN, user_id=42)
+        with patch.object(auth, "_MAX_AUTH_AGE_SECONDS", 15):
+            # auth_date 10 секунд назад: initData истекает через ~5 с, а не через ADMIN_AUTH_CACHE_TTL_SECONDS
+            validate_init_data_cached(init_data, BOT_TOKEN)
+        with patch("app.utils.ttl_cache.time.monotonic", return_value=time.monotonic() + 6):
+            assert auth._verified.get(auth._cache_key(init_data, BOT_TOKEN)) is None
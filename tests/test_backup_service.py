@@ -0,0 +1,110 @@
+"""Тесты бэкапа: вызов pg_dump (подменён скриптом), части для Telegram, ротация."""
+import os
+import stat
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.config import Config
+from app.services import backup_service
+
+FAKE_PG_DUMP = """#!/bin/sh
+# Пишет аргументы в файл из -f; код возврата — из FAKE_PG_DUMP_EXIT
+while [ $# -gt 0 ]; do
+  if [ "$1" = "-f" ]; then out="$2"; fi
+  echo "$1" >> "$FAKE_PG_DUMP_ARGS"
+  shift
+done
+if [ "${FAKE_PG_DUMP_EXIT:-0}" != "0" ]; then
+  echo "pg_dump: error: connection refused" >&2
+  exit "$FAKE_PG_DUMP_EXIT"
+fi
+printf 'PGDMP-fake' > "$out"
+"""
+
+
+@pytest.fixture
+def backup_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_service, "BACKUP_DIR", tmp_path / "backups")
+    return tmp_path / "backups"
+
+
+@pytest.fixture
+def fake_pg_dump(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "pg_dump"
+    script.write_text(FAKE_PG_DUMP)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    args_file = tmp_path / "args.txt"
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_PG_DUMP_ARGS", str(args_file))
+    monkeypatch.setattr(Config, "DATABASE_URL", "postgresql+asyncpg://u:p@db:5433/ministom")
+    return args_file
+
+
+@pytest.mark.asyncio
+async def test_create_backup_custom_compressed(backup_dir, fake_pg_dump, monkeypatch):
+    monkeypatch.setattr(backup_service, "BACKUP_FORMAT", "custom")
+    monkeypatch.setattr(backup_service, "BACKUP_COMPRESSION", "6")
+    path = await backup_service.create_backup()
+    assert path is not None and path.suffix == ".dump"
+    assert path.read_bytes() == b"PGDMP-fake"
+    args = fake_pg_dump.read_text().split()
+    assert args[args.index("-F") + 1] == "c"
+    assert "--compress=6" in args
+
+
+@pytest.mark.asyncio
+async def test_create_backup_plain_zstd_suffix(backup_dir, fake_pg_dump, monkeypatch):
+    monkeypatch.setattr(backup_service, "BACKUP_FORMAT", "plain")
+    monkeypatch.setattr(backup_service, "BACKUP_COMPRESSION", "zstd:3")
+    path = await backup_service.create_backup()
+    assert path.name.endswith(".sql.zst")
+    assert "--compress=zstd:3" in fake_pg_dump.read_text().split()
+
+
+@pytest.mark.asyncio
+async def test_create_backup_failure_removes_file(backup_dir, fake_pg_dump, monkeypatch):
+    monkeypatch.setenv("FAKE_PG_DUMP_EXIT", "1")
+    assert await backup_service.create_backup() is None
+    assert list(backup_dir.iterdir()) == []
+
+
+def test_split_backup(tmp_path):
+    path = tmp_path / "ministom_backup_20260101_000000.dump"
+    data = os.urandom(2500)
+    path.write_bytes(data)
+    assert backup_service.split_backup(path, 5000) == [path]
+    parts = backup_service.split_backup(path, 1000)
+    assert [p.name.rsplit(".", 1)[1] for p in parts] == ["part001", "part002", "part003"]
+    assert b"".join(p.read_bytes() for p in parts) == data
+
+
+def test_cleanup_keeps_latest_with_parts(backup_dir, monkeypatch):
+    monkeypatch.setattr(backup_service, "MAX_LOCAL_BACKUPS", 1)
+    backup_dir.mkdir()
+    old = backup_dir / "ministom_backup_20260101_000000.dump"
+    new = backup_dir / "ministom_backup_20260102_000000.dump"
+    for p in (old, old.with_name(old.name + ".part001"), new, new.with_name(new.name + ".part001")):
+        p.write_bytes(b"x")
+    backup_service._cleanup_old_backups()
+    assert sorted(p.name for p in backup_dir.iterdir()) == [new.name, new.name + ".part001"]
+
+
+@pytest.mark.asyncio
+async def test_send_in_parts_and_cleanup(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "ADMIN_IDS", [1, 2])
+    monkeypatch.setattr(backup_service, "BACKUP_CHUNK_MB", 1)
+    path = tmp_path / "ministom_backup_20260101_000000.dump"
+    path.write_bytes(b"x" * (1024 * 1024 + 10))
+    bot = MagicMock()
+    bot.send_document = AsyncMock()
+    monkeypatch.setattr(backup_service.asyncio, "sleep", AsyncMock())
+
+    sent = await backup_service.send_backup_to_admins(bot, path)
+
+    assert sent == 2
+    assert bot.send_document.await_count == 4  # 2 админа × 2 части
+    assert "Часть 2/2" in bot.send_document.await_args.kwargs["caption"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [path.name]
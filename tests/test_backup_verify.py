@@ -0,0 +1,122 @@
+"""Тесты проверки бэкапов: сравнение сумм, история RTO, полный цикл на локальном PostgreSQL."""
+import shutil
+import socket
+import subprocess
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.config import Config
+from app.services import backup_service, backup_verify
+from app.services.backup_verify import BackupReport, compare_stats, load_history, run_verified_backup
+
+
+@pytest.fixture
+def backup_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_service, "BACKUP_DIR", tmp_path)
+    return tmp_path
+
+
+def test_compare_stats():
+    source = {"users": (2, "a"), "patients": (5, "b"), "services": (1, "c")}
+    restored = {"users": (2, "a"), "patients": (4, "x"), "services": (1, "z")}
+    assert compare_stats(source, source) == []
+    assert compare_stats(source, restored) == [
+        "patients: строк 4 вместо 5",
+        "services: контрольная сумма",
+    ]
+    assert compare_stats(source, {}) == [f"{t}: нет таблицы" for t in source]
+
+
+def test_restore_cmd_by_format():
+    db = {"host": "h", "port": 5432, "user": "u", "dbname": "scratch"}
+    assert backup_verify._restore_cmd(db, Path("b.dump"))[0] == "pg_restore"
+    assert backup_verify._restore_cmd(db, Path("b.sql"))[-2:] == ["-f", "b.sql"]
+    assert "-f" not in backup_verify._restore_cmd(db, Path("b.sql.gz"))  # через stdin
+
+
+@pytest.mark.asyncio
+async def test_unverified_backup_recorded(backup_dir, monkeypatch):
+    dump = backup_dir / "ministom_backup_20260101_000000.dump"
+    dump.write_bytes(b"x" * 100)
+    monkeypatch.setattr(backup_service, "create_backup", AsyncMock(return_value=dump))
+
+    report = await run_verified_backup(verify_url="")
+
+    assert report.verified is None and report.size_bytes == 100
+    assert "не настроена" in report.status_line()
+    history = load_history()
+    assert history[-1]["path"] == str(dump) and history[-1]["size_bytes"] == 100
+
+
+@pytest.mark.asyncio
+async def test_verify_url_equal_to_main_db_is_refused(backup_dir, monkeypatch):
+    monkeypatch.setattr(Config, "DATABASE_URL", "postgresql+asyncpg://u:p@db:5432/ministom")
+    monkeypatch.setattr(backup_service, "create_backup", AsyncMock(return_value=None))
+    snapshot = AsyncMock()
+    monkeypatch.setattr(backup_verify, "source_snapshot", snapshot)
+
+    await run_verified_backup(verify_url="postgresql://other:pw@db:5432/ministom")
+
+    snapshot.assert_not_called()  # основную БД под проверку не отдаём
+
+
+def test_report_status_lines():
+    ok = BackupReport(path=None, dump_seconds=1.0, restore_seconds=2.5, verified=True, rows=10)
+    assert "RTO ≈ 2.5 с" in ok.status_line()
+    bad = BackupReport(path=None, verified=False, mismatches=["users: контрольная сумма"])
+    assert "users" in bad.status_line()
+
+
+# --- Полный цикл на локальном PostgreSQL (initdb/pg_ctl из postgresql-server) ---
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def local_postgres(tmp_path):
+    tools = ("initdb", "pg_ctl", "pg_dump", "pg_restore", "psql", "createdb")
+    if not all(shutil.which(tool) for tool in tools):
+        pytest.skip("нужны бинарники PostgreSQL (initdb, pg_ctl, pg_dump, pg_restore)")
+    pytest.importorskip("asyncpg")
+    data, port = tmp_path / "pgdata", _free_port()
+    subprocess.run(["initdb", "-D", str(data), "-U", "postgres", "--auth=trust"],
+                   check=True, capture_output=True)
+    subprocess.run(["pg_ctl", "-D", str(data), "-o", f"-p {port} -k {tmp_path}", "-w", "start"],
+                   check=True, capture_output=True)
+    try:
+        for name in ("ministom", "scratch"):
+            subprocess.run(["createdb", "-h", "127.0.0.1", "-p", str(port), "-U", "postgres", name], check=True)
+        yield f"postgresql://postgres@127.0.0.1:{port}"
+    finally:
+        subprocess.run(["pg_ctl", "-D", str(data), "-m", "immediate", "stop"], capture_output=True)
+
+
+@pytest.mark.asyncio
+async def test_full_cycle_on_local_postgres(local_postgres, backup_dir, monkeypatch):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.database.models import Base, User, Patient
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    main_url = f"{local_postgres}/ministom"
+    monkeypatch.setattr(Config, "DATABASE_URL", main_url)
+    engine = create_async_engine(backup_verify._asyncpg_url(main_url))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        doctor = User(telegram_id=1, full_name="Доктор")
+        session.add(doctor)
+        await session.flush()
+        session.add_all([Patient(doctor_id=doctor.id, full_name=f"Пациент {i}") for i in range(50)])
+        await session.commit()
+    await engine.dispose()
+
+    report = await run_verified_backup(verify_url=f"{local_postgres}/scratch")
+
+    assert report.verified, report.status_line()
+    assert report.rows == 51 and report.restore_seconds > 0
+    assert load_history()[-1]["verified"] is True
@@ -0,0 +1,64 @@
+"""Тесты набора данных бенчмарков и сравнения результатов."""
+from datetime import date
+
+from sqlalchemy import func, select
+
+from app.database.models import Appointment, Patient
+from benchmarks.bench_services import compare, summarize
+from benchmarks.dataset import DatasetSpec, generate, seed
+
+_SPEC = DatasetSpec(doctors=2, patients_per_doctor=20, years=1)
+
+
+def test_generate_is_deterministic():
+    first = generate(_SPEC, date(2026, 3, 1))
+    second = generate(_SPEC, date(2026, 3, 1))
+    assert first == second
+    assert generate(DatasetSpec(seed=7, doctors=2, patients_per_doctor=20, years=1), date(2026, 3, 1)) != first
+
+
+async def test_seed_inserts_rows(db_session):
+    counts = await seed(db_session, _SPEC, date(2026, 3, 1))
+    assert counts["patients"] == 40
+    assert await db_session.scalar(select(func.count()).select_from(Patient)) == 40
+    assert await db_session.scalar(select(func.count()).select_from(Appointment)) == counts["appointments"]
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 0.1}, "c": {"median_ms": 5.0}}}
+    current = {"results": {"a": {"median_ms": 13.0}, "b": {"median_ms": 0.3}, "c": {"median_ms": 5.5},
+                           "new": {"median_ms": 1.0}}}
+    regressions = compare(current, baseline, tolerance=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith("a:")
+
+
+def test_summarize_ms():
+    result = summarize([0.001, 0.002, 0.003])
+    assert result == {"runs": 3, "median_ms": 2.0, "min_ms": 1.0, "p95_ms": 3.0}
+
+
+def test_load_actors_match_dataset_users():
+    from app.database.models import User
+    from benchmarks.load_bot import actors
+
+    spec = DatasetSpec(doctors=3, patients_per_doctor=2, years=1, assistants_per_doctor=2)
+    users = {row["telegram_id"]: row for row in generate(spec, date(2026, 3, 1))[User]}
+    people = actors(spec)
+    assert len(people) == 9
+    for actor in people:
+        row = users[actor.telegram_id]
+        assert (row["owner_id"] or row["id"]) == actor.doctor_id
+
+
+async def test_stub_session_answers_without_network():
+    from aiogram import Bot
+    from aiogram.types import Message
+    from benchmarks.load_bot import StubSession
+
+    session = StubSession()
+    bot = Bot(token="123456789:LOAD-test-token", session=session)
+    sent = await bot.send_message(42, "⏳ Подождите немного.")
+    assert isinstance(sent, Message) and sent.chat.id == 42
+    assert await bot.answer_callback_query("1") is True
+    assert session.calls == {"SendMessage": 1, "AnswerCallbackQuery": 1}
+    assert session.throttled == 1
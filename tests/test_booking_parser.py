@@ -0,0 +1,61 @@
+"""Тесты локального разбора фраз записи (booking_parser)."""
+from datetime import date
+
+import pytest
+
+from app.services.ai_service import LOCAL_PARSE_MIN_CONFIDENCE
+from app.services.booking_parser import parse_booking_locally, parse_date
+from tests.booking_corpus import load_corpus, mismatches, service_names
+
+TODAY, CORPUS = load_corpus()
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[c["text"] for c in CORPUS])
+def test_corpus(case):
+    parsed = parse_booking_locally(case["text"], TODAY, service_names())
+    assert parsed.source == "local"
+    if case.get("llm"):
+        assert parsed.confidence < LOCAL_PARSE_MIN_CONFIDENCE
+    else:
+        assert parsed.confidence >= LOCAL_PARSE_MIN_CONFIDENCE
+        assert mismatches(case, parsed) == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("завтра", date(2026, 3, 17)),
+    ("в среду", date(2026, 3, 18)),
+    ("понедельник", date(2026, 3, 23)),
+    ("15 марта", date(2027, 3, 15)),
+    ("20.03", date(2026, 3, 20)),
+    ("когда-нибудь", None),
+])
+def test_parse_date(text, expected):
+    assert parse_date(text, TODAY) == expected
+
+
+def test_service_from_price_list_preferred():
+    parsed = parse_booking_locally("Иванов завтра в 14:00 консультация", TODAY, ["Консультация"])
+    assert parsed.service == "Консультация"
+    assert "service" not in parsed.unclear_fields
+
+
+def test_missing_time_lowers_confidence():
+    parsed = parse_booking_locally("Иванов завтра", TODAY)
+    assert parsed.time_str is None
+    assert parsed.confidence < LOCAL_PARSE_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", [
+    "Иванов Иван, 17.03, 14:00, Консультация",
+    "Иванов 17.03 14:00 Удаление зуба",
+])
+def test_capitalized_service_not_merged_into_name(text):
+    for names in (service_names(), ()):
+        parsed = parse_booking_locally(text, TODAY, names)
+        assert parsed.patient_name in ("Иванов Иван", "Иванов")
+        assert parsed.service and parsed.service.lower().startswith(("консультация", "удаление"))
+
+
+def test_service_word_in_name_goes_to_llm():
+    parsed = parse_booking_locally("Иванов Чистка завтра в 14:00 консультация", TODAY, ["Консультация"])
+    assert parsed.confidence < LOCAL_PARSE_MIN_CONFIDENCE
@@ -6,25 +6,25 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import User, Patient, Appointment
 from app.services.calendar_service import (
-    get_appointments_by_date,
     get_dates_with_appointments,
     format_appointments_list,
     is_slot_available,
 )
+from app.services.read_models import get_schedule_rows
 
 
 @pytest.mark.asyncio
-async def test_get_appointments_by_date(db_session: AsyncSession, doctor: User, appointment: Appointment):
+async def test_get_schedule_rows(db_session: AsyncSession, doctor: User, appointment: Appointment):
     """Записи на конкретную дату возвращаются."""
-    result = await get_appointments_by_date(db_session, doctor.id, date(2026, 3, 17))
+    result = await get_schedule_rows(db_session, doctor.id, date(2026, 3, 17))
     assert len(result) == 1
     assert result[0].id == appointment.id
 
 
 @pytest.mark.asyncio
-async def test_get_appointments_by_date_empty(db_session: AsyncSession, doctor: User):
+async def test_get_schedule_rows_empty(db_session: AsyncSession, doctor: User):
     """Нет записей — пустой список."""
-    result = await get_appointments_by_date(db_session, doctor.id, date(2026, 1, 1))
+    result = await get_schedule_rows(db_session, doctor.id, date(2026, 1, 1))
     assert result == []
 
 
@@ -33,7 +33,7 @@ async def test_cancelled_excluded(db_session: AsyncSession, doctor: User, appoin
     """Отменённые записи не возвращаются."""
     appointment.status = "cancelled"
     await db_session.commit()
-    result = await get_appointments_by_date(db_session, doctor.id, date(2026, 3, 17))
+    result = await get_schedule_rows(db_session, doctor.id, date(2026, 3, 17))
     assert len(result) == 0
 
 
@@ -44,7 +44,7 @@ async def test_other_doctor_not_visible(db_session: AsyncSession, doctor: User,
     db_session.add(other)
     await db_session.commit()
     await db_session.refresh(other)
-    result = await get_appointments_by_date(db_session, other.id, date(2026, 3, 17))
+    result = await get_schedule_rows(db_session, other.id, date(2026, 3, 17))
     assert result == []
 
 
@@ -0,0 +1,23 @@
+"""Тесты Excel-экспорта пациентов."""
+from datetime import datetime
+
+from openpyxl import load_workbook
+
+from app.database.models import Patient, Treatment
+from app.services.export_service import build_patients_excel
+
+
+def test_build_patients_excel_sheets_and_bold_headers():
+    patient = Patient(id=1, doctor_id=1, full_name="Иванов Иван", phone="+998901234567",
+                      created_at=datetime(2026, 1, 1, 10, 0))
+    patient.appointments = []
+    patient.implant_logs = []
+    patient.treatments = [Treatment(id=1, patient_id=1, doctor_id=1, service_name="Пломба", price=100,
+                                    created_at=datetime(2026, 1, 2, 11, 0))]
+
+    wb = load_workbook(build_patients_excel([patient]))
+
+    assert wb.sheetnames == ["Пациенты", "Записи на приём", "История лечения", "Импланты"]
+    assert wb["Пациенты"]["A1"].font.bold
+    assert wb["Пациенты"]["B2"].value == "Иванов Иван"
+    assert wb["История лечения"]["D2"].value == "Пломба"
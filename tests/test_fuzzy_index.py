@@ -0,0 +1,134 @@
+"""Тесты нечёткого индекса пациентов и услуг."""
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import User, Patient, Service
+from app.services import fuzzy_index
+from app.services.fuzzy_index import FuzzyIndex, get_patient_index, get_service_index, stem
+
+
+@pytest.fixture(autouse=True)
+def clear_indexes():
+    fuzzy_index._patient_indexes.clear()
+    fuzzy_index._service_indexes.clear()
+    yield
+    fuzzy_index._patient_indexes.clear()
+    fuzzy_index._service_indexes.clear()
+
+
+NAMES = ["Иванов Иван Иванович", "Иванова Мария", "Петров Пётр", "Сидоренко Анна", "Ким Виктор"]
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("иванову", "иванов"), ("ивановой", "иванов"), ("петрова", "петров"),
+    ("ким", "ким"), ("кариеса", "кариес"), ("998901", "998901"),
+])
+def test_stem(word, expected):
+    assert stem(word) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Иванову Ивану", "Иванов Иван Иванович"),  # падеж
+    ("Иваноф Иван", "Иванов Иван Иванович"),  # ошибка распознавания
+    ("Петрова Петра", "Петров Пётр"),         # ё/е и падеж
+    ("Сидоренка", "Сидоренко Анна"),
+    ("ким", "Ким Виктор"),
+])
+def test_search_ranks_expected_first(query, expected):
+    index = FuzzyIndex(NAMES, lambda s: s)
+    assert index.search(query)[0] == expected
+
+
+def test_ambiguous_case_returns_both():
+    # «Иванову» — дательный и от «Иванов», и от «Иванова»: выбор остаётся за врачом
+    index = FuzzyIndex(NAMES, lambda s: s)
+    assert set(index.search("Иванову")) == {"Иванов Иван Иванович", "Иванова Мария"}
+
+
+def test_search_no_match_and_limit():
+    index = FuzzyIndex(NAMES, lambda s: s)
+    assert index.search("Абдуллаев") == []
+    many = FuzzyIndex([f"Иванов {i}" for i in range(20)], lambda s: s)
+    assert len(many.search("Иванов")) == 5
+
+
+def test_search_drops_weak_tail():
+    index = FuzzyIndex(["Удаление зуба простое", "Удаление импланта", "Чистка"], lambda s: s)
+    assert index.search("удаление зуба") == ["Удаление зуба простое"]
+
+
+def test_exact_match_hides_similar():
+    index = FuzzyIndex(NAMES, lambda s: s)
+    assert index.search("Иванов Иван Иванович") == ["Иванов Иван Иванович"]
+    assert index.search("Ким Виктор") == ["Ким Виктор"]
+
+
+@pytest.mark.asyncio
+async def test_patient_index_cached_and_invalidated(db_session: AsyncSession, doctor: User, patient: Patient):
+    index = await get_patient_index(db_session, doctor.id)
+    assert [p.id for p in index.search("Иванову")] == [patient.id]
+    assert [p.id for p in index.search("901234")] == [patient.id]
+    assert await get_patient_index(db_session, doctor.id) is index
+
+    db_session.add(Patient(doctor_id=doctor.id, full_name="Петров Пётр"))
+    await db_session.commit()
+    fresh = await get_patient_index(db_session, doctor.id)
+    assert fresh is not index
+    assert len(fresh) == 2
+
+
+@pytest.mark.asyncio
+async def test_service_index_invalidated_on_edit(db_session: AsyncSession, doctor: User):
+    svc = Service(doctor_id=doctor.id, category="therapy", name="Консультация", price=100)
+    db_session.add(svc)
+    await db_session.commit()
+    index = await get_service_index(db_session, doctor.id)
+    assert [s.name for s in index.search("консультацию")] == ["Консультация"]
+
+    svc.name = "Осмотр"
+    await db_session.commit()
+    fresh = await get_service_index(db_session, doctor.id)
+    assert [s.name for s in fresh.search("осмотр")] == ["Осмотр"]
+
+
+@pytest.mark.asyncio
+async def test_index_invalidated_on_commit_not_flush(db_session: AsyncSession, doctor: User, patient: Patient):
+    doctor_id = doctor.id  # после отката ORM-объекты истекают
+    index = await get_patient_index(db_session, doctor_id)
+
+    # Между flush и коммитом другой запрос пересобрал бы индекс из старых строк — сброс только после коммита
+    db_session.add(Patient(doctor_id=doctor_id, full_name="Петров Пётр"))
+    await db_session.flush()
+    assert await get_patient_index(db_session, doctor_id) is index
+    await db_session.commit()
+    assert await get_patient_index(db_session, doctor_id) is not index
+
+    # Откат: изменений нет — индекс не сбрасывается
+    index = await get_patient_index(db_session, doctor_id)
+    db_session.add(Patient(doctor_id=doctor_id, full_name="Сидоров Олег"))
+    await db_session.flush()
+    await db_session.rollback()
+    assert await get_patient_index(db_session, doctor_id) is index
+
+
+@pytest.mark.asyncio
+async def test_index_built_before_concurrent_commit_not_cached(
+    db_session: AsyncSession, doctor: User, patient: Patient, monkeypatch
+):
+    load = fuzzy_index.get_patient_name_index
+
+    async def load_then_commit(session, doctor_id):
+        rows = await load(session, doctor_id)
+        # Пока индекс строится, другой апдейт создаёт пациента
+        session.add(Patient(doctor_id=doctor_id, full_name="Петров Пётр"))
+        await session.commit()
+        return rows
+
+    monkeypatch.setattr(fuzzy_index, "get_patient_name_index", load_then_commit)
+    stale = await get_patient_index(db_session, doctor.id)
+    assert len(stale) == 1
+    monkeypatch.setattr(fuzzy_index, "get_patient_name_index", load)
+
+    fresh = await get_patient_index(db_session, doctor.id)
+    assert fresh is not stale
+    assert [p.full_name for p in fresh.search("Петров Пётр")] == ["Петров Пётр"]
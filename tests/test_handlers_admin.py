@@ -136,3 +136,23 @@ class TestAdminCommands:
             await cmd_errors(msg)
         msg.answer.assert_called_once()
         assert "Мониторинг" in msg.answer.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_export_doctor_sends_file(self, db_session: AsyncSession, doctor: User, patient):
+        """/admin_export_doctor отправляет gzip-файл с данными врача."""
+        from app.handlers.admin import cmd_export_doctor
+        msg = make_message(f"/admin_export_doctor {doctor.telegram_id}", user_id=111111)
+        with patch("app.handlers.admin._is_admin", return_value=True):
+            await cmd_export_doctor(msg, db_session)
+        msg.answer_document.assert_called_once()
+        assert "patients: 1" in msg.answer_document.call_args.kwargs["caption"]
+
+    @pytest.mark.asyncio
+    async def test_restore_doctor_requires_reply(self, db_session: AsyncSession, doctor: User):
+        """Без ответа на файл — подсказка по использованию."""
+        from app.handlers.admin import cmd_restore_doctor
+        msg = make_message(f"/admin_restore_doctor {doctor.telegram_id}", user_id=111111)
+        msg.reply_to_message = None
+        with patch("app.handlers.admin._is_admin", return_value=True):
+            await cmd_restore_doctor(msg, db_session)
+        assert "ответьте" in msg.answer.call_args[0][0]
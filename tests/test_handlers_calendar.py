@@ -8,12 +8,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.database.models import User, Patient, Appointment
 from app.handlers.calendar import cmd_schedule_view, process_schedule_callback
 from app.services.calendar_service import (
-    get_appointments_by_date,
     get_dates_with_appointments,
     format_appointments_list,
     format_schedule_with_contacts,
     get_busy_ranges_for_date,
 )
+from app.services.read_models import get_schedule_rows
 from app.utils.permissions import full_permissions, LEVEL_NONE, FEATURE_CALENDAR
 from tests.helpers import make_message, make_callback, make_state
 
@@ -24,13 +24,13 @@ class TestCalendarService:
     @pytest.mark.asyncio
     async def test_get_appointments_empty(self, db_session: AsyncSession, doctor: User):
         """Нет записей на дату — пустой список."""
-        result = await get_appointments_by_date(db_session, doctor.id, date(2026, 1, 1))
+        result = await get_schedule_rows(db_session, doctor.id, date(2026, 1, 1))
         assert result == []
 
     @pytest.mark.asyncio
-    async def test_get_appointments_by_date(self, db_session: AsyncSession, doctor: User, appointment: Appointment):
+    async def test_get_schedule_rows(self, db_session: AsyncSession, doctor: User, appointment: Appointment):
         """Запись найдена по дате."""
-        result = await get_appointments_by_date(db_session, doctor.id, date(2026, 3, 17))
+        result = await get_schedule_rows(db_session, doctor.id, date(2026, 3, 17))
         assert len(result) == 1
         assert result[0].id == appointment.id
 
@@ -39,7 +39,7 @@ class TestCalendarService:
         """Отменённые записи не показываются."""
         appointment.status = "cancelled"
         await db_session.commit()
-        result = await get_appointments_by_date(db_session, doctor.id, date(2026, 3, 17))
+        result = await get_schedule_rows(db_session, doctor.id, date(2026, 3, 17))
         assert len(result) == 0
 
     @pytest.mark.asyncio
@@ -48,7 +48,7 @@ class TestCalendarService:
         other = User(telegram_id=222222, full_name="Другой", role="owner", registration_completed=True)
         db_session.add(other)
         await db_session.commit()
-        result = await get_appointments_by_date(db_session, other.id, date(2026, 3, 17))
+        result = await get_schedule_rows(db_session, other.id, date(2026, 3, 17))
         assert result == []
 
     @pytest.mark.asyncio
@@ -87,14 +87,16 @@ class TestFormatting:
         assert "записей нет" in text.lower()
 
     @pytest.mark.asyncio
-    async def test_format_with_appointment(self, appointment: Appointment):
-        text = await format_appointments_list([appointment])
+    async def test_format_with_appointment(self, db_session: AsyncSession, doctor: User, appointment: Appointment):
+        rows = await get_schedule_rows(db_session, doctor.id, date(2026, 3, 17))
+        text = await format_appointments_list(rows)
         assert "14:00" in text
         assert "Консультация" in text
 
     @pytest.mark.asyncio
-    async def test_format_schedule_with_contacts(self, appointment: Appointment):
-        text = await format_schedule_with_contacts([appointment])
+    async def test_format_schedule_with_contacts(self, db_session: AsyncSession, doctor: User, appointment: Appointment):
+        rows = await get_schedule_rows(db_session, doctor.id, date(2026, 3, 17))
+        text = await format_schedule_with_contacts(rows)
         assert "14:00" in text
 
 
@@ -0,0 +1,66 @@
+"""Тесты хендлеров финансов: пакетные счета за период."""
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import User, Patient, Treatment
+from app.handlers.finance import _invoice_batch_rows, _period_range, finance_invoices_generate
+from app.utils.permissions import full_permissions, LEVEL_NONE, FEATURE_FINANCE
+from tests.helpers import make_callback
+
+
+def test_prev_month_range():
+    start, end = _period_range("prev_month")
+    first_of_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    assert start.day == 1
+    assert end < first_of_month
+    assert start < end
+
+
+@pytest.mark.asyncio
+async def test_batch_rows_grouped_by_patient(db_session: AsyncSession, doctor: User, patient: Patient):
+    other = Patient(doctor_id=doctor.id, full_name="Абдуллаев Азиз")
+    db_session.add(other)
+    await db_session.commit()
+    now = datetime.now()
+    db_session.add_all([
+        Treatment(patient_id=patient.id, doctor_id=doctor.id, service_name="A", price=100, created_at=now),
+        Treatment(patient_id=patient.id, doctor_id=doctor.id, service_name="B", price=200, created_at=now),
+        Treatment(patient_id=other.id, doctor_id=doctor.id, service_name="C", price=300, created_at=now),
+        Treatment(patient_id=other.id, doctor_id=doctor.id, service_name="old", price=1,
+                  created_at=now - timedelta(days=400)),
+    ])
+    await db_session.commit()
+
+    rows = await _invoice_batch_rows(db_session, doctor.id, now - timedelta(days=1), now + timedelta(days=1))
+
+    assert [p.full_name for p, _ in rows] == ["Абдуллаев Азиз", "Иванов Иван Иванович"]
+    assert [t.service_name for t in rows[0][1]] == ["C"]
+    assert [t.service_name for t in rows[1][1]] == ["A", "B"]
+
+
+@pytest.mark.asyncio
+async def test_generate_sends_zip(db_session: AsyncSession, doctor: User, patient: Patient):
+    db_session.add(Treatment(patient_id=patient.id, doctor_id=doctor.id, service_name="A", price=100,
+                             created_at=datetime.now() - timedelta(days=1)))
+    await db_session.commit()
+    cb = make_callback("finance_invoices_30")
+
+    with patch("app.services.pdf_generator.generate_invoices_zip", AsyncMock(return_value=b"PK")) as gen:
+        await finance_invoices_generate(cb, doctor, full_permissions(), db_session)
+
+    gen.assert_awaited_once()
+    assert len(gen.await_args.args[1]) == 1
+    document = cb.message.answer_document.call_args.kwargs["document"]
+    assert document.filename.endswith(".zip")
+
+
+@pytest.mark.asyncio
+async def test_generate_no_access(db_session: AsyncSession, doctor: User):
+    perms = full_permissions()
+    perms[FEATURE_FINANCE] = LEVEL_NONE
+    cb = make_callback("finance_invoices_30")
+    await finance_invoices_generate(cb, doctor, perms, db_session)
+    cb.message.answer_document.assert_not_called()
@@ -0,0 +1,119 @@
+"""Тесты истории болезни: сводка, keyset-страницы и лимит длины сообщения."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database.models import Patient, Treatment
+from app.handlers.history import HISTORY_TEXT_BUDGET, history_page, render_history_page, view_patient_history
+from app.services.history_service import get_history_page, get_history_summary
+from app.utils.permissions import full_permissions
+from tests.helpers import make_callback, make_state
+
+
+async def _add_treatments(db_session, doctor, patient, count: int, notes: str = "") -> list[Treatment]:
+    start = datetime(2024, 1, 1, 10, 0)
+    items = [
+        Treatment(
+            patient_id=patient.id, doctor_id=doctor.id, service_name=f"Услуга {i}", price=100,
+            paid_amount=50 if i % 2 else 100, treatment_notes=notes or None,
+            # Пары записей с одинаковым временем — порядок решает id
+            created_at=start + timedelta(days=i // 2),
+        )
+        for i in range(count)
+    ]
+    db_session.add_all(items)
+    await db_session.commit()
+    return items
+
+
+def _text(callback) -> str:
+    return callback.message.edit_text.call_args[0][0]
+
+
+def _buttons(callback) -> dict[str, str]:
+    markup = callback.message.edit_text.call_args[1]["reply_markup"]
+    return {b.text: b.callback_data for row in markup.inline_keyboard for b in row}
+
+
+@pytest.mark.asyncio
+async def test_summary_aggregates(db_session, doctor, patient):
+    await _add_treatments(db_session, doctor, patient, 4)
+    db_session.add(Treatment(patient_id=patient.id, doctor_id=doctor.id, service_name="Скидка",
+                             price=200, discount_percent=50, paid_amount=0, created_at=datetime(2025, 5, 1)))
+    await db_session.commit()
+
+    summary = await get_history_summary(db_session, doctor.id, patient.id)
+    assert summary.full_name == patient.full_name
+    assert summary.count == 5
+    assert summary.total == 500
+    assert summary.paid == 300
+    assert summary.debt == 200
+    assert summary.last_visit == datetime(2025, 5, 1)
+    assert await get_history_summary(db_session, doctor.id + 1, patient.id) is None
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_history_without_gaps(db_session, doctor, patient):
+    items = await _add_treatments(db_session, doctor, patient, 7)
+    seen, after_id = [], None
+    while True:
+        rows = await get_history_page(db_session, doctor.id, patient.id, after_id, limit=3)
+        page = rows[:3]
+        seen.extend(t.id for t in page)
+        if len(rows) <= 3:
+            break
+        after_id = page[-1].id
+    expected = [t.id for t in sorted(items, key=lambda t: (t.created_at, t.id), reverse=True)]
+    assert seen == expected
+
+
+def test_render_respects_budget():
+    header = "шапка"
+    treatments = [
+        Treatment(id=i, service_name="Пломба", treatment_notes="x" * 500, created_at=datetime(2024, 1, 1))
+        for i in range(20)
+    ]
+    text, shown = render_history_page(header, treatments, show_money=False, budget=2000)
+    assert 0 < shown < 20
+    assert len(text) <= 2000
+
+    huge = [Treatment(id=1, service_name="Пломба", treatment_notes="x" * 10_000, created_at=datetime(2024, 1, 1))]
+    text, shown = render_history_page(header, huge, show_money=False)
+    assert shown == 1
+    assert len(text) <= HISTORY_TEXT_BUDGET
+
+
+@pytest.mark.asyncio
+async def test_long_history_paginated_under_telegram_limit(db_session, doctor, patient):
+    items = await _add_treatments(db_session, doctor, patient, 40, notes="Комментарий " * 40)
+    cb = make_callback(f"patient_history_{patient.id}")
+    await view_patient_history(cb, doctor, full_permissions(), make_state(), db_session)
+
+    text = _text(cb)
+    assert len(text) <= 4096
+    assert "Записей: 40" in text
+    next_data = _buttons(cb)["Старее ▶️"]
+
+    pages = 1
+    while next_data:
+        cb = make_callback(next_data)
+        await history_page(cb, doctor, full_permissions(), db_session)
+        assert len(_text(cb)) <= 4096
+        assert "⏮ К последним" in _buttons(cb)
+        next_data = _buttons(cb).get("Старее ▶️")
+        pages += 1
+    assert pages > 1
+    # Последняя страница заканчивается самой ранней записью
+    oldest = min(items, key=lambda t: (t.created_at, t.id))
+    assert oldest.created_at.strftime("%d.%m.%Y %H:%M") in _text(cb)
+
+
+@pytest.mark.asyncio
+async def test_history_of_other_doctor_patient_hidden(db_session, doctor):
+    other = Patient(doctor_id=doctor.id + 1, full_name="Чужой")
+    db_session.add(other)
+    await db_session.commit()
+    cb = make_callback(f"history_page_{other.id}_0")
+    await history_page(cb, doctor, full_permissions(), db_session)
+    cb.message.edit_text.assert_not_called()
+    cb.answer.assert_called_once()
@@ -0,0 +1,84 @@
+"""Тесты голосовой записи: распознавание параллельно с загрузкой индекса из БД."""
+import asyncio
+import io
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Config
+from app.database.models import User, Patient
+from app.handlers import voice_booking
+from app.handlers.voice_booking import handle_voice
+from app.services import fuzzy_index
+from tests.helpers import make_message, make_state
+
+
+@pytest.fixture(autouse=True)
+def clear_indexes():
+    fuzzy_index._patient_indexes.clear()
+    fuzzy_index._service_indexes.clear()
+    yield
+    fuzzy_index._patient_indexes.clear()
+    fuzzy_index._service_indexes.clear()
+
+
+def _voice_message(user_id: int) -> AsyncMock:
+    message = make_message(user_id=user_id)
+    message.voice = SimpleNamespace(file_id="f1", file_unique_id="u1")
+    message.answer = AsyncMock(return_value=AsyncMock())
+    message.bot.download = AsyncMock(return_value=io.BytesIO(b"ogg"))
+    return message
+
+
+@pytest.mark.asyncio
+async def test_voice_overlaps_prefetch_and_matches_in_memory(
+    db_session: AsyncSession, doctor: User, patient: Patient, monkeypatch,
+):
+    monkeypatch.setattr(Config, "ADMIN_IDS", [doctor.telegram_id])
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "test")
+    message = _voice_message(doctor.telegram_id)
+    state = make_state()
+    events = []
+
+    async def fake_transcribe(data, cache_key=None):
+        assert isinstance(data, io.BytesIO)  # буфер скачивания без копии в bytes
+        events.append("transcribe-start")
+        await asyncio.sleep(0)
+        events.append("transcribe-end")
+        return "Иванов завтра в 14:00"
+
+    real_prefetch = voice_booking._prefetch_index
+
+    async def spy_prefetch(db, doctor_id, timer):
+        events.append("prefetch-start")
+        return await real_prefetch(db, doctor_id, timer)
+
+    with patch.object(voice_booking, "transcribe_voice", fake_transcribe), \
+            patch.object(voice_booking, "_prefetch_index", spy_prefetch), \
+            patch.object(voice_booking, "get_patient_index",
+                         AsyncMock(side_effect=voice_booking.get_patient_index)) as lookup, \
+            patch.object(voice_booking, "_check_remaining_fields", AsyncMock()):
+        await handle_voice(message, doctor, doctor, state, db_session)
+
+    assert events.index("prefetch-start") < events.index("transcribe-end")
+    lookup.assert_awaited_once()  # только предзагрузка — пациент найден по готовому индексу
+    data = await state.get_data()
+    assert data["vb_patient_id"] == patient.id
+
+
+@pytest.mark.asyncio
+async def test_voice_empty_transcription_cancels_prefetch(
+    db_session: AsyncSession, doctor: User, monkeypatch,
+):
+    monkeypatch.setattr(Config, "ADMIN_IDS", [doctor.telegram_id])
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "test")
+    message = _voice_message(doctor.telegram_id)
+    status_msg = message.answer.return_value
+
+    with patch.object(voice_booking, "transcribe_voice", AsyncMock(return_value="")):
+        await handle_voice(message, doctor, doctor, make_state(), db_session)
+
+    status_msg.edit_text.assert_awaited_once()
+    assert "Не удалось распознать" in status_msg.edit_text.await_args.args[0]
@@ -0,0 +1,38 @@
+"""Тесты снимка состояния бота для /health/deep."""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.middleware.outbound import OutboundCounterMiddleware
+from app.services import health_state
+
+
+def test_write_and_read_state(tmp_path):
+    path = tmp_path / "state.json"
+    with patch.dict(health_state._loops, clear=True):
+        health_state.loop_tick("reminders", 60)
+        health_state.write_state(path)
+    state = health_state.read_state(path)
+    loop = state["loops"]["reminders"]
+    assert health_state.loop_lag(loop, now=loop["last_tick"] + 30) == 0
+    assert health_state.loop_lag(loop, now=loop["last_tick"] + 95) == pytest.approx(35)
+    assert health_state.read_state(tmp_path / "missing.json") is None
+
+
+@pytest.mark.asyncio
+async def test_outbound_counter():
+    middleware = OutboundCounterMiddleware()
+    seen_in_flight = []
+
+    async def make_request(bot, method):
+        seen_in_flight.append(health_state.outbound["in_flight"])
+        return "ok"
+
+    failing = AsyncMock(side_effect=RuntimeError("flood"))
+    with patch.dict(health_state.outbound, {"in_flight": 0, "peak": 0, "sent": 0, "failed": 0}):
+        assert await middleware(make_request, MagicMock(), MagicMock()) == "ok"
+        with pytest.raises(RuntimeError):
+            await middleware(failing, MagicMock(), MagicMock())
+        counters = dict(health_state.outbound)
+    assert seen_in_flight == [1]
+    assert counters == {"in_flight": 0, "peak": 1, "sent": 1, "failed": 1}
@@ -0,0 +1,77 @@
+"""Тесты метрик: формат Prometheus, префиксы callback, SQL на апдейт."""
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import select
+
+from app.database.models import Patient
+from app.middleware.metrics import MetricsMiddleware, callback_prefix
+from app.services import metrics as app_metrics
+from app.utils.metrics import Counter, Histogram, Registry
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    requests = Counter("t_requests_total", "Запросы", ("method",), registry=registry)
+    latency = Histogram("t_latency_seconds", "Задержка", buckets=(0.1, 1.0), registry=registry)
+    requests.inc(method="sendMessage")
+    requests.inc(2, method="sendMessage")
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3)
+
+    text = registry.render()
+
+    assert "# TYPE t_requests_total counter" in text
+    assert 't_requests_total{method="sendMessage"} 3' in text
+    assert 't_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 't_latency_seconds_bucket{le="1"} 2' in text
+    assert 't_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "t_latency_seconds_sum 3.55" in text
+    assert "t_latency_seconds_count 3" in text
+    with pytest.raises(ValueError):
+        requests.inc(wrong="x")
+
+
+@pytest.mark.parametrize("data, expected", [
+    ("appt_cancel_15", "appt_cancel"),
+    ("sched_month_2026_3", "sched_month"),
+    ("appt_select_patient_5", "appt_select_patient"),
+    ("menu", "menu"),
+    ("fin:pay:12", "fin_pay"),
+    (None, "-"),
+])
+def test_callback_prefix(data, expected):
+    assert callback_prefix(data) == expected
+
+
+@pytest.mark.asyncio
+async def test_middleware_counts_queries_per_update(db_session, patient):
+    app_metrics.install_db_metrics(db_session.bind)
+    app_metrics.install_db_metrics(db_session.bind)  # повторная установка не дублирует счёт
+
+    async def view_patient(event, data):
+        await db_session.execute(select(Patient))
+        await db_session.execute(select(Patient.id))
+
+    name = "test_metrics.test_middleware_counts_queries_per_update.<locals>.view_patient"
+    before = app_metrics.UPDATE_DB_QUERIES.count(handler=name)
+    queries_before = app_metrics.DB_QUERIES.value()
+    await MetricsMiddleware("message")(view_patient, MagicMock(), {"handler": MagicMock(callback=view_patient)})
+
+    assert app_metrics.UPDATE_DB_QUERIES.count(handler=name) == before + 1
+    assert app_metrics.DB_QUERIES.value() - queries_before == 2
+    assert app_metrics.HANDLER_SECONDS.count(handler=name, event="message", callback="-") >= 1
+
+
+@pytest.mark.asyncio
+async def test_admin_metrics_endpoint():
+    from httpx import AsyncClient, ASGITransport
+    from admin_webapp.main import app
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/health/live")
+        resp = await client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'ministom_http_request_seconds_count{path="/health/live",status="200"}' in resp.text
@@ -0,0 +1,27 @@
+"""Тесты keyset-курсоров и подсчёта строк."""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.database.models import Patient
+from app.utils.pagination import decode_cursor, encode_cursor, estimate_count
+
+
+def test_cursor_roundtrip():
+    moment = datetime(2026, 3, 16, 9, 30, 15, 123456)
+    cursor = encode_cursor(moment, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (moment, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "abc", encode_cursor(datetime(2026, 1, 1), 1)[:-3] + "%%%"])
+def test_cursor_invalid(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.asyncio
+async def test_estimate_count_exact_outside_postgres(db_session, patient):
+    total, estimated = await estimate_count(db_session, select(Patient).order_by(Patient.id))
+    assert (total, estimated) == (1, False)
@@ -3,7 +3,9 @@ import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import User, Patient
-from app.services.patient_service import search_patients, get_patient_by_id, get_all_patients
+from app.services.patient_service import (
+    search_patients, get_patient_by_id, get_all_patients, get_patient_name_index,
+)
 
 
 @pytest.mark.asyncio
@@ -76,3 +78,9 @@ async def test_get_all_patients_limit(db_session: AsyncSession, doctor: User):
 
     result = await get_all_patients(db_session, doctor.id, limit=3)
     assert len(result) == 3
+
+
+@pytest.mark.asyncio
+async def test_name_index(db_session: AsyncSession, doctor: User, patient: Patient):
+    index = await get_patient_name_index(db_session, doctor.id)
+    assert index == [(patient.id, "Иванов Иван Иванович", "+998901234567")]
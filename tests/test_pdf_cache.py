@@ -0,0 +1,94 @@
+"""Тесты кэша PDF: ключи по содержимому, LRU на диске, переиспользование file_id."""
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.database.models import User, Patient, Treatment
+from app.services import pdf_cache as pc
+
+
+def _invoice_inputs(paid: float = 0):
+    doctor = User(id=1, telegram_id=1, full_name="Доктор Тестов")
+    patient = Patient(id=5, doctor_id=1, full_name="Иванов Иван")
+    treatments = [Treatment(id=10, service_name="Консультация", price=200_000, paid_amount=paid)]
+    return doctor, patient, treatments
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    c = pc.PdfCache(tmp_path, max_bytes=1000)
+    monkeypatch.setattr(pc, "pdf_cache", c)
+    return c
+
+
+def test_key_stable_and_sensitive_to_rows():
+    k1 = pc.invoice_cache_key(*_invoice_inputs())
+    k2 = pc.invoice_cache_key(*_invoice_inputs())
+    k3 = pc.invoice_cache_key(*_invoice_inputs(paid=100_000))
+    assert k1 == k2
+    assert k1 != k3
+
+
+def test_key_changes_with_generation_day():
+    # В документе печатается дата формирования — вчерашний PDF сегодня не отдаётся
+    inputs = _invoice_inputs()
+    assert pc.invoice_cache_key(*inputs) == pc.invoice_cache_key(*inputs, day=date.today())
+    assert pc.invoice_cache_key(*inputs, day=date(2026, 3, 16)) != pc.invoice_cache_key(*inputs, day=date(2026, 3, 17))
+    doctor, patient, _ = inputs
+    assert pc.implant_card_cache_key(doctor, patient, [], day=date(2026, 3, 16)) != \
+        pc.implant_card_cache_key(doctor, patient, [], day=date(2026, 3, 17))
+
+
+def test_key_differs_between_document_kinds():
+    doctor, patient, _ = _invoice_inputs()
+    assert pc.invoice_cache_key(doctor, patient, []) != pc.implant_card_cache_key(doctor, patient, [])
+
+
+def test_put_get_roundtrip(cache):
+    cache.put("a", b"%PDF-1")
+    assert cache.get("a") == b"%PDF-1"
+    assert cache.get("missing") is None
+
+
+def test_lru_eviction_by_size(cache, tmp_path):
+    import os
+    cache.put("old", b"x" * 400)
+    os.utime(tmp_path / "old.pdf", (1, 1))
+    cache.set_file_id("old", "FID_OLD")
+    cache.put("mid", b"x" * 400)
+    cache.put("new", b"x" * 400)  # 1200 > 1000 — вытесняется самый старый
+    assert cache.get("old") is None
+    assert cache.get_file_id("old") is None
+    assert cache.get("mid") is not None
+    assert cache.get("new") is not None
+
+
+@pytest.mark.asyncio
+async def test_send_cached_pdf_reuses_file_id(cache):
+    render = MagicMock(return_value=b"%PDF-data")
+    message = AsyncMock()
+    message.answer_document = AsyncMock(
+        return_value=SimpleNamespace(document=SimpleNamespace(file_id="FILE123"))
+    )
+
+    await pc.send_cached_pdf(message, "k", render, filename="a.pdf", caption="c")
+    await pc.send_cached_pdf(message, "k", render, filename="a.pdf", caption="c")
+
+    assert render.call_count == 1
+    second = message.answer_document.call_args_list[1]
+    assert second.kwargs["document"] == "FILE123"
+
+
+@pytest.mark.asyncio
+async def test_send_cached_pdf_uses_disk_cache_without_render(cache):
+    cache.put("k", b"%PDF-cached")
+    render = MagicMock()
+    message = AsyncMock()
+    message.answer_document = AsyncMock(return_value=None)
+
+    await pc.send_cached_pdf(message, "k", render, filename="a.pdf", caption="c")
+
+    render.assert_not_called()
+    assert message.answer_document.call_args.kwargs["document"].data == b"%PDF-cached"
@@ -0,0 +1,71 @@
+"""Тесты pdf_generator: реестр шаблонов и рендер HTML (без WeasyPrint)."""
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from io import BytesIO
+
+import pytest
+
+from app.database.models import User, Patient, Treatment, ImplantLog
+from app.services import pdf_generator
+
+
+def _doctor() -> User:
+    return User(id=1, telegram_id=1, full_name="Доктор Тестов", phone="+998900000000")
+
+
+def _patient() -> Patient:
+    return Patient(id=1, doctor_id=1, full_name="Иванов Иван", phone="+998901234567")
+
+
+def test_env_and_templates_compiled_once():
+    t1 = pdf_generator.get_template(pdf_generator.INVOICE_TEMPLATE)
+    t2 = pdf_generator.get_template(pdf_generator.INVOICE_TEMPLATE)
+    assert t1 is t2
+    assert pdf_generator._get_env() is pdf_generator._get_env()
+    assert "format_money" in pdf_generator._get_env().filters
+
+
+def test_warm_up_without_fonts_does_not_need_weasyprint():
+    pdf_generator.warm_up()
+
+
+def test_render_invoice_html_totals():
+    treatments = [
+        Treatment(id=1, service_name="Лечение кариеса", price=100_000, discount_percent=10, paid_amount=50_000),
+        Treatment(id=2, service_name="Консультация", price=50_000),
+    ]
+    html = pdf_generator.render_invoice_html(_doctor(), _patient(), treatments)
+    assert "Иванов Иван" in html
+    assert "Лечение кариеса" in html
+    assert "140 000 сум" in html  # итого со скидкой
+    assert "90 000 сум" in html   # долг
+
+
+def test_render_implant_card_marks_teeth():
+    implants = [
+        ImplantLog(id=1, tooth_number="36", system_name="Straumann", implant_size="4.1 x 10",
+                   operation_date=date(2026, 1, 10)),
+    ]
+    html = pdf_generator.render_implant_card_html(_doctor(), _patient(), implants)
+    assert "implant implant-0" in html
+    assert "Straumann" in html
+    assert "4.1" in html
+
+
+@pytest.mark.asyncio
+async def test_generate_invoices_zip_one_pdf_per_patient(monkeypatch):
+    monkeypatch.setattr(pdf_generator, "html_to_pdf", lambda html: b"%PDF-" + html[:10].encode())
+    p1 = Patient(id=1, doctor_id=1, full_name="Иванов Иван")
+    p2 = Patient(id=2, doctor_id=1, full_name="Петров Пётр")
+    invoices = [
+        (p1, [Treatment(id=1, service_name="Консультация", price=100)]),
+        (p2, [Treatment(id=2, service_name="Чистка", price=200)]),
+    ]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        data = await pdf_generator.generate_invoices_zip(_doctor(), invoices, executor=pool)
+
+    with zipfile.ZipFile(BytesIO(data)) as zf:
+        names = zf.namelist()
+        assert names == ["invoice_Иванов_Иван_1.pdf", "invoice_Петров_Пётр_2.pdf"]
+        assert zf.read(names[0]).startswith(b"%PDF-")
@@ -0,0 +1,73 @@
+"""Тесты read-моделей: расписание, список пациентов и должников одним запросом."""
+from datetime import date, datetime
+
+import pytest
+
+from app.database.models import Appointment, ClinicLocation, Patient, Service, Treatment
+from app.handlers.finance import _treatment_debt
+from app.services.calendar_service import format_appointments_list, get_busy_ranges_for_date
+from app.services.read_models import get_debtor_rows, get_patient_rows, get_schedule_rows
+
+
+@pytest.mark.asyncio
+async def test_schedule_rows_join_patient_service_location(db_session, doctor, patient):
+    location = ClinicLocation(doctor_id=doctor.id, name="Центр", emoji="🏢")
+    service = Service(doctor_id=doctor.id, category="therapy", name="Пломба", price=250_000, duration_minutes=60)
+    db_session.add_all([location, service])
+    await db_session.flush()
+    db_session.add_all([
+        Appointment(doctor_id=doctor.id, patient_id=patient.id, service_id=service.id, location_id=location.id,
+                    date_time=datetime(2026, 3, 17, 9, 0)),
+        Appointment(doctor_id=doctor.id, service_description="Без пациента",
+                    date_time=datetime(2026, 3, 17, 11, 0), duration_minutes=45),
+        Appointment(doctor_id=doctor.id, patient_id=patient.id, status="cancelled",
+                    date_time=datetime(2026, 3, 17, 12, 0)),
+    ])
+    await db_session.commit()
+
+    rows = await get_schedule_rows(db_session, doctor.id, date(2026, 3, 17))
+    assert [r.date_time.hour for r in rows] == [9, 11]
+    first, second = rows
+    assert (first.patient_name, first.patient_phone) == (patient.full_name, patient.phone)
+    assert (first.service_name, first.service_price, first.location_emoji) == ("Пломба", 250_000, "🏢")
+    assert second.patient_name is None and second.service_name is None
+
+    text = await format_appointments_list(rows)
+    assert "🏢 09:00 - Иванов Иван Иванович — Пломба" in text
+    assert "11:00 - Без пациента" in text
+    ranges = await get_busy_ranges_for_date(db_session, doctor.id, date(2026, 3, 17))
+    assert ranges[1] == (datetime(2026, 3, 17, 11, 0), datetime(2026, 3, 17, 11, 45))
+
+
+@pytest.mark.asyncio
+async def test_patient_rows_latest_first_with_limit(db_session, doctor):
+    db_session.add_all([
+        Patient(doctor_id=doctor.id, full_name=f"Пациент {i}", created_at=datetime(2026, 1, 1 + i))
+        for i in range(5)
+    ])
+    await db_session.commit()
+    rows = await get_patient_rows(db_session, doctor.id, limit=3)
+    assert [r.full_name for r in rows] == ["Пациент 4", "Пациент 3", "Пациент 2"]
+
+
+@pytest.mark.asyncio
+async def test_debtor_rows_match_python_debt(db_session, doctor):
+    debtor = Patient(doctor_id=doctor.id, full_name="Б Должник")
+    clean = Patient(doctor_id=doctor.id, full_name="А Без долга")
+    db_session.add_all([debtor, clean])
+    await db_session.flush()
+    treatments = [
+        Treatment(patient_id=debtor.id, doctor_id=doctor.id, price=1000, discount_percent=10, paid_amount=200),
+        Treatment(patient_id=debtor.id, doctor_id=doctor.id, price=500, discount_amount=600, paid_amount=0),
+        Treatment(patient_id=debtor.id, doctor_id=doctor.id, price=300, paid_amount=500),
+        Treatment(patient_id=debtor.id, doctor_id=doctor.id, price=None, paid_amount=None),
+        Treatment(patient_id=clean.id, doctor_id=doctor.id, price=100, paid_amount=100),
+    ]
+    db_session.add_all(treatments)
+    await db_session.commit()
+
+    rows = await get_debtor_rows(db_session, doctor.id)
+    assert [r.full_name for r in rows] == ["А Без долга", "Б Должник"]
+    expected = sum(_treatment_debt(t) for t in treatments[:4] if t.price is not None)
+    assert rows[1].debt == pytest.approx(expected) == 700
+    assert rows[0].debt == 0
@@ -0,0 +1,69 @@
+"""Тесты маршрутизации отчётных чтений на реплику с откатом на основную БД."""
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import base
+from app.database.base import report_session
+from app.database.models import Base, Treatment, User
+from app.handlers.finance import finance_stats_show
+from app.utils.permissions import full_permissions
+from tests.helpers import make_callback
+
+
+@pytest_asyncio.fixture
+async def replica_maker(monkeypatch):
+    """«Реплика» — отдельная in-memory БД; основная — db_session из conftest."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(base, "replica_session_maker", maker)
+    monkeypatch.setattr(base, "_replica_down_until", 0.0)
+    yield maker
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_without_replica_uses_primary(db_session):
+    async with report_session(db_session) as session:
+        assert session is db_session
+
+
+@pytest.mark.asyncio
+async def test_replica_used_when_configured(db_session, replica_maker):
+    async with report_session(db_session) as session:
+        assert session is not db_session
+        assert session.bind is replica_maker.kw["bind"]
+
+
+@pytest.mark.asyncio
+async def test_unreachable_replica_falls_back_and_backs_off(db_session, monkeypatch):
+    broken = create_async_engine("sqlite+aiosqlite:////nonexistent-dir/replica.db")
+    calls = []
+
+    def maker():
+        calls.append(1)
+        return AsyncSession(broken)
+
+    monkeypatch.setattr(base, "replica_session_maker", maker)
+    monkeypatch.setattr(base, "_replica_down_until", 0.0)
+    async with report_session(db_session) as session:
+        assert session is db_session
+    # В окне DB_REPLICA_RETRY_SECONDS реплика не опрашивается
+    async with report_session(db_session) as session:
+        assert session is db_session
+    assert len(calls) == 1
+    await broken.dispose()
+
+
+@pytest.mark.asyncio
+async def test_finance_stats_read_from_replica(db_session, doctor, replica_maker):
+    async with replica_maker() as replica:
+        replica.add(User(id=doctor.id, telegram_id=doctor.telegram_id, full_name=doctor.full_name, role="owner"))
+        replica.add(Treatment(patient_id=1, doctor_id=doctor.id, service_name="С реплики", price=100, paid_amount=100))
+        await replica.commit()
+
+    cb = make_callback("finance_stats_all")
+    await finance_stats_show(cb, doctor, full_permissions(), db_session)
+    assert "С реплики" in cb.message.edit_text.call_args[0][0]
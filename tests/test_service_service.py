@@ -0,0 +1,142 @@
+"""Тесты каталога услуг: один раз созданные услуги по умолчанию, кэш и его сброс."""
+import io
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app.database.models import Service
+from app.handlers.services import price_delete_service, process_service_price
+from app.middleware.sql_profiler import query_budget
+from app.services.metrics import install_db_metrics
+from app.services.service_service import (
+    DEFAULT_SERVICES,
+    DEFAULTS_SEEDED_KEY,
+    ensure_default_services,
+    get_service_catalog,
+    get_service_refs,
+    get_services_by_category,
+)
+from app.services.tenant_backup import export_doctor, restore_doctor
+from app.utils.permissions import full_permissions
+from tests.helpers import make_callback, make_message, make_state
+
+
+@pytest.fixture(autouse=True)
+def profiled_engine(db_engine):
+    install_db_metrics(db_engine)
+
+
+async def _count(db_session, doctor_id: int) -> int:
+    return await db_session.scalar(select(func.count(Service.id)).where(Service.doctor_id == doctor_id))
+
+
+@pytest.mark.asyncio
+async def test_defaults_seeded_once_with_marker(db_session, doctor):
+    await ensure_default_services(db_session, doctor)
+    total = sum(len(items) for items in DEFAULT_SERVICES.values())
+    assert await _count(db_session, doctor.id) == total
+    assert doctor.settings[DEFAULTS_SEEDED_KEY] is True
+
+    # Врач очистил категорию — повторно она не заполняется, запросов нет
+    await db_session.execute(delete(Service).where(Service.category == "surgery"))
+    await db_session.commit()
+    with query_budget(0, "ensure_default_services"):
+        await ensure_default_services(db_session, doctor)
+    assert await _count(db_session, doctor.id) == total - len(DEFAULT_SERVICES["surgery"])
+
+
+@pytest.mark.asyncio
+async def test_existing_category_kept(db_session, doctor):
+    db_session.add(Service(doctor_id=doctor.id, category="therapy", name="Пломба", price=100, sort_order=0))
+    await db_session.commit()
+    await ensure_default_services(db_session, doctor)
+    therapy = await get_services_by_category(db_session, doctor.id, "therapy")
+    assert [s.name for s in therapy] == ["Пломба"]
+    surgery = await get_services_by_category(db_session, doctor.id, "surgery")
+    assert [s.name for s in surgery] == [name for name, _ in DEFAULT_SERVICES["surgery"]]
+
+
+@pytest.mark.asyncio
+async def test_catalog_serves_categories_and_refs_from_one_query(db_session, doctor):
+    await ensure_default_services(db_session, doctor)
+    with query_budget(1, "catalog"):
+        for category in DEFAULT_SERVICES:
+            assert await get_services_by_category(db_session, doctor.id, category)
+        refs = await get_service_refs(db_session, doctor.id)
+        await ensure_default_services(db_session, doctor)
+    assert len(refs) == await _count(db_session, doctor.id)
+
+
+@pytest.mark.asyncio
+async def test_orm_edit_invalidates_catalog(db_session, doctor):
+    await ensure_default_services(db_session, doctor)
+    first = (await get_services_by_category(db_session, doctor.id, "therapy"))[0]
+
+    state = make_state()
+    await state.update_data(service_action="edit", service_id=first.id, service_category="therapy")
+    doctor.subscription_tier = 2
+    await process_service_price(make_message("777"), doctor, full_permissions(), state, db_session)
+
+    therapy = await get_services_by_category(db_session, doctor.id, "therapy")
+    assert therapy[0].price == 777
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_invalidates_catalog(db_session, doctor):
+    await ensure_default_services(db_session, doctor)
+    first = (await get_services_by_category(db_session, doctor.id, "surgery"))[0]
+
+    state = make_state()
+    await state.update_data(service_id=first.id, service_category="surgery")
+    doctor.subscription_tier = 2
+    await price_delete_service(make_callback("price_delete"), doctor, state, db_session)
+
+    surgery = await get_services_by_category(db_session, doctor.id, "surgery")
+    assert first.id not in {s.id for s in surgery}
+    assert len(surgery) == len(DEFAULT_SERVICES["surgery"]) - 1
+
+
+@pytest.mark.asyncio
+async def test_seeded_marker_survives_restore_of_older_backup(db_session, doctor):
+    buf = io.BytesIO()
+    await export_doctor(db_session, doctor.id, buf)  # бэкап до создания услуг по умолчанию
+    await ensure_default_services(db_session, doctor)
+    buf.seek(0)
+
+    await restore_doctor(db_session, doctor, buf)
+
+    assert doctor.settings[DEFAULTS_SEEDED_KEY] is True
+    # Врач очистил прайс восстановлением — заново не заполняется
+    await ensure_default_services(db_session, doctor)
+    assert await _count(db_session, doctor.id) == 0
+
+
+@pytest.mark.asyncio
+async def test_catalog_invalidated_on_commit_not_flush(db_session, doctor):
+    catalog = await get_service_catalog(db_session, doctor.id)
+
+    db_session.add(Service(doctor_id=doctor.id, category="therapy", name="Осмотр", price=100))
+    await db_session.flush()
+    assert await get_service_catalog(db_session, doctor.id) is catalog
+    await db_session.commit()
+    assert "therapy" in (await get_service_catalog(db_session, doctor.id)).categories()
+
+
+@pytest.mark.asyncio
+async def test_catalog_read_before_concurrent_commit_not_cached(db_session, doctor, monkeypatch):
+    execute = db_session.execute
+    doctor_id = doctor.id
+
+    async def execute_then_commit(*args, **kwargs):
+        result = await execute(*args, **kwargs)
+        # Запрос каталога уже прочитал строки — другой апдейт добавляет услугу
+        db_session.add(Service(doctor_id=doctor_id, category="therapy", name="Осмотр", price=100))
+        await db_session.commit()
+        return result
+
+    monkeypatch.setattr(db_session, "execute", execute_then_commit)
+    stale = await get_service_catalog(db_session, doctor_id)
+    monkeypatch.setattr(db_session, "execute", execute)
+
+    assert stale.services == []
+    assert [s.name for s in (await get_service_catalog(db_session, doctor_id)).services] == ["Осмотр"]
@@ -0,0 +1,86 @@
+"""Тесты SQL-профилировщика: бюджеты запросов хендлеров (защита от N+1)."""
+import logging
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import select
+
+from app.database.models import Patient, Treatment
+from app.handlers.finance import finance_payments_list
+from app.handlers.history import view_patient_history
+from app.middleware import sql_profiler
+from app.middleware.sql_profiler import QueryBudgetExceeded, SqlProfilerMiddleware, query_budget
+from app.services.metrics import install_db_metrics
+from app.utils.permissions import full_permissions
+from tests.helpers import make_callback, make_state
+
+
+@pytest.fixture(autouse=True)
+def profiled_engine(db_engine):
+    install_db_metrics(db_engine)
+    sql_profiler.reset_profiles()
+    yield
+    sql_profiler.reset_profiles()
+
+
+async def _add_patients_with_treatments(db_session, doctor, count: int) -> list[Patient]:
+    patients = [Patient(doctor_id=doctor.id, full_name=f"Пациент {i}") for i in range(count)]
+    db_session.add_all(patients)
+    await db_session.flush()
+    for p in patients:
+        db_session.add_all([
+            Treatment(patient_id=p.id, doctor_id=doctor.id, service_name="Пломба", price=100),
+            Treatment(patient_id=p.id, doctor_id=doctor.id, service_name="Чистка", price=50),
+        ])
+    await db_session.commit()
+    return patients
+
+
+@pytest.mark.asyncio
+async def test_payments_list_query_count_independent_of_patients(db_session, doctor):
+    await _add_patients_with_treatments(db_session, doctor, 10)
+    with query_budget(1, "finance_payments_list"):
+        await finance_payments_list(make_callback("finance_payments"), doctor, full_permissions(), db_session)
+
+
+@pytest.mark.asyncio
+async def test_patient_history_query_budget(db_session, doctor):
+    patients = await _add_patients_with_treatments(db_session, doctor, 1)
+    cb = make_callback(f"patient_history_{patients[0].id}")
+    with query_budget(2, "view_patient_history"):
+        await view_patient_history(cb, doctor, full_permissions(), make_state(), db_session)
+
+
+@pytest.mark.asyncio
+async def test_budget_exceeded_lists_statements(db_session, doctor):
+    await _add_patients_with_treatments(db_session, doctor, 3)
+    with pytest.raises(QueryBudgetExceeded, match="4 SQL-запросов при бюджете 2") as exc_info:
+        with query_budget(2, "n_plus_one"):
+            patients = (await db_session.execute(select(Patient))).scalars().all()
+            for p in patients:
+                await db_session.execute(select(Treatment).where(Treatment.patient_id == p.id))
+    assert "FROM treatments" in str(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_middleware_aggregates_and_logs(db_session, doctor, caplog):
+    async def list_patients(event, data):
+        for _ in range(3):
+            await db_session.execute(select(Patient))
+        return "done"
+
+    data = {"handler": MagicMock(callback=list_patients)}
+    name = "test_sql_profiler.test_middleware_aggregates_and_logs.<locals>.list_patients"
+    middleware = SqlProfilerMiddleware(max_queries=2, slow_ms=10_000)
+
+    with caplog.at_level(logging.WARNING, logger="app.middleware.sql_profiler"):
+        assert await middleware(list_patients, MagicMock(), data) == "done"
+    assert "3 запросов (бюджет 2)" in caplog.text
+
+    profile = sql_profiler.get_profiles()[name]
+    assert (profile.updates, profile.queries, profile.max_queries) == (1, 3, 3)
+    assert len(profile.slowest) == 3
+
+    strict = SqlProfilerMiddleware(budgets={name: 1}, strict=True)
+    with pytest.raises(QueryBudgetExceeded):
+        await strict(list_patients, MagicMock(), data)
@@ -0,0 +1,96 @@
+"""Тесты stats_service: итоги одним запросом, свёртка по дням, кэш дашборда."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select
+
+from app.database.models import Appointment, DailyStats, Patient, User
+from app.services import stats_service
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    stats_service.invalidate_stats()
+    yield
+    stats_service.invalidate_stats()
+
+
+def _count_queries(db_session):
+    statements = []
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+async def _add_users(db_session, tiers):
+    for i, tier in enumerate(tiers):
+        db_session.add(User(telegram_id=500 + i, full_name=f"Врач {i}", subscription_tier=tier))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_totals_single_query(db_session, appointment):
+    await _add_users(db_session, [0, 0, 2])
+    statements = _count_queries(db_session)
+
+    totals = await stats_service.get_totals(db_session)
+
+    assert len(statements) == 1
+    # Фикстура doctor — Standard
+    assert totals["tier_counts"] == {"basic": 2, "standard": 1, "premium": 1}
+    assert totals["total_users"] == 4
+    assert totals["total_patients"] == 1
+    assert totals["total_appointments"] == 1
+    assert totals["total_treatments"] == 0
+    assert totals["estimated"] == []
+
+
+@pytest.mark.asyncio
+async def test_refresh_recomputes_only_open_days(db_session, doctor):
+    now = datetime.now()
+    db_session.add(Patient(doctor_id=doctor.id, full_name="Петров", created_at=now - timedelta(days=2)))
+    db_session.add(Patient(doctor_id=doctor.id, full_name="Сидоров", created_at=now))
+    await db_session.commit()
+
+    first = await stats_service.refresh_daily_stats(db_session, days=5, now=now)
+    assert len(first) == 5
+
+    # Прошедшие дни окончательны — повторно пересчитывается только сегодня
+    second = await stats_service.refresh_daily_stats(db_session, days=5, now=now)
+    assert second == [now.date()]
+
+    trends = await stats_service.get_trends(db_session, days=5, now=now)
+    assert [d["day"] for d in trends][-1] == now.date().isoformat()
+    assert [d["new_patients"] for d in trends] == [0, 0, 1, 0, 1]
+
+
+@pytest.mark.asyncio
+async def test_final_day_kept_from_rollup(db_session, doctor):
+    now = datetime.now()
+    yesterday = now.date() - timedelta(days=1)
+    # Строка за вчера пересчитана после конца дня — в исходные таблицы больше не смотрим
+    db_session.add(DailyStats(day=yesterday, new_users=7, new_patients=0, new_appointments=3,
+                              new_treatments=0, updated_at=now))
+    await db_session.commit()
+
+    refreshed = await stats_service.refresh_daily_stats(db_session, days=2, now=now)
+
+    assert refreshed == [now.date()]
+    row = await db_session.scalar(select(DailyStats).where(DailyStats.day == yesterday))
+    assert (row.new_users, row.new_appointments) == (7, 3)
+
+
+@pytest.mark.asyncio
+async def test_dashboard_cached_until_invalidated(db_session, appointment):
+    stats = await stats_service.get_dashboard_stats(db_session)
+    assert stats["total_appointments"] == 1
+    assert len(stats["trends"]) == stats_service.STATS_TREND_DAYS
+    assert sum(d["new_appointments"] for d in stats["trends"]) == 1
+
+    db_session.add(Appointment(doctor_id=appointment.doctor_id, patient_id=appointment.patient_id,
+                               date_time=datetime.now() + timedelta(days=1)))
+    await db_session.commit()
+    assert (await stats_service.get_dashboard_stats(db_session))["total_appointments"] == 1
+
+    stats_service.invalidate_stats()
+    assert (await stats_service.get_dashboard_stats(db_session))["total_appointments"] == 2
@@ -0,0 +1,179 @@
+"""Тесты логического бэкапа одного врача: экспорт, восстановление, переназначение id."""
+import gzip
+import io
+from datetime import datetime, date
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import (
+    User, DoctorAssistant, ClinicLocation, Service, Patient, Appointment, Treatment, ImplantLog,
+)
+from app.services.tenant_backup import TenantBackupError, export_doctor, restore_doctor
+
+
+async def _seed(db: AsyncSession, doctor: User) -> None:
+    assistant = User(telegram_id=222222, full_name="Ассистент", role="assistant", owner_id=doctor.id)
+    location = ClinicLocation(doctor_id=doctor.id, name="Центр")
+    service = Service(doctor_id=doctor.id, category="therapy", name="Консультация", price=100)
+    patient = Patient(doctor_id=doctor.id, full_name="Иванов Иван", birth_date=date(1990, 1, 2))
+    db.add_all([assistant, location, service, patient])
+    await db.flush()
+    db.add(DoctorAssistant(doctor_id=doctor.id, assistant_id=assistant.id, permissions={"calendar": "edit"}))
+    apt = Appointment(doctor_id=doctor.id, patient_id=patient.id, service_id=service.id,
+                      location_id=location.id, date_time=datetime(2026, 3, 17, 14, 0))
+    db.add(apt)
+    await db.flush()
+    db.add_all([
+        Treatment(doctor_id=doctor.id, patient_id=patient.id, appointment_id=apt.id,
+                  service_name="Консультация", price=100),
+        ImplantLog(doctor_id=doctor.id, patient_id=patient.id, tooth_number="36",
+                   system_name="Straumann", implant_size="4.1 x 10", operation_date=date(2026, 3, 1)),
+    ])
+    await db.commit()
+
+
+async def _count(db: AsyncSession, model, doctor_id: int) -> int:
+    return await db.scalar(select(func.count()).select_from(model).where(model.doctor_id == doctor_id))
+
+
+@pytest.fixture
+async def other_doctor(db_session: AsyncSession) -> User:
+    other = User(telegram_id=333333, full_name="Другой врач", role="owner")
+    db_session.add(other)
+    await db_session.commit()
+    db_session.add(Patient(doctor_id=other.id, full_name="Чужой пациент"))
+    await db_session.commit()
+    return other
+
+
+@pytest.mark.asyncio
+async def test_roundtrip_restores_own_data_only(db_session: AsyncSession, doctor: User, other_doctor: User):
+    await _seed(db_session, doctor)
+    buf = io.BytesIO()
+    counts = await export_doctor(db_session, doctor.id, buf)
+    assert counts["users"] == 2 and counts["appointments"] == 1
+
+    # Врач «испортил» данные: удалил пациента и переименовался
+    patient = await db_session.scalar(select(Patient).where(Patient.doctor_id == doctor.id))
+    await db_session.delete(patient)
+    doctor.full_name = "Опечатка"
+    await db_session.commit()
+
+    buf.seek(0)
+    restored = await restore_doctor(db_session, doctor, buf)
+
+    assert restored["patients"] == 1
+    assert doctor.full_name == "Доктор Тестов"
+    apt = await db_session.scalar(select(Appointment).where(Appointment.doctor_id == doctor.id))
+    patient = await db_session.scalar(select(Patient).where(Patient.doctor_id == doctor.id))
+    assert apt.patient_id == patient.id
+    assert patient.birth_date == date(1990, 1, 2)
+    treatment = await db_session.scalar(select(Treatment).where(Treatment.doctor_id == doctor.id))
+    assert treatment.appointment_id == apt.id
+    link = await db_session.scalar(select(DoctorAssistant).where(DoctorAssistant.doctor_id == doctor.id))
+    assistant = await db_session.scalar(select(User).where(User.telegram_id == 222222))
+    assert link.assistant_id == assistant.id
+    # Другой врач не затронут
+    assert await _count(db_session, Patient, other_doctor.id) == 1
+
+
+@pytest.mark.asyncio
+async def test_restore_into_other_doctor_remaps_ids(db_session: AsyncSession, doctor: User, other_doctor: User):
+    await _seed(db_session, doctor)
+    buf = io.BytesIO()
+    await export_doctor(db_session, doctor.id, buf)
+    buf.seek(0)
+
+    await restore_doctor(db_session, other_doctor, buf)
+
+    # Копия у второго врача, у первого всё на месте
+    for model in (Patient, Appointment, Treatment, ImplantLog, Service, ClinicLocation):
+        assert await _count(db_session, model, doctor.id) == 1
+        assert await _count(db_session, model, other_doctor.id) == 1
+    apt = await db_session.scalar(select(Appointment).where(Appointment.doctor_id == other_doctor.id))
+    service = await db_session.scalar(select(Service).where(Service.doctor_id == other_doctor.id))
+    assert apt.service_id == service.id
+
+
+@pytest.mark.asyncio
+async def test_truncated_backup_rolls_back(db_session: AsyncSession, doctor: User, patient: Patient):
+    buf = io.BytesIO()
+    await export_doctor(db_session, doctor.id, buf)
+    lines = gzip.decompress(buf.getvalue()).splitlines()
+    truncated = io.BytesIO(gzip.compress(b"\n".join(lines[:-1])))
+    doctor_id = doctor.id  # после отката ORM-объекты истекают
+
+    with pytest.raises(TenantBackupError):
+        await restore_doctor(db_session, doctor, truncated)
+    assert await _count(db_session, Patient, doctor_id) == 1
+
+
+@pytest.mark.asyncio
+async def test_not_a_backup(db_session: AsyncSession, doctor: User):
+    with pytest.raises(TenantBackupError):
+        await restore_doctor(db_session, doctor, io.BytesIO(b"plain text"))
+
+
+@pytest.mark.asyncio
+async def test_restore_keeps_subscription_and_role(db_session: AsyncSession, doctor: User, other_doctor: User):
+    doctor.subscription_tier = 0
+    doctor.subscription_end_date = None
+    await db_session.commit()
+    buf = io.BytesIO()
+    await export_doctor(db_session, doctor.id, buf)
+    # После бэкапа врач оплатил подписку
+    end = datetime(2027, 1, 1)
+    doctor.subscription_tier = 2
+    doctor.subscription_end_date = end
+    await db_session.commit()
+
+    buf.seek(0)
+    await restore_doctor(db_session, doctor, buf)
+
+    assert doctor.subscription_tier == 2
+    assert doctor.subscription_end_date == end
+    # Чужой бэкап не переносит тариф и срок
+    other_doctor.subscription_tier = 1
+    await db_session.commit()
+    buf.seek(0)
+    await restore_doctor(db_session, other_doctor, buf)
+    assert other_doctor.subscription_tier == 1
+    assert other_doctor.subscription_end_date is None
+    assert other_doctor.role == "owner"
+
+
+@pytest.mark.asyncio
+async def test_cross_doctor_restore_keeps_assistants_of_source(
+    db_session: AsyncSession, doctor: User, other_doctor: User
+):
+    await _seed(db_session, doctor)
+    buf = io.BytesIO()
+    await export_doctor(db_session, doctor.id, buf)
+    buf.seek(0)
+
+    counts = await restore_doctor(db_session, other_doctor, buf)
+
+    assert counts["assistants_skipped"] == 1
+    assistant = await db_session.scalar(select(User).where(User.telegram_id == 222222))
+    assert assistant.owner_id == doctor.id
+    assert await _count(db_session, DoctorAssistant, doctor.id) == 1
+    assert await _count(db_session, DoctorAssistant, other_doctor.id) == 0
+
+
+@pytest.mark.asyncio
+async def test_restore_unlinks_assistants_missing_from_backup(db_session: AsyncSession, doctor: User):
+    buf = io.BytesIO()
+    await export_doctor(db_session, doctor.id, buf)
+    # Ассистент добавлен после бэкапа
+    late = User(telegram_id=444444, full_name="Новый ассистент", role="assistant", owner_id=doctor.id)
+    db_session.add(late)
+    await db_session.commit()
+
+    buf.seek(0)
+    counts = await restore_doctor(db_session, doctor, buf)
+
+    assert counts["assistants_unlinked"] == 1
+    await db_session.refresh(late)
+    assert late.owner_id is None and late.role == "owner"
@@ -79,3 +79,76 @@ async def test_no_user_passes_through():
     await mw(handler, event, {})
 
     assert handler.call_count == 2
+
+
+def _message(user_id: int):
+    from aiogram.types import Message
+    event = MagicMock(spec=Message)
+    event.from_user = MagicMock(id=user_id)
+    event.answer = AsyncMock()
+    return event
+
+
+@pytest.mark.asyncio
+async def test_route_cost_consumes_more_tokens():
+    """Тяжёлый хендлер (throttle_cost) расходует несколько запросов лимита."""
+    mw = ThrottleMiddleware(rate=5, period=60)
+    handler = AsyncMock()
+    heavy = {"handler": MagicMock(flags={"throttle_cost": 3})}
+
+    await mw(handler, _message(7), heavy)
+    await mw(handler, _message(7), heavy)  # 6 > 5 — отклонён
+    await mw(handler, _message(7), {})
+    await mw(handler, _message(7), {})
+    await mw(handler, _message(7), {})  # 3 + 1 + 1 = 5, дальше — нет
+
+    assert handler.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_tokens_refill_over_time(monkeypatch):
+    """Через period / rate освобождается место ещё для одного запроса."""
+    now = [1000.0]
+    monkeypatch.setattr("app.middleware.throttle.time.monotonic", lambda: now[0])
+    monkeypatch.setattr("app.utils.ttl_cache.time.monotonic", lambda: now[0])
+    mw = ThrottleMiddleware(rate=2, period=10)
+
+    assert not mw._check_memory(1)
+    assert not mw._check_memory(1)
+    assert mw._check_memory(1)
+    now[0] += 5
+    assert not mw._check_memory(1)
+    assert mw._check_memory(1)
+
+
+def test_memory_state_is_bounded():
+    """In-memory состояние — одно число на пользователя, не больше max_users записей."""
+    mw = ThrottleMiddleware(rate=5, period=10, max_users=2)
+    for uid in range(10):
+        mw._check_memory(uid)
+    assert len(mw._tat) == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_path_single_script_call(monkeypatch):
+    """С Redis — один вызов Lua-скрипта с ключом пользователя и стоимостью."""
+    script = AsyncMock(side_effect=[1, 0])
+    monkeypatch.setattr("app.middleware.throttle._gcra_script", script)
+    mw = ThrottleMiddleware(rate=10, period=10, key_prefix="throttle:cb")
+    handler = AsyncMock()
+
+    await mw(handler, _message(42), {"handler": MagicMock(flags={"throttle_cost": 3})})
+    await mw(handler, _message(42), {})
+
+    assert handler.call_count == 1
+    assert script.await_args_list[0].kwargs == {"keys": ["throttle:cb:gcra:42"], "args": [1.0, 10, 3]}
+
+
+@pytest.mark.asyncio
+async def test_redis_error_falls_back_to_memory(monkeypatch):
+    monkeypatch.setattr("app.middleware.throttle._gcra_script", AsyncMock(side_effect=ConnectionError("down")))
+    mw = ThrottleMiddleware(rate=1, period=60)
+    handler = AsyncMock()
+    await mw(handler, _message(5), {})
+    await mw(handler, _message(5), {})
+    assert handler.call_count == 1
@@ -0,0 +1,148 @@
+"""Тесты трассировки апдейтов: этапы, перцентили, отчёт о медленных хендлерах."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.middleware import tracing
+from app.middleware.tracing import (
+    LatencyWindow,
+    TracingMiddleware,
+    add_stage,
+    get_latency,
+    percentile,
+    traced,
+)
+from app.services.error_monitor import ErrorMonitor
+
+
+@pytest.fixture(autouse=True)
+def clean_latency():
+    tracing.reset_latency()
+    yield
+    tracing.reset_latency()
+
+
+def _data(func) -> dict:
+    return {"handler": MagicMock(callback=func)}
+
+
+async def sample_handler(event, data):
+    return "ok"
+
+
+class SleepingMiddleware:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    async def __call__(self, handler, event, data):
+        await asyncio.sleep(self.seconds)
+        return await handler(event, data)
+
+
+def _chain(*middlewares, handler):
+    """Цепочка как у aiogram: первый middleware — внешний."""
+    async def call(event, data, index=0):
+        if index == len(middlewares):
+            return await handler(event, data)
+        return await middlewares[index](lambda e, d: call(e, d, index + 1), event, data)
+    return call
+
+
+def test_percentile_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7.0], 99) == 7.0
+
+
+def test_window_keeps_last_updates():
+    window = LatencyWindow(size=3)
+    for total in (10.0, 0.001, 0.002, 0.003):
+        window.add(total, {"handler": total})
+    stats = window.stats()
+    assert stats.samples == 3
+    assert stats.p99 == pytest.approx(3.0)
+    assert window.seen == 4
+
+
+@pytest.mark.asyncio
+async def test_stages_split_between_middlewares_and_handler():
+    async def slow_handler(event, data):
+        await asyncio.sleep(0.03)
+        add_stage(tracing.TELEGRAM_STAGE, 0.01)
+        return "done"
+
+    call = _chain(
+        TracingMiddleware(min_samples=1000),
+        traced("throttle", SleepingMiddleware(0.02)),
+        traced("user", SleepingMiddleware(0)),
+        handler=slow_handler,
+    )
+    assert await call(object(), _data(sample_handler)) == "done"
+
+    stats = get_latency()["test_tracing.sample_handler"]
+    assert stats.samples == 1
+    assert stats.stages_p95["throttle"] >= 15
+    assert stats.stages_p95["user"] < stats.stages_p95["throttle"]
+    assert stats.stages_p95["handler"] >= 25
+    assert stats.stages_p95["telegram"] == pytest.approx(10)
+    assert stats.p50 >= 45
+
+
+@pytest.mark.asyncio
+async def test_add_stage_outside_update_is_noop():
+    add_stage(tracing.TELEGRAM_STAGE, 1.0)
+    assert get_latency() == {}
+
+
+@pytest.mark.asyncio
+async def test_slow_p95_reported_to_error_monitor():
+    monitor = MagicMock()
+    monitor.report_slow_handler = AsyncMock()
+    middleware = TracingMiddleware(budget_ms=5, min_samples=3)
+
+    async def slow(event, data):
+        await asyncio.sleep(0.01)
+
+    with patch.object(tracing, "error_monitor", monitor):
+        for _ in range(3):
+            await middleware(slow, object(), _data(sample_handler))
+        await asyncio.sleep(0)
+
+    monitor.report_slow_handler.assert_awaited_once()
+    name, details = monitor.report_slow_handler.await_args.args
+    assert name == "test_tracing.sample_handler"
+    assert "p95" in details and "бюджет p95 5" in details
+
+
+@pytest.mark.asyncio
+async def test_fast_handler_not_reported():
+    monitor = MagicMock()
+    monitor.report_slow_handler = AsyncMock()
+    middleware = TracingMiddleware(budget_ms=1000, min_samples=2)
+    with patch.object(tracing, "error_monitor", monitor):
+        for _ in range(4):
+            await middleware(sample_handler, object(), _data(sample_handler))
+        await asyncio.sleep(0)
+    monitor.report_slow_handler.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_error_monitor_dedups_slow_reports_into_digest():
+    monitor = ErrorMonitor()
+    bot = AsyncMock()
+    monitor._bot = bot
+    with patch("app.services.error_monitor.Config") as mock_config:
+        mock_config.ADMIN_IDS = [111]
+        await monitor.report_slow_handler("calendar.show_day", "p95 3000 мс")
+        await monitor.report_slow_handler("calendar.show_day", "p95 3500 мс")
+        assert bot.send_message.call_count == 1
+        assert "Медленный хендлер" in bot.send_message.call_args_list[0][0][1]
+
+        await monitor._send_digest()
+    assert bot.send_message.call_count == 2
+    digest = bot.send_message.call_args_list[1][0][1]
+    assert "Медленные хендлеры" in digest and "p95 3500 мс" in digest
+    assert monitor._slow == {}
@@ -0,0 +1,45 @@
+"""Тесты app.utils.ttl_cache."""
+from unittest.mock import patch
+
+from app.utils.ttl_cache import TTLCache
+
+
+def test_get_set():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("b", 0) == 0
+    assert "a" in cache
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # a — самый свежий
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_expiry():
+    cache = TTLCache(maxsize=10, ttl=5)
+    with patch("app.utils.ttl_cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=100)
+    with patch("app.utils.ttl_cache.time.monotonic", return_value=106.0):
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+
+def test_pop_and_clear():
+    cache = TTLCache()
+    cache.set("a", 1)
+    assert cache.pop("a") == 1
+    assert cache.pop("a", "none") == "none"
+    cache.set("b", 2)
+    cache.clear()
+    assert len(cache) == 0